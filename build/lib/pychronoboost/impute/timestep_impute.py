@@ -0,0 +1,252 @@
+import warnings
+from abc import ABC, abstractmethod
+import pandas as pd
+import numpy as np
+from pychronoboost.utils import (
+    check_timeseries_type,
+    TIMESTEP_INTEGER,
+    TIMESTEP_FLOAT,
+    TIMESTEP_DATE,
+    TIMESTEP_DATETIME,
+)
+
+FREQ_INFER = "infer"
+AGGREGATIONS = ["mean", "last", "sum"]
+# An inferred step may be at most this many times finer than the median step
+MAX_INFERRED_REFINEMENT = 10
+
+
+class TimeStepImputationStrategy(ABC):
+    default_freq = None
+
+    def __init__(self, freq=None, aggregation: str = None):
+        """
+        :param freq: The step of the imputed timestep grid, defaults to default_freq.
+        :param aggregation: If set, rows are resampled onto the grid by aggregating all rows
+            within each step with 'mean', 'last' or 'sum', instead of only keeping rows that
+            fall exactly on the grid.
+        """
+        if aggregation is not None and aggregation not in AGGREGATIONS:
+            raise NotImplementedError(f"Aggregation {aggregation} not available")
+        self.freq = self.default_freq if freq is None else freq
+        self.aggregation = aggregation
+
+    @abstractmethod
+    def impute(self, data: pd.DataFrame, timestep_column: str):
+        """
+        Impute missing timesteps in the data.
+        :param data: Pandas DataFrame with missing timesteps.
+        :param timestep_column: The column name of the timestep.
+        """
+        pass
+
+    def is_complete(self, timesteps: pd.Series) -> bool:
+        """
+        Check whether the timesteps are already sorted, unique and on a gap-free grid, in
+        which case imputing them would leave the data unchanged. The check is O(n) and does
+        not copy the data.
+        :param timesteps: The timestep column.
+        """
+        if self.aggregation is not None or len(timesteps) == 0:
+            return False
+        return self._is_regular(timesteps)
+
+    def _is_regular(self, timesteps: pd.Series) -> bool:
+        return False
+
+    def _aggregate(self, grouped):
+        if self.aggregation == "sum":
+            return grouped.sum(min_count=1)
+        if self.aggregation == "mean":
+            return grouped.mean(numeric_only=True)
+        return grouped.last()
+
+
+class _ResampleImputation(TimeStepImputationStrategy):
+    def impute(self, data: pd.DataFrame, timestep_column: str):
+        data = data.set_index(timestep_column)
+        if self.aggregation is None:
+            data = data.asfreq(self.freq)
+        else:
+            data = self._aggregate(data.resample(self.freq))
+        data.reset_index(inplace=True)
+        return data
+
+    def _is_regular(self, timesteps: pd.Series) -> bool:
+        offset = pd.tseries.frequencies.to_offset(self.freq)
+        if not isinstance(offset, pd.offsets.Tick):
+            # Calendar offsets such as month ends have no fixed step to compare against
+            return False
+        values = _nanoseconds(timesteps)
+        if len(values) == 1:
+            return values[0] != pd.NaT.value
+        return bool((np.diff(values) == offset.nanos).all())
+
+
+class DateImputation(_ResampleImputation):
+    default_freq = "D"
+
+
+class DateTimeImputation(_ResampleImputation):
+    default_freq = "S"
+
+
+class IntegerImputation(TimeStepImputationStrategy):
+    default_freq = 1
+
+    def impute(self, data: pd.DataFrame, timestep_column: str):
+        data = data.set_index(timestep_column)
+        start, stop = data.index.min(), data.index.max()
+        if self.aggregation is not None:
+            # Label every row with the start of the step it falls in
+            steps = (data.index - start) // self.freq
+            data = self._aggregate(data.groupby(start + steps * self.freq))
+        data = data.reindex(
+            np.arange(start, stop + 1, self.freq, dtype=data.index.dtype)
+        )
+        data.index.name = timestep_column
+        data.reset_index(inplace=True)
+        return data
+
+    def _is_regular(self, timesteps: pd.Series) -> bool:
+        return bool((np.diff(timesteps.to_numpy()) == self.freq).all())
+
+
+class FloatImputation(TimeStepImputationStrategy):
+    default_freq = 0.1
+
+    def impute(self, data: pd.DataFrame, timestep_column: str):
+        data = data.set_index(timestep_column)
+        min_value, max_value = data.index.min(), data.index.max()
+        n_steps = int(np.floor((max_value - min_value) / self.freq + 1e-9)) + 1
+        new_index = min_value + np.arange(n_steps) * self.freq
+        if self.aggregation is not None:
+            steps = np.floor((data.index - min_value) / self.freq + 1e-9).astype(
+                np.int64
+            )
+            data = self._aggregate(data.groupby(new_index[steps]))
+        else:
+            # Snap rows onto the grid, so floating point drift does not leave them unmatched
+            steps = np.round((data.index - min_value) / self.freq)
+            snapped = min_value + steps * self.freq
+            data.index = np.where(np.isclose(snapped, data.index), snapped, data.index)
+        data = data.reindex(new_index)
+        data.index.name = timestep_column
+        data.reset_index(inplace=True)
+        return data
+
+    def _is_regular(self, timesteps: pd.Series) -> bool:
+        values = timesteps.to_numpy()
+        # Compare against the exact grid, as rows are only left untouched when they match it
+        return np.array_equal(values, values[0] + np.arange(len(values)) * self.freq)
+
+
+def _nanoseconds(timesteps) -> np.ndarray:
+    # Datetimes as int64 nanoseconds, whatever the unit of the column
+    return pd.DatetimeIndex(timesteps).to_numpy(dtype="datetime64[ns]").view(np.int64)
+
+
+def _common_step(diffs: np.ndarray) -> int:
+    # The greatest common divisor of the steps, or the median step if that would make the
+    # grid much finer than the data, e.g. for jittered or irregular timesteps
+    step = int(np.gcd.reduce(diffs))
+    median = max(int(np.round(np.median(diffs))), 1)
+    if step * MAX_INFERRED_REFINEMENT < median:
+        warnings.warn(
+            "The timesteps have no common step close to their median step, so the median "
+            "step is used and timesteps off its grid are dropped. Set timestep_freq, or "
+            "timestep_aggregation to resample them onto a grid."
+        )
+        return median
+    return step
+
+
+def infer_frequency(
+    data: pd.DataFrame, timestep_column: str, timestep_type: str = None
+):
+    """
+    Infers the native frequency of a timestep column, the largest step whose grid holds every
+    timestep, so imputing onto it never drops a row.
+
+    Date and datetime frequencies come from pd.infer_freq when the timesteps are regular, and
+    from the greatest common divisor of the steps between timesteps otherwise, e.g. when some
+    timesteps are missing. Integer frequencies are the greatest common divisor of the steps.
+    If that divisor is more than MAX_INFERRED_REFINEMENT times smaller than the median step,
+    as for jittered or irregular timesteps, the median step is used instead with a warning,
+    rather than imputing a grid many times larger than the data. Float frequencies are the
+    most common, or else the smallest, step whose grid holds every timestep.
+
+    :param data: input dataframe
+    :param timestep_column: column name of the timestamp column
+    :param timestep_type: the type of the timestep column, detected if not given
+    :return: A pandas offset alias for dates and datetimes, or a numeric step, or None if
+        there are fewer than two distinct timesteps or no float step fits all of them
+    """
+    if timestep_type is None:
+        timestep_type = check_timeseries_type(data, timestep_column)
+    timesteps = pd.Series(data[timestep_column].dropna().unique()).sort_values()
+    if len(timesteps) < 2:
+        return None
+
+    if timestep_type in (TIMESTEP_DATE, TIMESTEP_DATETIME):
+        timesteps = pd.DatetimeIndex(timesteps)
+        if len(timesteps) >= 3:
+            freq = pd.infer_freq(timesteps)
+            if freq is not None:
+                return freq
+        step = _common_step(np.diff(_nanoseconds(timesteps)))
+        return pd.tseries.frequencies.to_offset(pd.Timedelta(step)).freqstr
+
+    values = timesteps.to_numpy()
+    diffs = np.diff(values)
+    if timestep_type == TIMESTEP_FLOAT:
+        diffs = np.round(diffs, 10)
+        offsets = values - values[0]
+        for step in (pd.Series(diffs).mode().iloc[0], diffs.min()):
+            steps = offsets / step
+            if np.allclose(steps, np.round(steps), rtol=0, atol=1e-6):
+                return float(step)
+        return None
+    return _common_step(diffs)
+
+
+def get_timestep_imputation_strategy(
+    data: pd.DataFrame,
+    timestep_column: str,
+    freq=FREQ_INFER,
+    aggregation: str = None,
+    timestep_type: str = None,
+) -> TimeStepImputationStrategy:
+    """
+    Finds the corresponding timestep imputation strategy class for the type of the timestep column
+
+    :param data: input dataframe
+    :param timestep_column: column name of the timestamp column
+    :param freq: step of the imputed timesteps: a pandas offset alias for dates and datetimes,
+        a number for integer and float timesteps, 'infer' to use the native frequency of the
+        data, or None for the default step of the timestep type
+    :param aggregation: optional aggregation ('mean', 'last' or 'sum') to resample rows onto
+        the timestep grid, e.g. to downsample second-level data to minutes
+    :param timestep_type: the type of the timestep column, detected if not given
+    :return: A timestep imputation strategy class object
+    """
+    if timestep_type is None:
+        timestep_type = check_timeseries_type(data, timestep_column)
+    if freq == FREQ_INFER:
+        freq = infer_frequency(data, timestep_column, timestep_type)
+
+    if timestep_type == TIMESTEP_DATE:
+        return DateImputation(freq, aggregation)
+    elif timestep_type == TIMESTEP_DATETIME:
+        return DateTimeImputation(freq, aggregation)
+    elif timestep_type == TIMESTEP_INTEGER:
+        return IntegerImputation(freq, aggregation)
+    elif timestep_type == TIMESTEP_FLOAT:
+        return FloatImputation(freq, aggregation)
+    else:
+        raise ValueError(f"Unsupported timestep type: {timestep_type}")
+
+
+# Usage Example:
+# strategy = get_timestep_imputation_strategy(data, 'timestamp')
+# imputed_data = strategy.impute(data, 'timestamp')
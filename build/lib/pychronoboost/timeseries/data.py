@@ -0,0 +1,740 @@
+import numpy as np
+import pandas as pd
+from typing import List, Tuple
+from pychronoboost.cache import FeatureCache
+from pychronoboost.impute.timestep_impute import (
+    FREQ_INFER,
+    get_timestep_imputation_strategy,
+)
+from pychronoboost.impute.value_impute import get_value_imputation_strategy
+from pychronoboost.profiling import StageProfiler, profiled_stage
+from pychronoboost.timeseries.feature_generator import (
+    DEFAULT_MAX_PAIRS,
+    FEATURE_DTYPES,
+    FeatureCandidates,
+    PairFeatureGenerator,
+    TimeSeriesFeatureGenerator,
+    get_window_sizes,
+    check_feature_dtype,
+    compact_features,
+    select_column_pairs,
+    uses_calendar_windows,
+)
+from pychronoboost.timeseries.feature_selector import get_feature_selector
+from pychronoboost.timeseries.panel import process_groups, resolve_n_jobs
+from pychronoboost.utils import check_timeseries_type
+
+# Number of values tried before converting a whole timestep column to datetimes
+TIMESTEP_TYPE_SAMPLE_SIZE = 1000
+
+
+class TimeSeriesData:
+    def __init__(
+        self,
+        data: pd.DataFrame,
+        timestep_column: str,
+        group_column: str = None,
+        cache: FeatureCache = None,
+        timestep_freq=FREQ_INFER,
+        timestep_aggregation: str = None,
+        timestep_format: str = None,
+        feature_dtype: str = None,
+        profiler: StageProfiler = None,
+        copy_on_write: bool = False,
+    ):
+        """
+        Initializes the TimeSeriesData object.
+
+        Args:
+            data (pd.DataFrame): The pandas DataFrame containing the time series data.
+            timestep_column (str): The name of the column in 'data' that represents the timestep.
+            group_column (str): Optional name of the column identifying each series when 'data'
+                holds many series in long format. Each series is imputed and gets its features
+                generated separately.
+            cache (FeatureCache): Optional on-disk cache of timestep imputation, value
+                imputation and feature generation results. Results are reused whenever the input
+                data and settings of a step are unchanged.
+            timestep_freq: Step of the imputed timesteps: a pandas offset alias for dates and
+                datetimes, a number for integer and float timesteps, 'infer' to use the native
+                frequency of the data, or None for the default step of the timestep type.
+            timestep_aggregation (str): Optional aggregation ('mean', 'last' or 'sum') used to
+                resample rows onto the timestep grid, e.g. to downsample to a coarser step.
+            timestep_format (str): Optional strftime format of a string timestep column,
+                which speeds up converting it to datetimes.
+            feature_dtype (str): The dtype of generated features: 'float64' (the default),
+                'float32' to halve their memory, or 'compact' for float32 with features that
+                int16 or float16 represent exactly, e.g. lags of small integer columns,
+                downcast further.
+            profiler (StageProfiler): Optional profiler recording the wall time, CPU time,
+                memory and data shape of every stage, e.g. timestep type detection,
+                imputation, feature generation and feature selection. Its report is
+                available as profiler.report. In a panel processed with n_jobs > 1, the
+                stages run within each worker are not recorded.
+            copy_on_write (bool): If set, 'data' is never modified. The stages work on a
+                shallow copy of it, which shares the column buffers and only ever replaces
+                columns instead of writing into them, so no defensive deep copy is needed and
+                several objects can process the same input concurrently, e.g. from threads.
+                Otherwise, e.g. a string timestep column is converted within 'data'.
+
+        Raises:
+            ValueError: If 'data' is not a pandas DataFrame or if 'timestep_column' or
+                'group_column' is not in 'data'.
+            NotImplementedError: If 'feature_dtype' is not available.
+        """
+        self.data = data
+        self.timestep_column = timestep_column
+        self.group_column = group_column
+        self.cache = cache
+        self.profiler = profiler
+        self.timestep_freq = timestep_freq
+        self.timestep_aggregation = timestep_aggregation
+        self.timestep_format = timestep_format
+        self.feature_dtype = check_feature_dtype(feature_dtype)
+        self.timestep_strategy = None
+        self.selected_features = []
+        self._timestep_type = None
+        self._validate_data()
+        self.copy_on_write = copy_on_write
+        if copy_on_write:
+            self.data = self.data.copy(deep=False)
+        self.original_feature_columns = self.data.columns.tolist()
+
+    def _validate_data(self) -> None:
+        """
+        Validates the input data to ensure it meets the requirements.
+        """
+        if not isinstance(self.data, pd.DataFrame):
+            raise ValueError("The input data must be a pandas DataFrame.")
+
+        if self.timestep_column not in self.data.columns:
+            raise ValueError(
+                f"The timestep column '{self.timestep_column}' is not in the DataFrame."
+            )
+
+        if self.group_column is not None and self.group_column not in self.data.columns:
+            raise ValueError(
+                f"The group column '{self.group_column}' is not in the DataFrame."
+            )
+
+    @property
+    def timestep_type(self) -> str:
+        """
+        The type of the timestep column. It is detected, and the column converted to datetimes
+        if needed, only once.
+        """
+        if self._timestep_type is None:
+            self._timestep_type = self._detect_timestep_type()
+        return self._timestep_type
+
+    @profiled_stage("detect_timestep_type")
+    def _detect_timestep_type(self) -> str:
+        return check_timeseries_type(
+            self.data,
+            self.timestep_column,
+            TIMESTEP_TYPE_SAMPLE_SIZE,
+            self.timestep_format,
+        )
+
+    @profiled_stage("process_timeseries_features")
+    def process_timeseries_features(
+        self,
+        feature_columns: List[str],
+        target_column: str,
+        value_impute_strategy: str = "last",
+        max_window_size: int = 3,
+        feature_selector_model: str = "XGB",
+        max_features: int = 5,
+        n_jobs: int = 1,
+        chunk_size: int = None,
+        feature_selector_options: dict = None,
+        value_impute_options: dict = None,
+        window_features: List[str] = None,
+        window_schedule=None,
+        pair_features: List[str] = None,
+        max_pairs: int = DEFAULT_MAX_PAIRS,
+    ) -> pd.DataFrame:
+        """
+        Processes time series features including imputation and feature generation.
+
+        Args:
+            feature_columns (List[str]): A list of column names to be used for feature generation.
+            target_column (str): The name of the target column.
+            value_impute_strategy (str): Strategy for imputing missing values.
+            max_window_size (int): Maximum window size for feature generation.
+            feature_selector_model (str): Model to use for feature selection.
+            max_features (int): Maximum number of features to select.
+            n_jobs (int): Number of processes used to process the series of a panel in
+                parallel when 'group_column' is set, -1 to use all CPUs. For a single series,
+                the number of threads generating the window features.
+            chunk_size (int): If set, candidate features are computed lazily this many columns
+                at a time and streamed into the feature selector. Only the selected features are
+                attached to the data, so peak memory is bounded by the chunk size instead of the
+                number of candidates. Not supported together with 'group_column'.
+            feature_selector_options (dict): Further options of the feature selection model,
+                e.g. {"max_rows": 100000, "n_jobs": 8} for the XGB model.
+            value_impute_options (dict): Further options of the value imputation strategy,
+                e.g. {"period": 24} for the 'seasonal' strategy on hourly data.
+            window_features (List[str]): The window statistics to generate candidates from,
+                e.g. ["avg", "std", "ewm"], defaults to min, max, avg and nth.
+            window_schedule: The window sizes to generate candidates for: 'linear' (the
+                default) for every size up to max_window_size, 'geometric' for 1, 2, 4, ...,
+                'calendar' for windows of one day, week, month etc. in timesteps, or an
+                explicit list of sizes. See get_window_sizes.
+            pair_features (List[str]): If set, also generates these statistics, e.g. ["corr",
+                "ratio"], for pairs of feature columns. See generate_pair_features. Not
+                supported together with 'chunk_size'.
+            max_pairs (int): The maximum number of column pairs, the ones with the strongest
+                correlation, to generate pair features for. None keeps all pairs.
+
+        Returns:
+            pd.DataFrame: The processed DataFrame with imputed and selected features.
+        """
+        if chunk_size is not None:
+            if self.group_column is not None:
+                raise ValueError(
+                    "chunk_size is not supported together with group_column."
+                )
+            if pair_features is not None:
+                raise ValueError(
+                    "chunk_size is not supported together with pair_features."
+                )
+            if self.feature_dtype == "compact":
+                raise ValueError(
+                    "chunk_size is not supported together with the compact feature dtype."
+                )
+            self.impute_timesteps()
+            self.impute_values(
+                feature_columns, value_impute_strategy, options=value_impute_options
+            )
+            self.select_candidate_features(
+                self.feature_candidates(
+                    feature_columns, max_window_size, window_features, window_schedule
+                ),
+                target_column,
+                max_features,
+                feature_selector_model,
+                chunk_size,
+                feature_selector_options,
+                self._warmup_rows(max_window_size, window_schedule),
+            )
+            return self.data
+
+        warmup_rows = 0
+        if self.group_column is None:
+            generated_features = self.generate_candidate_features(
+                feature_columns,
+                value_impute_strategy,
+                max_window_size,
+                value_impute_options,
+                window_features,
+                window_schedule,
+                pair_features,
+                max_pairs,
+                n_jobs=n_jobs,
+            )
+            warmup_rows = self._warmup_rows(max_window_size, window_schedule)
+        else:
+            # Every series of a panel has its own warm-up, so no rows are left out
+            # Parse string timesteps once here, with timestep_format, not in every group
+            self._timestep_type = self._detect_timestep_type()
+            # Resolve the windows once, so every series gets the same candidates
+            window_sizes = self.window_sizes(max_window_size, window_schedule)
+            self.data, generated_features = self._process_groups(
+                self.data,
+                self.timestep_column,
+                self.group_column,
+                feature_columns,
+                value_impute_strategy,
+                max_window_size,
+                n_jobs,
+                self.cache,
+                self.timestep_freq,
+                self.timestep_aggregation,
+                value_impute_options,
+                window_features,
+                window_sizes,
+                pair_features,
+                max_pairs,
+                self.feature_dtype,
+            )
+
+        # Features are selected once, pooled over all series
+        self.select_features(
+            generated_features,
+            target_column,
+            max_features,
+            feature_selector_model,
+            feature_selector_options,
+            warmup_rows,
+        )
+        return self.data
+
+    @profiled_stage("process_groups")
+    def _process_groups(self, *args) -> Tuple[pd.DataFrame, List[str]]:
+        return process_groups(*args)
+
+    def generate_candidate_features(
+        self,
+        feature_columns: List[str],
+        value_impute_strategy: str = "last",
+        max_window_size: int = 3,
+        value_impute_options: dict = None,
+        window_features: List[str] = None,
+        window_schedule=None,
+        pair_features: List[str] = None,
+        max_pairs: int = DEFAULT_MAX_PAIRS,
+        column_pairs: List[Tuple[str, str]] = None,
+        n_jobs: int = 1,
+    ) -> List[str]:
+        """
+        Imputes the series and generates all candidate features ahead of feature selection.
+
+        Args:
+            feature_columns (List[str]): A list of column names to be used for feature generation.
+            value_impute_strategy (str): Strategy for imputing missing values.
+            max_window_size (int): Maximum window size for feature generation.
+            value_impute_options (dict): Further options of the value imputation strategy.
+            window_features (List[str]): The window statistics to generate.
+            window_schedule: The window sizes to generate features for.
+            pair_features (List[str]): If set, the statistics to generate for column pairs.
+            max_pairs (int): The maximum number of column pairs to generate features for.
+            column_pairs (List[Tuple[str, str]]): The column pairs to generate features for,
+                selected by select_column_pairs on the imputed data if not given.
+            n_jobs (int): Number of threads generating the window features, -1 to use all
+                CPUs.
+
+        Returns:
+            List[str]: A list of names of the generated features.
+        """
+        self.impute_timesteps()
+        self.impute_values(
+            feature_columns, value_impute_strategy, options=value_impute_options
+        )
+        generated_features = self.generate_features(
+            feature_columns, max_window_size, window_features, window_schedule, n_jobs
+        )
+        if pair_features is not None:
+            if column_pairs is None:
+                column_pairs = select_column_pairs(
+                    self.data, feature_columns, max_pairs
+                )
+            generated_features += self.generate_pair_features(
+                column_pairs, max_window_size, pair_features, window_schedule
+            )
+        self.impute_values(generated_features, "last", use_cache=False)
+        if self.feature_dtype == "compact":
+            compact_features(self.data, generated_features)
+        return generated_features
+
+    @profiled_stage("impute_timesteps")
+    def impute_timesteps(self) -> None:
+        """
+        Imputes missing timesteps in the time series data.
+
+        Series that are already gap-free are not copied, only rebound to a shallow copy, so
+        later stages replace its columns rather than those of the caller's DataFrame.
+        Otherwise the data is reindexed onto the timestep grid, or merged with it if it holds
+        duplicate timesteps.
+        """
+        self.timestep_strategy = get_timestep_imputation_strategy(
+            self.data,
+            self.timestep_column,
+            self.timestep_freq,
+            self.timestep_aggregation,
+            self.timestep_type,
+        )
+        if self.timestep_strategy.is_complete(self.data[self.timestep_column]):
+            # The series is already gap-free, so there is nothing to impute or copy
+            self.data = self.data.copy(deep=False)
+            return
+
+        if self.cache is not None:
+            key = self.cache.key(
+                "impute_timesteps",
+                self.timestep_column,
+                str(self.timestep_strategy.freq),
+                self.timestep_aggregation,
+                self.data.columns.tolist(),
+                *(self.data[col] for col in self.data.columns),
+            )
+            cached = self.cache.get_frame(key)
+            if cached is not None:
+                self.data = cached
+                return
+
+        timesteps = self.data[self.timestep_column]
+        if self.timestep_aggregation is not None:
+            # Resampling aggregates the values, so it works on the whole DataFrame
+            self.data = self.timestep_strategy.impute(self.data, self.timestep_column)
+        elif timesteps.notna().all() and timesteps.is_unique:
+            # Reindex the sorted data onto the grid in one step, instead of merging against it
+            data = self.data
+            if not timesteps.is_monotonic_increasing:
+                data = data.sort_values(self.timestep_column, kind="stable")
+            self.data = self.timestep_strategy.impute(data, self.timestep_column)
+        else:
+            imputed_timesteps = self.timestep_strategy.impute(
+                self.data[[self.timestep_column]].dropna().drop_duplicates(),
+                self.timestep_column,
+            )
+
+            # Duplicate timesteps cannot be reindexed, so merge them with the imputed timesteps
+            self.data = pd.merge(
+                imputed_timesteps, self.data, on=self.timestep_column, how="left"
+            )
+        if self.cache is not None:
+            self.cache.put_frame(key, self.data)
+
+    @profiled_stage("impute_values")
+    def impute_values(
+        self,
+        value_columns: List[str],
+        strategy: str,
+        use_cache: bool = True,
+        options: dict = None,
+    ) -> None:
+        """
+        Imputes missing values in specified columns of the DataFrame.
+
+        Args:
+            value_columns (List[str]): List of column names for which to impute missing values.
+            strategy (str): Strategy to use for value imputation.
+            use_cache (bool): Whether to use the cache, if the object has one.
+            options (dict): Further options of the strategy, e.g. {"period": 7} for the
+                'seasonal' strategy.
+
+        Raises:
+            ValueError: If any of the specified columns are not in the DataFrame.
+        """
+        options = options or {}
+        imputer = get_value_imputation_strategy(strategy, **options)
+        value_columns = list(dict.fromkeys(value_columns))
+        for col in value_columns:
+            if col not in self.data.columns:
+                raise ValueError(
+                    f"column {col} not in input dataframe columns {self.data.columns}"
+                )
+
+        imputed = {}
+        keys = {}
+        if use_cache and self.cache is not None:
+            for col in value_columns:
+                keys[col] = self.cache.key(
+                    "impute_values", strategy, options, self.data[col]
+                )
+                cached = self.cache.get_array(keys[col])
+                if cached is not None:
+                    imputed[col] = np.array(cached)
+        missing = [col for col in value_columns if col not in imputed]
+
+        # Float columns are imputed together, one 2-D block per dtype, others one at a time
+        blocks = {}
+        for col in missing:
+            dtype = self.data[col].dtype
+            if isinstance(dtype, np.dtype) and dtype.kind == "f":
+                blocks.setdefault(dtype, []).append(col)
+        for columns in blocks.values():
+            block = imputer.impute_block(
+                np.stack([self.data[col].to_numpy() for col in columns])
+            )
+            imputed.update(zip(columns, block))
+            # Write the imputed block back in one step
+            self.data[columns] = block.T
+        for col in missing:
+            if col not in imputed:
+                imputed[col] = imputer.impute(self.data[col])
+            if col in keys and isinstance(imputed[col].dtype, np.dtype):
+                self.cache.put_array(keys[col], np.asarray(imputed[col]))
+
+        block_columns = {col for columns in blocks.values() for col in columns}
+        other_columns = [col for col in value_columns if col not in block_columns]
+        if other_columns:
+            self.data[other_columns] = pd.DataFrame(
+                {col: imputed[col] for col in other_columns},
+                index=self.data.index,
+                columns=other_columns,
+            )
+
+    def _warmup_rows(self, max_window_size: int, window_schedule=None) -> int:
+        # The features of the rows before the first full window are back filled, so they are
+        # left out of the selection, unless no rows would remain
+        warmup_rows = max(self.window_sizes(max_window_size, window_schedule)) - 1
+        return warmup_rows if warmup_rows < len(self.data) else 0
+
+    def window_sizes(self, max_window_size: int, window_schedule=None) -> List[int]:
+        """
+        Resolves a window schedule into window sizes, using the step of the imputed timesteps
+        for calendar windows.
+
+        Args:
+            max_window_size (int): Maximum window size of the schedule.
+            window_schedule: The window schedule, see get_window_sizes.
+
+        Returns:
+            List[int]: The window sizes features are generated for.
+        """
+        freq = None
+        if uses_calendar_windows(window_schedule):
+            strategy = self.timestep_strategy
+            if strategy is None:
+                strategy = get_timestep_imputation_strategy(
+                    self.data,
+                    self.timestep_column,
+                    self.timestep_freq,
+                    self.timestep_aggregation,
+                    self.timestep_type,
+                )
+            freq = strategy.freq
+        return get_window_sizes(max_window_size, window_schedule, freq)
+
+    @profiled_stage("generate_features")
+    def generate_features(
+        self,
+        columns: List[str],
+        max_window_size: int,
+        window_features: List[str] = None,
+        window_schedule=None,
+        n_jobs: int = 1,
+    ) -> List[str]:
+        """
+        Generates new features based on specified columns and window size.
+
+        Args:
+            columns (List[str]): List of column names to use for feature generation.
+            max_window_size (int): Maximum window size for generating features.
+            window_features (List[str]): The window statistics to generate, defaults to min,
+                max, avg and nth.
+            window_schedule: The window sizes to generate features for, defaults to every
+                size from 1 to max_window_size. See get_window_sizes.
+            n_jobs (int): Number of threads computing the columns in parallel, -1 to use all
+                CPUs.
+
+        Returns:
+            List[str]: A list of names of the generated features.
+        """
+        n_jobs = resolve_n_jobs(n_jobs)
+        feature_generator = TimeSeriesFeatureGenerator(
+            max_window_size,
+            window_features,
+            self.window_sizes(max_window_size, window_schedule),
+            FEATURE_DTYPES[self.feature_dtype],
+        )
+        n_features = feature_generator.n_features
+
+        # Compute every column's features into one block and attach it to the frame once
+        features = np.empty(
+            (n_features * len(columns), len(self.data)), dtype=feature_generator.dtype
+        )
+        if self.cache is None:
+            feature_generator.compute_columns(self.data, columns, features, n_jobs)
+        else:
+            missing = {}
+            for i, col in enumerate(columns):
+                key = self.cache.key(
+                    "generate_features",
+                    feature_generator.dtype.str,
+                    feature_generator.window_sizes,
+                    feature_generator.features,
+                    self.data[col],
+                )
+                cached = self.cache.get_array(key)
+                if cached is not None:
+                    features[i * n_features : (i + 1) * n_features] = cached
+                else:
+                    missing[i] = key
+            if missing:
+                computed = feature_generator.compute_columns(
+                    self.data, [columns[i] for i in missing], n_jobs=n_jobs
+                )
+                for j, (i, key) in enumerate(missing.items()):
+                    out = computed[j * n_features : (j + 1) * n_features]
+                    features[i * n_features : (i + 1) * n_features] = out
+                    self.cache.put_array(key, out)
+
+        all_generated_features = []
+        for col in columns:
+            all_generated_features += feature_generator.feature_names(col)
+
+        self._attach_features(features, all_generated_features)
+        return all_generated_features
+
+    @profiled_stage("generate_pair_features")
+    def generate_pair_features(
+        self,
+        pairs: List[Tuple[str, str]],
+        max_window_size: int,
+        pair_features: List[str] = None,
+        window_schedule=None,
+    ) -> List[str]:
+        """
+        Generates rolling covariances, correlations, lagged ratios and spreads between pairs
+        of columns, for all pairs in one vectorized batch.
+
+        Args:
+            pairs (List[Tuple[str, str]]): The (first, second) column name pairs, e.g. from
+                select_column_pairs.
+            max_window_size (int): Maximum window size for generating features.
+            pair_features (List[str]): The pair statistics to generate, defaults to cov, corr,
+                ratio and spread.
+            window_schedule: The window sizes to generate features for.
+
+        Returns:
+            List[str]: A list of names of the generated features.
+        """
+        feature_generator = PairFeatureGenerator(
+            max_window_size,
+            pair_features,
+            self.window_sizes(max_window_size, window_schedule),
+            FEATURE_DTYPES[self.feature_dtype],
+        )
+        names = feature_generator.feature_names(pairs)
+        if self.cache is None:
+            features = feature_generator.compute_features(self.data, pairs)
+        else:
+            columns = list(dict.fromkeys(column for pair in pairs for column in pair))
+            key = self.cache.key(
+                "generate_pair_features",
+                feature_generator.dtype.str,
+                feature_generator.window_sizes,
+                feature_generator.features,
+                [list(pair) for pair in pairs],
+                *(self.data[col] for col in columns),
+            )
+            features = self.cache.get_array(key)
+            if features is None:
+                features = feature_generator.compute_features(self.data, pairs)
+                self.cache.put_array(key, features)
+
+        self._attach_features(features, names)
+        return names
+
+    def _attach_features(self, features: np.ndarray, names: List[str]) -> None:
+        # Attach a block of features, one row per feature, to the frame at once
+        existing = [col for col in names if col in self.data.columns]
+        self.data = pd.concat(
+            [
+                self.data.drop(columns=existing),
+                pd.DataFrame(
+                    features.T, index=self.data.index, columns=names, copy=False
+                ),
+            ],
+            axis=1,
+        )
+
+    def feature_candidates(
+        self,
+        columns: List[str],
+        max_window_size: int,
+        window_features: List[str] = None,
+        window_schedule=None,
+    ) -> FeatureCandidates:
+        """
+        Describes the features of the specified columns without computing them.
+
+        Args:
+            columns (List[str]): List of column names to use for feature generation.
+            max_window_size (int): Maximum window size for generating features.
+            window_features (List[str]): The window statistics to generate.
+            window_schedule: The window sizes to generate features for.
+
+        Returns:
+            FeatureCandidates: The lazily computed candidate features.
+        """
+        return FeatureCandidates(
+            self.data,
+            columns,
+            TimeSeriesFeatureGenerator(
+                max_window_size,
+                window_features,
+                self.window_sizes(max_window_size, window_schedule),
+                FEATURE_DTYPES[self.feature_dtype],
+            ),
+            "last",
+        )
+
+    @profiled_stage("select_candidate_features")
+    def select_candidate_features(
+        self,
+        candidates: FeatureCandidates,
+        target_column: str,
+        max_features: int = 5,
+        selector_model: str = "XGB",
+        chunk_size: int = 1000,
+        selector_options: dict = None,
+        warmup_rows: int = 0,
+    ) -> List[str]:
+        """
+        Selects the most relevant candidate features, streaming them into the selection model a
+        chunk at a time, and attaches only the selected features to the data.
+
+        Args:
+            candidates (FeatureCandidates): The lazily computed candidate features.
+            target_column (str): The name of the target column.
+            max_features (int): Maximum number of features to select.
+            selector_model (str): Model to use for feature selection.
+            chunk_size (int): Maximum number of candidate columns computed at once.
+            selector_options (dict): Further options of the feature selection model.
+            warmup_rows (int): The number of leading rows to leave out of the selection.
+
+        Returns:
+            List[str]: The names of the selected features.
+        """
+        feature_selector = get_feature_selector(
+            selector_model, max_features, **(selector_options or {})
+        )
+        selected = set(
+            feature_selector.select_from_chunks(
+                self.data,
+                candidates.iter_chunks(chunk_size),
+                target_column,
+                warmup_rows,
+            )
+        )
+
+        # Attach the selected features in the order they are generated in
+        self.selected_features = [name for name in candidates.names if name in selected]
+        self.data = pd.concat(
+            [self.data, candidates.compute(self.selected_features)], axis=1
+        )
+        return self.selected_features
+
+    @profiled_stage("select_features")
+    def select_features(
+        self,
+        feature_columns: List[str],
+        target_column: str,
+        max_features: int = 5,
+        selector_model: str = "XGB",
+        selector_options: dict = None,
+        warmup_rows: int = 0,
+    ) -> List[str]:
+        """
+        Selects the most relevant features based on the specified selection model.
+
+        Only missing values in the feature and target columns leave rows out of the
+        selection, and none with the {"keep_missing": True} option of the XGB model.
+
+        Args:
+            feature_columns (List[str]): List of column names to consider for selection.
+            target_column (str): The name of the target column.
+            max_features (int): Maximum number of features to select.
+            selector_model (str): Model to use for feature selection.
+            selector_options (dict): Further options of the feature selection model.
+            warmup_rows (int): The number of leading rows to leave out of the selection,
+                e.g. the max_window_size - 1 rows before the first full window.
+
+        Returns:
+            List[str]: The names of the selected features.
+        """
+        feature_selector = get_feature_selector(
+            selector_model, max_features, **(selector_options or {})
+        )
+        self.selected_features = feature_selector.select_features(
+            self.data,
+            feature_columns,
+            target_column,
+            self.timestep_column,
+            self.original_feature_columns,
+            warmup_rows,
+        )
+        return self.selected_features
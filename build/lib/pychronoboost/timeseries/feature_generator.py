@@ -0,0 +1,600 @@
+import numpy as np
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Sequence, Tuple, Union
+from pychronoboost.impute.value_impute import get_value_imputation_strategy
+from pychronoboost.timeseries.rolling import (
+    RollingWindowState,
+    check_pair_features,
+    check_window_features,
+    compute_pair_features,
+    compute_window_feature,
+    compute_window_features,
+    pair_feature_names,
+    window_feature_names,
+)
+
+# The dtypes generated features can be stored in. 'compact' is float32, with features that
+# are represented exactly by int16 or float16 downcast further after imputation.
+FEATURE_DTYPES = {"float64": np.float64, "float32": np.float32, "compact": np.float32}
+
+WINDOW_SCHEDULES = ["linear", "geometric", "calendar"]
+# Calendar spans of calendar-aligned windows, with months and years of average length
+CALENDAR_WINDOWS = {
+    "minute": pd.Timedelta(minutes=1),
+    "hour": pd.Timedelta(hours=1),
+    "day": pd.Timedelta(days=1),
+    "week": pd.Timedelta(weeks=1),
+    "month": pd.Timedelta(days=365.2425 / 12),
+    "quarter": pd.Timedelta(days=365.2425 / 4),
+    "year": pd.Timedelta(days=365.2425),
+}
+
+
+def check_feature_dtype(feature_dtype: str = None) -> str:
+    """
+    Validate the dtype mode of generated features.
+
+    :param feature_dtype: One of FEATURE_DTYPES, defaults to 'float64'.
+    :return: The dtype mode.
+    """
+    if feature_dtype is None:
+        return "float64"
+    if feature_dtype not in FEATURE_DTYPES:
+        raise NotImplementedError(f"Feature dtype {feature_dtype} not available")
+    return feature_dtype
+
+
+def compact_dtype(values: np.ndarray) -> np.dtype:
+    """
+    Find the smallest dtype that represents every value exactly.
+
+    :param values: 1-D array of feature values.
+    :return: int16 for integers within its range, float16 for values it holds exactly, and
+        the dtype of values otherwise.
+    """
+    if len(values) == 0:
+        return values.dtype
+    with np.errstate(invalid="ignore", over="ignore"):
+        if np.isfinite(values).all():
+            as_int = values.astype(np.int16)
+            if np.array_equal(as_int, values):
+                return np.dtype(np.int16)
+        if values.dtype.itemsize > 2:
+            as_half = values.astype(np.float16)
+            if np.array_equal(as_half, values, equal_nan=True):
+                return np.dtype(np.float16)
+    return values.dtype
+
+
+def compact_features(data: pd.DataFrame, names: List[str]) -> None:
+    """
+    Downcast feature columns in place to the smallest dtype that represents them exactly,
+    e.g. lags of a small integer column to int16.
+
+    :param data: The DataFrame holding the features.
+    :param names: The names of the feature columns.
+    """
+    downcast = {}
+    for name in names:
+        values = data[name].to_numpy()
+        dtype = compact_dtype(values)
+        if dtype != values.dtype:
+            downcast[name] = dtype
+    if downcast:
+        data[list(downcast)] = data[list(downcast)].astype(downcast)
+
+
+def uses_calendar_windows(schedule) -> bool:
+    """
+    Whether a window schedule needs the timestep frequency to be resolved.
+    """
+    if isinstance(schedule, str):
+        return schedule == "calendar"
+    return schedule is not None and any(isinstance(w, str) for w in schedule)
+
+
+def _timestep_duration(freq) -> pd.Timedelta:
+    if freq is None or isinstance(freq, (int, float, np.number)):
+        raise ValueError("Calendar windows need date or datetime timesteps")
+    offset = pd.tseries.frequencies.to_offset(freq)
+    # Average over many steps, so calendar offsets like month ends get their mean length
+    anchor = pd.Timestamp("2000-01-01")
+    return (anchor + 100 * offset - anchor) / 100
+
+
+def _calendar_window_size(unit: str, step: pd.Timedelta) -> int:
+    if unit not in CALENDAR_WINDOWS:
+        raise NotImplementedError(f"Calendar window {unit} not available")
+    return int(round(CALENDAR_WINDOWS[unit] / step))
+
+
+def get_window_sizes(
+    max_window_size: int,
+    schedule: Union[str, Sequence[Union[int, str]]] = None,
+    freq=None,
+) -> List[int]:
+    """
+    Resolve a window schedule into the window sizes features are generated for.
+
+    :param max_window_size: The largest window size of the 'linear', 'geometric' and
+        'calendar' schedules.
+    :param schedule: 'linear' (the default) for every window size from 1 to max_window_size,
+        'geometric' for 1, 2, 4, 8, ... and max_window_size itself, 'calendar' for the windows
+        spanning one minute, hour, day, week, month, quarter and year that fit in
+        max_window_size, or an explicit list of window sizes and names of CALENDAR_WINDOWS,
+        which is used as given.
+    :param freq: The step of the timesteps as a pandas offset alias, needed for calendar
+        windows.
+    :return: The sorted, distinct window sizes.
+    """
+    if max_window_size < 1:
+        raise ValueError("max_window_size must be a positive integer")
+    if schedule is None or schedule == "linear":
+        return list(range(1, max_window_size + 1))
+    if schedule == "geometric":
+        window_sizes = [2**k for k in range(max_window_size.bit_length())]
+        return sorted(set(window_sizes + [max_window_size]))
+    if schedule == "calendar":
+        step = _timestep_duration(freq)
+        window_sizes = [_calendar_window_size(unit, step) for unit in CALENDAR_WINDOWS]
+        window_sizes = [w for w in window_sizes if 1 <= w <= max_window_size]
+        if not window_sizes:
+            raise ValueError(
+                f"No calendar window fits in {max_window_size} steps of {freq}"
+            )
+        return sorted(set(window_sizes))
+    if isinstance(schedule, str):
+        raise NotImplementedError(f"Window schedule {schedule} not available")
+
+    window_sizes = []
+    for window in schedule:
+        if isinstance(window, str):
+            window = _calendar_window_size(window, _timestep_duration(freq))
+        if isinstance(window, bool) or int(window) != window or window < 1:
+            raise ValueError(f"Window sizes must be positive integers, got {window}")
+        window_sizes.append(int(window))
+    if not window_sizes:
+        raise ValueError("The window schedule must hold at least one window size")
+    return sorted(set(window_sizes))
+
+
+class TimeSeriesFeatureGenerator:
+    def __init__(
+        self,
+        max_window_size: int,
+        features: List[str] = None,
+        window_sizes: List[int] = None,
+        dtype=np.float64,
+    ):
+        """
+        Initialize the FeatureGenerator object.
+
+        :param max_window_size: The maximum window size for feature generation.
+        :param features: The window statistics to generate, from AVAILABLE_WINDOW_FEATURES,
+            defaults to WINDOW_FEATURES.
+        :param window_sizes: The window sizes to generate features for, e.g. from
+            get_window_sizes, defaults to every window size from 1 to max_window_size.
+        :param dtype: The float dtype of the generated features, e.g. np.float32 to halve
+            their memory.
+        """
+        self.max_window_size = max_window_size
+        self.features = check_window_features(features)
+        self.dtype = np.dtype(dtype)
+        self._window_sizes = get_window_sizes(
+            max_window_size, None if window_sizes is None else list(window_sizes)
+        )
+        self.generated_features = []
+        self.stream_states = {}
+
+    @property
+    def window_sizes(self) -> List[int]:
+        """
+        The window sizes features are generated for.
+        """
+        return list(self._window_sizes)
+
+    @property
+    def n_features(self) -> int:
+        """
+        The number of features generated per value column.
+        """
+        return len(self.features) * len(self.window_sizes)
+
+    def feature_names(self, value_column: str) -> List[str]:
+        """
+        The names of the features generated for a value column.
+
+        :param value_column: The name of the column containing the values.
+        :return: List of feature names, in the order of the rows of compute_features.
+        """
+        return window_feature_names(value_column, self.window_sizes, self.features)
+
+    def feature_specs(self, value_column: str) -> List[Tuple[str, str, int]]:
+        """
+        Describe the features generated for a value column.
+
+        :param value_column: The name of the column containing the values.
+        :return: List of (feature name, window statistic, window size) tuples, in the order of
+            feature_names.
+        """
+        return [
+            (f"{value_column}_{feature}_{window_size}", feature, window_size)
+            for window_size in self.window_sizes
+            for feature in self.features
+        ]
+
+    def compute_features(
+        self, data: pd.DataFrame, value_column: str, out: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Compute all window features for a value column without modifying the DataFrame.
+
+        :param data: The time series data as a Pandas DataFrame.
+        :param value_column: The name of the column containing the values.
+        :param out: Optional preallocated array of shape (n_features, len(data)).
+        :return: Array of shape (n_features, len(data)) of the generator dtype, one row per
+            feature.
+        """
+        values = data[value_column].to_numpy(dtype=np.float64, na_value=np.nan)
+        if out is None:
+            out = np.empty((self.n_features, len(data)), dtype=self.dtype)
+        return compute_window_features(
+            values, self.window_sizes, out=out, features=self.features
+        )
+
+    def compute_columns(
+        self,
+        data: pd.DataFrame,
+        value_columns: List[str],
+        out: Optional[np.ndarray] = None,
+        n_jobs: int = 1,
+    ) -> np.ndarray:
+        """
+        Compute all window features of several value columns into one block.
+
+        With n_jobs > 1, the columns are computed on a thread pool. The rolling kernels spend
+        their time in NumPy calls that release the GIL, and every column builds its window
+        statistics once and writes its own rows of the block, so the threads share no state.
+
+        :param data: The time series data as a Pandas DataFrame.
+        :param value_columns: The names of the columns containing the values.
+        :param out: Optional preallocated array of shape
+            (len(value_columns) * n_features, len(data)).
+        :param n_jobs: The number of threads.
+        :return: Array of shape (len(value_columns) * n_features, len(data)), the features of
+            each column in turn, in the order of feature_names.
+        """
+        if out is None:
+            out = np.empty(
+                (len(value_columns) * self.n_features, len(data)), dtype=self.dtype
+            )
+        tasks = [
+            (column, out[i * self.n_features : (i + 1) * self.n_features])
+            for i, column in enumerate(value_columns)
+        ]
+
+        def compute(task):
+            column, rows = task
+            values = data[column].to_numpy(dtype=np.float64, na_value=np.nan)
+            compute_window_features(
+                values, self.window_sizes, out=rows, features=self.features
+            )
+
+        if n_jobs == 1 or len(tasks) <= 1:
+            for task in tasks:
+                compute(task)
+        else:
+            with ThreadPoolExecutor(max_workers=min(n_jobs, len(tasks))) as executor:
+                # Consume the results, so errors of the tasks are raised
+                list(executor.map(compute, tasks))
+        return out
+
+    def generate_features(self, data: pd.DataFrame, value_column: str) -> List[str]:
+        """
+        Generate statistical features for the time series data.
+
+        :param data: The time series data as a Pandas DataFrame.
+        :param value_column: The name of the column containing the values.
+        :return: List of generated features (dataframe is modified in place)
+        """
+        self.generated_features = self.feature_names(value_column)
+        features = self.compute_features(data, value_column)
+        data[self.generated_features] = pd.DataFrame(
+            features.T, index=data.index, columns=self.generated_features, copy=False
+        )
+
+        return self.generated_features
+
+    def update(self, new_rows: pd.DataFrame, value_columns: List[str]) -> pd.DataFrame:
+        """
+        Generate features for newly appended timesteps of a series in incremental mode.
+
+        The generator keeps a bounded buffer of trailing values for every value column across
+        calls, so each call costs about as much as generate_features on the new rows. Feeding
+        a series through update in any number of chunks gives the same features as
+        generate_features on the whole series.
+
+        :param new_rows: The appended rows, in timestep order.
+        :param value_columns: The names of the columns containing the values.
+        :return: DataFrame with the generated features of the new rows, indexed like new_rows.
+        """
+        features = []
+        columns = []
+        for value_column in value_columns:
+            if value_column not in self.stream_states:
+                self.stream_states[value_column] = RollingWindowState(
+                    max(self.window_sizes), self.features
+                )
+            values = new_rows[value_column].to_numpy(dtype=np.float64, na_value=np.nan)
+            features.append(
+                self.stream_states[value_column].update(values, self.window_sizes)
+            )
+            columns += self.feature_names(value_column)
+
+        return pd.DataFrame(
+            np.hstack(features) if features else np.empty((len(new_rows), 0)),
+            index=new_rows.index,
+            columns=columns,
+            dtype=self.dtype,
+        )
+
+    def reset_state(self) -> None:
+        """
+        Clear the incremental state, so the next update starts a new series.
+        """
+        self.stream_states = {}
+
+
+# Number of rows the correlations of the pair prefilter are estimated on
+PAIR_PREFILTER_ROWS = 100_000
+# Number of column pairs kept by the pair prefilter by default
+DEFAULT_MAX_PAIRS = 10
+
+
+def select_column_pairs(
+    data: pd.DataFrame, columns: List[str], max_pairs: int = None
+) -> List[Tuple[str, str]]:
+    """
+    Prefilter the column pairs to generate pair features for, keeping the max_pairs pairs
+    with the strongest absolute correlation over the whole series.
+
+    All correlations come from one matrix product over up to PAIR_PREFILTER_ROWS rows spread
+    evenly over the series, with missing values counted as the column mean.
+
+    :param data: The time series data as a Pandas DataFrame.
+    :param columns: The names of the columns to pair up.
+    :param max_pairs: The maximum number of pairs, or None to keep all pairs.
+    :return: List of (first, second) column name pairs, in the order of columns.
+    """
+    columns = list(dict.fromkeys(columns))
+    pairs = [(i, j) for i in range(len(columns)) for j in range(i + 1, len(columns))]
+    if max_pairs is not None and len(pairs) > max_pairs:
+        stride = max(len(data) // PAIR_PREFILTER_ROWS, 1)
+        values = (
+            data[columns].iloc[::stride].to_numpy(dtype=np.float64, na_value=np.nan)
+        )
+        values = values - np.nanmean(values, axis=0)
+        values[np.isnan(values)] = 0.0
+        covariance = values.T @ values
+        scale = np.sqrt(np.diag(covariance))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlation = np.abs(covariance / np.outer(scale, scale))
+        # Pairs with a constant column have no correlation and rank last
+        correlation[np.isnan(correlation)] = -1.0
+        scores = np.array([correlation[i, j] for i, j in pairs])
+        keep = np.sort(np.argsort(-scores, kind="stable")[:max_pairs])
+        pairs = [pairs[k] for k in keep]
+    return [(columns[i], columns[j]) for i, j in pairs]
+
+
+class PairFeatureGenerator:
+    def __init__(
+        self,
+        max_window_size: int,
+        features: List[str] = None,
+        window_sizes: List[int] = None,
+        dtype=np.float64,
+    ):
+        """
+        Generates rolling covariances, correlations, lagged ratios and spreads between pairs
+        of columns, computing all pairs together instead of one pandas call per pair.
+
+        :param max_window_size: The maximum window size for feature generation.
+        :param features: The pair statistics to generate, from PAIR_FEATURES, defaults to
+            all of them.
+        :param window_sizes: The window sizes to generate features for, defaults to every
+            window size from 1 to max_window_size.
+        :param dtype: The float dtype of the generated features.
+        """
+        self.max_window_size = max_window_size
+        self.features = check_pair_features(features)
+        self.dtype = np.dtype(dtype)
+        self.window_sizes = get_window_sizes(
+            max_window_size, None if window_sizes is None else list(window_sizes)
+        )
+
+    def feature_names(self, pairs: List[Tuple[str, str]]) -> List[str]:
+        """
+        The names of the features generated for column pairs.
+
+        :param pairs: The (first, second) column name pairs.
+        :return: List of feature names, in the order of the rows of compute_features.
+        """
+        return pair_feature_names(pairs, self.window_sizes, self.features)
+
+    def feature_specs(
+        self, pairs: List[Tuple[str, str]]
+    ) -> List[Tuple[str, str, str, str, int]]:
+        """
+        Describe the features generated for column pairs.
+
+        :param pairs: The (first, second) column name pairs.
+        :return: List of (feature name, first column, second column, pair statistic, window
+            size) tuples, in the order of feature_names.
+        """
+        return [
+            (
+                f"{first}_{second}_{feature}_{window_size}",
+                first,
+                second,
+                feature,
+                window_size,
+            )
+            for first, second in pairs
+            for window_size in self.window_sizes
+            for feature in self.features
+        ]
+
+    def compute_features(
+        self,
+        data: pd.DataFrame,
+        pairs: List[Tuple[str, str]],
+        out: Optional[np.ndarray] = None,
+    ) -> np.ndarray:
+        """
+        Compute the features of column pairs without modifying the DataFrame.
+
+        :param data: The time series data as a Pandas DataFrame.
+        :param pairs: The (first, second) column name pairs.
+        :param out: Optional preallocated array of shape (len(feature_names), len(data)).
+        :return: Array with one row per feature, in the order of feature_names.
+        """
+        columns = list(dict.fromkeys(column for pair in pairs for column in pair))
+        position = {column: i for i, column in enumerate(columns)}
+        values = np.empty((len(columns), len(data)), dtype=np.float64)
+        for column, row in zip(columns, values):
+            row[:] = data[column].to_numpy(dtype=np.float64, na_value=np.nan)
+        if out is None:
+            out = np.empty((len(self.feature_names(pairs)), len(data)), self.dtype)
+        return compute_pair_features(
+            values,
+            [(position[first], position[second]) for first, second in pairs],
+            self.window_sizes,
+            out=out,
+            features=self.features,
+        )
+
+    def generate_features(
+        self, data: pd.DataFrame, pairs: List[Tuple[str, str]]
+    ) -> List[str]:
+        """
+        Generate the features of column pairs.
+
+        :param data: The time series data as a Pandas DataFrame.
+        :param pairs: The (first, second) column name pairs.
+        :return: List of generated features (dataframe is modified in place)
+        """
+        names = self.feature_names(pairs)
+        features = self.compute_features(data, pairs)
+        data[names] = pd.DataFrame(
+            features.T, index=data.index, columns=names, copy=False
+        )
+        return names
+
+
+class FeatureCandidates:
+    def __init__(
+        self,
+        data: pd.DataFrame,
+        value_columns: List[str],
+        feature_generator: TimeSeriesFeatureGenerator,
+        impute_strategy: str = "last",
+    ):
+        """
+        Lazily computed feature candidates, so only the features that survive selection are
+        ever attached to the data.
+
+        :param data: The time series data as a Pandas DataFrame.
+        :param value_columns: The names of the columns to generate candidates from.
+        :param feature_generator: The generator defining the candidate features.
+        :param impute_strategy: Strategy for imputing missing values of computed features.
+        """
+        self.data = data
+        self.value_columns = value_columns
+        self.feature_generator = feature_generator
+        self.imputer = get_value_imputation_strategy(impute_strategy)
+        self.specs = {
+            name: (value_column, feature, window_size)
+            for value_column in value_columns
+            for name, feature, window_size in feature_generator.feature_specs(
+                value_column
+            )
+        }
+
+    @property
+    def names(self) -> List[str]:
+        """
+        The names of all candidate features.
+        """
+        return list(self.specs)
+
+    def iter_chunks(self, chunk_size: int) -> Iterator[pd.DataFrame]:
+        """
+        Compute the candidates a chunk of columns at a time.
+
+        :param chunk_size: The maximum number of candidate columns per chunk.
+        :return: Iterator over DataFrames of imputed candidate features, indexed like data.
+        """
+        if chunk_size < 1:
+            raise ValueError("chunk_size must be a positive integer")
+        window_features = self.feature_generator.features
+        windows_per_chunk = max(1, chunk_size // len(window_features))
+        pieces = [
+            (value_column, window_size)
+            for value_column in self.value_columns
+            for window_size in self.feature_generator.window_sizes
+        ]
+        for start in range(0, len(pieces), windows_per_chunk):
+            chunk = pieces[start : start + windows_per_chunk]
+            features = np.empty(
+                (len(window_features) * len(chunk), len(self.data)),
+                dtype=self.feature_generator.dtype,
+            )
+            names = []
+            row = 0
+            # Compute the windows of each value column in the chunk together
+            for value_column in dict.fromkeys(column for column, _ in chunk):
+                chunk_windows = [w for column, w in chunk if column == value_column]
+                n_rows = len(window_features) * len(chunk_windows)
+                values = self.data[value_column].to_numpy(
+                    dtype=np.float64, na_value=np.nan
+                )
+                compute_window_features(
+                    values,
+                    chunk_windows,
+                    out=features[row : row + n_rows],
+                    features=window_features,
+                )
+                names += window_feature_names(
+                    value_column, chunk_windows, window_features
+                )
+                row += n_rows
+            yield self._to_frame(features, names)
+
+    def compute(self, names: List[str]) -> pd.DataFrame:
+        """
+        Compute the named candidates only.
+
+        :param names: The names of the candidate features to compute.
+        :return: DataFrame of imputed candidate features, indexed like data.
+        """
+        features = np.empty(
+            (len(names), len(self.data)), dtype=self.feature_generator.dtype
+        )
+        for i, name in enumerate(names):
+            value_column, feature, window_size = self.specs[name]
+            values = self.data[value_column].to_numpy(dtype=np.float64, na_value=np.nan)
+            features[i] = compute_window_feature(values, feature, window_size)
+        return self._to_frame(features, names)
+
+    def _to_frame(self, features: np.ndarray, names: List[str]) -> pd.DataFrame:
+        frame = pd.DataFrame(
+            features.T, index=self.data.index, columns=names, copy=False
+        )
+        return self.imputer.impute(frame)
+
+
+# Example usage in the TimeSeriesData class
+# feature_generator = FeatureGenerator(max_window_size)
+# data_with_features = feature_generator.generate_features(ts_data.data, ts_data.value_column)
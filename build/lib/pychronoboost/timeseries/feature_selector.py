@@ -0,0 +1,615 @@
+from abc import ABC, abstractmethod
+import time
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import lars_path
+from xgboost import XGBRegressor
+from typing import Iterable, List
+
+
+def feature_matrix(
+    data: pd.DataFrame, columns: List[str], dtype=np.float64, rows=None
+) -> np.ndarray:
+    """
+    Copy feature columns into one C-contiguous (rows, features) matrix, column by column, so
+    no intermediate frame or float64 copy of compact columns is made.
+
+    :param data: The DataFrame holding the features.
+    :param columns: The names of the feature columns.
+    :param dtype: The dtype of the matrix.
+    :param rows: Optional slice or boolean mask of the rows to copy, all rows by default.
+    :return: The feature matrix.
+    """
+    if rows is None:
+        rows = slice(None)
+    n_rows = len(range(len(data))[rows]) if isinstance(rows, slice) else rows.sum()
+    matrix = np.empty((n_rows, len(columns)), dtype=dtype)
+    for i, column in enumerate(columns):
+        matrix[:, i] = data[column].to_numpy()[rows]
+    return matrix
+
+
+def complete_rows(data: pd.DataFrame, columns: List[str], start: int = 0):
+    """
+    Find the rows without missing values in the given columns, from row start on.
+
+    :param data: The DataFrame to check.
+    :param columns: The names of the columns to check, other columns are ignored.
+    :param start: The number of leading rows to leave out.
+    :return: A slice of the rows from start on if all of them are complete, so they can be
+        used without a copy, or else a boolean mask of the complete rows.
+    """
+    complete = None
+    for column in columns:
+        missing = data[column].isna().to_numpy()[start:]
+        if missing.any():
+            complete = ~missing if complete is None else complete & ~missing
+    if complete is None:
+        return slice(start, None)
+    mask = np.zeros(len(data), dtype=bool)
+    mask[start:] = complete
+    return mask
+
+
+class FeatureSelectionStrategy(ABC):
+    # The dtype of the feature matrix handed to rank_matrix
+    matrix_dtype = np.float64
+    # Whether rows with missing feature values are ranked as they are, instead of left out
+    keep_missing = False
+
+    def __init__(self, num_features: int):
+        """
+        Initialize the feature selector.
+
+        :param num_features: Number of top features to select.
+        """
+        self.num_features = num_features
+
+    @abstractmethod
+    def rank_features(self, X: pd.DataFrame, y: pd.Series) -> pd.Series:
+        """
+        Score the importance of every feature.
+
+        :param X: The DataFrame of features, without missing values.
+        :param y: The target values.
+        :return: Series of importance scores indexed by feature name.
+        """
+        pass
+
+    def rank_matrix(
+        self, X: np.ndarray, y: np.ndarray, feature_names: List[str]
+    ) -> pd.Series:
+        """
+        Score the importance of every feature of a feature matrix.
+
+        :param X: The (rows, features) matrix of features, without missing values.
+        :param y: The target values.
+        :param feature_names: The names of the columns of X.
+        :return: Series of importance scores indexed by feature name.
+        """
+        return self.rank_features(
+            pd.DataFrame(X, columns=feature_names, copy=False), pd.Series(y)
+        )
+
+    def rank_columns(
+        self,
+        data: pd.DataFrame,
+        feature_columns: List[str],
+        target_column: str,
+        warmup_rows: int = 0,
+    ) -> pd.Series:
+        """
+        Score the importance of feature columns of a DataFrame.
+
+        Only missing values of the feature and target columns leave a row out, or of the
+        target alone with keep_missing. No copy is made other than the feature matrix.
+
+        :param data: The DataFrame containing features and target.
+        :param feature_columns: The names of the feature columns.
+        :param target_column: The name of the target column.
+        :param warmup_rows: The number of leading rows to leave out, e.g. max_window_size - 1
+            rows whose windows are not yet full.
+        :return: Series of importance scores indexed by feature name.
+        """
+        checked = [target_column]
+        if not self.keep_missing:
+            checked = feature_columns + checked
+        rows = complete_rows(data, checked, warmup_rows)
+        X = feature_matrix(data, feature_columns, self.matrix_dtype, rows)
+        y = data[target_column].to_numpy(dtype=np.float64, na_value=np.nan)[rows]
+        return self.rank_matrix(X, y, feature_columns)
+
+    def select_features(
+        self,
+        data: pd.DataFrame,
+        feature_columns: List[str],
+        target_column: str,
+        timestamp_column: str,
+        original_feature_columns: List[str] = [],
+        warmup_rows: int = 0,
+    ) -> List[str]:
+        """
+        Select important features from the data.
+
+        :param data: The DataFrame containing features and target.
+        :param feature_columns: The names of all feature columns in a list
+        :param target_column: The name of the target column.
+        :param timestamp_column: The name of the timestamp column.
+        :original_feature_columns: The names of the original feature columns in a list
+        :param warmup_rows: The number of leading rows to leave out of the ranking.
+        :return: The names of the selected features (dataframe is modified in place)
+        """
+        # Get feature importances and select top features
+        importance = self.rank_columns(
+            data, feature_columns, target_column, warmup_rows
+        )
+        selected_features = importance.nlargest(self.num_features).index.tolist()
+
+        # Include the timestamp column and target column in the final DataFrame
+        columns_to_keep = (
+            [timestamp_column]
+            + selected_features
+            + [target_column]
+            + original_feature_columns
+        )
+        columns_to_drop = [col for col in data.columns if col not in columns_to_keep]
+
+        data.drop(columns=columns_to_drop, inplace=True)
+
+        return selected_features
+
+    def select_from_chunks(
+        self,
+        data: pd.DataFrame,
+        feature_chunks: Iterable[pd.DataFrame],
+        target_column: str,
+        warmup_rows: int = 0,
+    ) -> List[str]:
+        """
+        Select important features from candidates that are computed a chunk at a time.
+
+        Every chunk is ranked together with the features kept so far, and only the top
+        features are carried over to the next chunk. At most num_features + chunk size
+        candidate columns are held in memory at once.
+
+        :param data: The DataFrame containing the target, indexed like the chunks.
+        :param feature_chunks: DataFrames of candidate features.
+        :param target_column: The name of the target column.
+        :param warmup_rows: The number of leading rows to leave out of the ranking.
+        :return: The names of the selected features.
+        """
+        survivors = pd.DataFrame(index=data.index)
+        for chunk in feature_chunks:
+            candidates = pd.concat([survivors, chunk], axis=1)
+            candidates[target_column] = data[target_column]
+            importance = self.rank_columns(
+                candidates, candidates.columns[:-1].tolist(), target_column, warmup_rows
+            )
+            selected_features = importance.nlargest(self.num_features).index.tolist()
+            survivors = candidates[selected_features]
+
+        return survivors.columns.tolist()
+
+
+def temporal_sample(n_rows: int, max_rows: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    Sample row positions stratified by time, so every period of the series, including the
+    most recent one, is represented.
+
+    The rows are split into max_rows contiguous strata and one row is drawn from each.
+
+    :param n_rows: The number of rows, in time order.
+    :param max_rows: The number of rows to sample.
+    :param rng: The random generator to sample with.
+    :return: Sorted row positions.
+    """
+    if max_rows >= n_rows:
+        return np.arange(n_rows)
+    offsets = rng.random(max_rows)
+    return ((np.arange(max_rows) + offsets) * n_rows / max_rows).astype(np.int64)
+
+
+class XGBoostFeatureSelector(FeatureSelectionStrategy):
+    # XGBoost trains on float32 values, so a float32 matrix is used as is instead of copied
+    matrix_dtype = np.float32
+
+    def __init__(
+        self,
+        num_features: int,
+        max_rows: int = None,
+        n_subsamples: int = 1,
+        early_stopping_rounds: int = None,
+        validation_fraction: float = 0.2,
+        tree_method: str = "hist",
+        n_jobs: int = None,
+        random_state: int = 0,
+        keep_missing: bool = False,
+        **xgb_params,
+    ):
+        """
+        Initialize XGBoostFeatureSelector.
+
+        :param num_features: Number of top features to select.
+        :param max_rows: Optional budget of rows to fit on, sampled stratified by time.
+        :param n_subsamples: Number of subsamples to rank on. With more than one, importances
+            are averaged over subsamples of max_rows rows (half the rows if not set) for a more
+            stable ranking.
+        :param early_stopping_rounds: If set, stop boosting once the error on the most recent
+            validation_fraction of the rows has not improved for this many rounds.
+        :param validation_fraction: Fraction of the rows held out for early stopping.
+        :param tree_method: The XGBoost tree construction algorithm.
+        :param n_jobs: Number of threads XGBoost uses, defaults to all cores.
+        :param random_state: Seed for row sampling and the XGBoost model.
+        :param keep_missing: If set, rows with missing feature values are kept and XGBoost
+            learns which way missing values go at every split, instead of leaving them out.
+        :param xgb_params: Further XGBRegressor parameters.
+        """
+        super().__init__(num_features)
+        if n_subsamples < 1:
+            raise ValueError("n_subsamples must be a positive integer")
+        if not 0 < validation_fraction < 1:
+            raise ValueError("validation_fraction must be between 0 and 1")
+        self.max_rows = max_rows
+        self.n_subsamples = n_subsamples
+        self.early_stopping_rounds = early_stopping_rounds
+        self.validation_fraction = validation_fraction
+        self.tree_method = tree_method
+        self.n_jobs = n_jobs
+        self.random_state = random_state
+        self.keep_missing = keep_missing
+        self.xgb_params = xgb_params
+
+    def rank_features(self, X: pd.DataFrame, y: pd.Series) -> pd.Series:
+        """
+        Score the importance of every feature with an XGBoost model.
+
+        :param X: The DataFrame of features, without missing values.
+        :param y: The target values.
+        :return: Series of feature importances indexed by feature name.
+        """
+        return self.rank_matrix(
+            feature_matrix(X, X.columns, self.matrix_dtype),
+            y.to_numpy(),
+            X.columns.tolist(),
+        )
+
+    def rank_matrix(
+        self, X: np.ndarray, y: np.ndarray, feature_names: List[str]
+    ) -> pd.Series:
+        """
+        Score the importance of every feature of a feature matrix with an XGBoost model.
+
+        :param X: The (rows, features) matrix of features, without missing values.
+        :param y: The target values.
+        :param feature_names: The names of the columns of X.
+        :return: Series of feature importances indexed by feature name.
+        """
+        rng = np.random.default_rng(self.random_state)
+        if self.n_subsamples == 1:
+            if self.max_rows is None:
+                return self._fit_importance(X, y, feature_names)
+            rows = temporal_sample(len(X), self.max_rows, rng)
+            return self._fit_importance(X[rows], y[rows], feature_names)
+
+        sample_size = self.max_rows if self.max_rows is not None else len(X) // 2
+        importance = pd.Series(0.0, index=feature_names)
+        for _ in range(self.n_subsamples):
+            rows = temporal_sample(len(X), max(sample_size, 1), rng)
+            subsample_importance = self._fit_importance(X[rows], y[rows], feature_names)
+            total = subsample_importance.sum()
+            if total > 0:
+                importance += subsample_importance / total
+        return importance / self.n_subsamples
+
+    def _fit_importance(
+        self, X: np.ndarray, y: np.ndarray, feature_names: List[str]
+    ) -> pd.Series:
+        model = XGBRegressor(
+            tree_method=self.tree_method,
+            n_jobs=self.n_jobs,
+            random_state=self.random_state,
+            early_stopping_rounds=self.early_stopping_rounds,
+            **self.xgb_params,
+        )
+        if self.early_stopping_rounds is None:
+            model.fit(X, y)
+        else:
+            # Hold out the most recent rows, as the model is used to predict forward in time
+            n_train = min(
+                max(int(len(X) * (1 - self.validation_fraction)), 1), len(X) - 1
+            )
+            model.fit(
+                X[:n_train],
+                y[:n_train],
+                eval_set=[(X[n_train:], y[n_train:])],
+                verbose=False,
+            )
+        return pd.Series(model.feature_importances_, index=feature_names)
+
+
+class HistogramBoostingFeatureSelector(XGBoostFeatureSelector):
+    def __init__(
+        self,
+        num_features: int,
+        max_bin: int = 32,
+        n_estimators: int = 30,
+        **selector_options,
+    ):
+        """
+        Initialize HistogramBoostingFeatureSelector, a LightGBM-style boosted model on coarse
+        feature histograms that trades some ranking accuracy for a much faster fit. Features
+        are scored by the total gain of their splits.
+
+        :param num_features: Number of top features to select.
+        :param max_bin: Number of histogram bins per feature.
+        :param n_estimators: Number of boosting rounds.
+        :param selector_options: Further XGBoostFeatureSelector options.
+        """
+        selector_options.setdefault("importance_type", "total_gain")
+        super().__init__(
+            num_features,
+            tree_method="hist",
+            max_bin=max_bin,
+            n_estimators=n_estimators,
+            **selector_options,
+        )
+
+
+class CorrelationFeatureSelector(FeatureSelectionStrategy):
+    def rank_features(self, X: pd.DataFrame, y: pd.Series) -> pd.Series:
+        """
+        Score every feature by its absolute Pearson correlation with the target.
+
+        :param X: The DataFrame of features, without missing values.
+        :param y: The target values.
+        :return: Series of absolute correlations indexed by feature name.
+        """
+        X_centered = X.to_numpy(dtype=np.float64)
+        X_centered = X_centered - X_centered.mean(axis=0)
+        y_centered = y.to_numpy(dtype=np.float64)
+        y_centered = y_centered - y_centered.mean()
+
+        covariance = y_centered @ X_centered
+        scale = np.sqrt((X_centered**2).sum(axis=0) * (y_centered**2).sum())
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlation = np.where(scale > 0, np.abs(covariance) / scale, 0.0)
+        return pd.Series(correlation, index=X.columns)
+
+
+def min_ranks(values: np.ndarray) -> np.ndarray:
+    """
+    Rank values along the first axis from 0, where tied values share their lowest rank.
+
+    :param values: 1-D or 2-D array without missing values.
+    :return: Integer array of the same shape with the rank of every value.
+    """
+    order = np.argsort(values, axis=0, kind="stable")
+    ordered = np.take_along_axis(values, order, axis=0)
+    positions = np.arange(len(values)).reshape((-1,) + (1,) * (values.ndim - 1))
+    # Every value takes the position of the first value of its run of ties
+    starts = np.ones(ordered.shape, dtype=bool)
+    starts[1:] = ordered[1:] != ordered[:-1]
+    first = np.maximum.accumulate(np.where(starts, positions, 0), axis=0)
+    ranks = np.empty(values.shape, dtype=np.int64)
+    np.put_along_axis(ranks, order, first, axis=0)
+    return ranks
+
+
+class MutualInformationFeatureSelector(FeatureSelectionStrategy):
+    def __init__(self, num_features: int, n_bins: int = 16):
+        """
+        Initialize MutualInformationFeatureSelector.
+
+        :param num_features: Number of top features to select.
+        :param n_bins: Number of quantile bins used to discretize features and target.
+        """
+        super().__init__(num_features)
+        self.n_bins = n_bins
+
+    def _quantile_bins(self, values: np.ndarray) -> np.ndarray:
+        # Tied values share a rank, so constant columns end up in a single bin
+        ranks = min_ranks(values)
+        return (ranks * self.n_bins // len(values)).astype(np.int64)
+
+    def rank_features(self, X: pd.DataFrame, y: pd.Series) -> pd.Series:
+        """
+        Score every feature by its mutual information with the target, estimated from the
+        joint histogram of quantile binned values.
+
+        :param X: The DataFrame of features, without missing values.
+        :param y: The target values.
+        :return: Series of mutual information scores (in nats) indexed by feature name.
+        """
+        n_rows, n_columns = X.shape
+        if n_rows == 0:
+            return pd.Series(0.0, index=X.columns)
+        n_bins = self.n_bins
+        x_bins = self._quantile_bins(X.to_numpy(dtype=np.float64))
+        y_bins = self._quantile_bins(y.to_numpy(dtype=np.float64))
+
+        # Joint histograms of all features with the target, from one bincount
+        codes = (
+            np.arange(n_columns) * n_bins * n_bins + x_bins * n_bins + y_bins[:, None]
+        )
+        joint = np.bincount(codes.ravel(), minlength=n_columns * n_bins * n_bins)
+        joint = joint.reshape(n_columns, n_bins, n_bins) / n_rows
+
+        x_marginal = joint.sum(axis=2, keepdims=True)
+        y_marginal = joint.sum(axis=1, keepdims=True)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            terms = joint * np.log(joint / (x_marginal * y_marginal))
+        mutual_information = np.nansum(terms, axis=(1, 2))
+        return pd.Series(mutual_information, index=X.columns)
+
+
+class L1FeatureSelector(FeatureSelectionStrategy):
+    def rank_features(self, X: pd.DataFrame, y: pd.Series) -> pd.Series:
+        """
+        Score every feature by how early it enters the L1-regularized (lasso) path of a linear
+        model on standardized data. Features that never enter the path score 0.
+
+        :param X: The DataFrame of features, without missing values.
+        :param y: The target values.
+        :return: Series of scores indexed by feature name.
+        """
+        X_values = X.to_numpy(dtype=np.float64)
+        X_values = X_values - X_values.mean(axis=0)
+        scale = X_values.std(axis=0)
+        X_values /= np.where(scale > 0, scale, 1.0)
+        y_values = y.to_numpy(dtype=np.float64)
+        y_values = y_values - y_values.mean()
+
+        _, _, coefs = lars_path(
+            X_values,
+            y_values,
+            method="lasso",
+            max_iter=max(2 * self.num_features, 10),
+        )
+        n_steps = coefs.shape[1]
+        active = coefs != 0
+        first_active = np.where(active.any(axis=1), active.argmax(axis=1), n_steps)
+        return pd.Series((n_steps - first_active).astype(np.float64), index=X.columns)
+
+
+class SuccessiveHalvingFeatureSelector(FeatureSelectionStrategy):
+    def __init__(
+        self,
+        num_features: int,
+        base_selector: str = "XGB",
+        min_rows: int = 1000,
+        keep_fraction: float = 0.5,
+        row_growth: float = 2.0,
+        random_state: int = 0,
+        **selector_options,
+    ):
+        """
+        Initialize SuccessiveHalvingFeatureSelector, which ranks all candidates on a small row
+        subsample, keeps the top fraction, and re-ranks the survivors on progressively more
+        rows until num_features remain. Total compute is a small multiple of one fit on
+        min_rows rows.
+
+        :param num_features: Number of top features to select.
+        :param base_selector: Name of the selector used to rank each round.
+        :param min_rows: Number of rows the first round is ranked on.
+        :param keep_fraction: Fraction of the candidates kept after each round.
+        :param row_growth: Factor the number of rows grows by after each round.
+        :param random_state: Seed for row sampling.
+        :param selector_options: Further options of the base selector.
+        """
+        super().__init__(num_features)
+        if not 0 < keep_fraction < 1:
+            raise ValueError("keep_fraction must be between 0 and 1")
+        if row_growth < 1:
+            raise ValueError("row_growth must be at least 1")
+        self.base_selector = get_feature_selector(
+            base_selector, num_features, **selector_options
+        )
+        self.min_rows = min_rows
+        self.keep_fraction = keep_fraction
+        self.row_growth = row_growth
+        self.random_state = random_state
+
+    def rank_features(self, X: pd.DataFrame, y: pd.Series) -> pd.Series:
+        """
+        Score every feature by the number of rounds it survived, then by its rank in the last
+        round it took part in.
+
+        :param X: The DataFrame of features, without missing values.
+        :param y: The target values.
+        :return: Series of scores indexed by feature name.
+        """
+        rng = np.random.default_rng(self.random_state)
+        scores = pd.Series(0.0, index=X.columns)
+        survivors = X.columns.tolist()
+        n_rows = self.min_rows
+        round_number = 0
+        while True:
+            rows = temporal_sample(len(X), min(int(n_rows), len(X)), rng)
+            importance = self.base_selector.rank_features(
+                X.iloc[rows, X.columns.get_indexer(survivors)], y.iloc[rows]
+            )
+            scores[survivors] = round_number + importance.rank(pct=True)
+
+            n_keep = max(self.num_features, int(len(survivors) * self.keep_fraction))
+            if n_keep >= len(survivors):
+                break
+            survivors = importance.nlargest(n_keep).index.tolist()
+            if n_keep == self.num_features:
+                scores[survivors] += 1
+                break
+            n_rows *= self.row_growth
+            round_number += 1
+
+        return scores
+
+
+def get_feature_selector(
+    selector_model: str, num_features: int, **selector_options
+) -> FeatureSelectionStrategy:
+    """
+    Finds the corresponding the feature selection class method
+
+    :param selector_model: name of the feature selector model
+    :param num_features: Max number of features to be returned after feature selection
+    :param selector_options: Further options of the feature selector, e.g. max_rows or n_jobs
+        for the XGB selector
+    :return: feature selection class corresponding to input selector_model
+    """
+    feature_selectors = {
+        "XGB": XGBoostFeatureSelector,
+        "HIST": HistogramBoostingFeatureSelector,
+        "CORR": CorrelationFeatureSelector,
+        "MI": MutualInformationFeatureSelector,
+        "L1": L1FeatureSelector,
+        "HALVING": SuccessiveHalvingFeatureSelector,
+    }
+    if selector_model not in feature_selectors:
+        raise NotImplementedError(f"Feature Selector {selector_model} not available")
+    return feature_selectors[selector_model](num_features, **selector_options)
+
+
+def benchmark_feature_selectors(
+    X: pd.DataFrame,
+    y: pd.Series,
+    num_features: int,
+    selector_models: List[str] = None,
+    reference_model: str = "XGB",
+) -> pd.DataFrame:
+    """
+    Compare the runtime of feature selectors, and how much their selections agree.
+
+    :param X: The DataFrame of candidate features, without missing values.
+    :param y: The target values.
+    :param num_features: Number of top features each selector selects.
+    :param selector_models: Names of the selectors to compare, defaults to all of them.
+    :param reference_model: Name of the selector the overlap is measured against.
+    :return: DataFrame indexed by selector name, with the runtime in seconds, the selected
+        features, and the fraction of the reference selector's features also selected.
+    """
+    if selector_models is None:
+        selector_models = ["XGB", "HIST", "CORR", "MI", "L1"]
+    if reference_model not in selector_models:
+        selector_models = [reference_model] + list(selector_models)
+
+    results = {}
+    for selector_model in selector_models:
+        feature_selector = get_feature_selector(selector_model, num_features)
+        start = time.perf_counter()
+        importance = feature_selector.rank_features(X, y)
+        seconds = time.perf_counter() - start
+        results[selector_model] = {
+            "seconds": seconds,
+            "selected_features": importance.nlargest(num_features).index.tolist(),
+        }
+
+    reference = set(results[reference_model]["selected_features"])
+    for result in results.values():
+        overlap = reference.intersection(result["selected_features"])
+        result["overlap"] = len(overlap) / max(len(reference), 1)
+
+    return pd.DataFrame.from_dict(results, orient="index")
+
+
+# Example usage
+# feature_selector = XGBoostFeatureSelector(num_features=10)
+# selected_data = feature_selector.select_features(ts_data.data, ts_data.value_column, ts_data.timestep_column)
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+TIMESTEP_INTEGER = "integer"
+TIMESTEP_FLOAT = "float"
+TIMESTEP_DATE = "date"
+TIMESTEP_DATETIME = "datetime"
+
+
+def is_midnight(timestamps: pd.Series) -> bool:
+    """
+    Check whether all timestamps of a datetime Series fall on midnight, ignoring missing ones.
+
+    :param timestamps: A Series with a datetime64 dtype, naive or timezone-aware.
+    :return: True if every non-missing timestamp is at midnight local time.
+    """
+    if timestamps.dt.tz is not None:
+        timestamps = timestamps.dt.tz_localize(None)
+    values = timestamps.to_numpy()
+    # The number of ticks per day of the datetime64 unit, e.g. 's' or 'ns'
+    unit, count = np.datetime_data(values.dtype)
+    ticks_per_day = np.timedelta64(1, "D") // np.timedelta64(count, unit)
+    ticks = values.view(np.int64)
+    ticks = ticks[ticks != pd.NaT.value]
+    return not np.any(np.mod(ticks, ticks_per_day))
+
+
+def check_timeseries_type(
+    data: pd.DataFrame,
+    column: str,
+    sample_size: int = None,
+    datetime_format: str = None,
+) -> str:
+    """
+    Check the type of a timeseries column in a DataFrame.
+
+    Columns that are not numeric are converted to datetimes in place.
+
+    :param data: The DataFrame containing the timeseries data.
+    :param column: The name of the column to check.
+    :param sample_size: If set, a column that still needs converting is first tried on this
+        many evenly spaced values, so unconvertible columns fail without parsing every row.
+    :param datetime_format: Optional strftime format of the values, which makes converting
+        strings much faster than inferring the format.
+    :return: The type of the timeseries column ('date', 'datetime', 'integer', or 'float').
+    :raises ValueError: If the column type is not supported or cannot be converted.
+    """
+    if column not in data.columns:
+        raise ValueError(f"The column '{column}' is not in the DataFrame.")
+
+    values = data[column]
+    if pd.api.types.is_integer_dtype(values):
+        return TIMESTEP_INTEGER
+    elif pd.api.types.is_float_dtype(values):
+        return TIMESTEP_FLOAT
+
+    if not pd.api.types.is_datetime64_any_dtype(values):
+        try:
+            if sample_size is not None and len(values) > sample_size:
+                positions = np.linspace(0, len(values) - 1, sample_size).astype(
+                    np.int64
+                )
+                pd.to_datetime(values.iloc[positions], format=datetime_format)
+            values = pd.to_datetime(values, format=datetime_format)
+        except (ValueError, TypeError):
+            raise ValueError(
+                "The column must contain integers, floats, or be convertible to dates/datetime."
+            )
+        data[column] = values
+
+    # Dates are datetimes that all fall on midnight
+    if is_midnight(values):
+        return TIMESTEP_DATE
+    return TIMESTEP_DATETIME
+
+
+# Example usage in TimeSeriesData class:
+# ts_type = check_timeseries_type(self.data, self.timestep_column)
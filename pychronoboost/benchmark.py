@@ -0,0 +1,383 @@
+"""
+Benchmark suite of the pipeline stages on synthetic series, tracking throughput and peak
+memory over time and flagging regressions against earlier runs.
+
+Run it with e.g.
+
+    python -m pychronoboost.benchmark --rows 100000 1000000 --history benchmarks.jsonl
+
+which appends the results to the history file and exits with status 1 if any case got
+slower or used more memory than before.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from pychronoboost.impute.timestep_impute import get_timestep_imputation_strategy
+from pychronoboost.impute.value_impute import get_value_imputation_strategy
+from pychronoboost.timeseries.data import TimeSeriesData
+from pychronoboost.timeseries.feature_generator import TimeSeriesFeatureGenerator
+from pychronoboost.timeseries.feature_selector import get_feature_selector
+
+TIMESTEP_COLUMN = "time"
+TARGET_COLUMN = "target"
+
+# The columns identifying a benchmark case, the same case is compared across runs
+CASE_COLUMNS = ["stage", "variant", "n_rows", "n_columns", "max_window_size"]
+
+
+def _series(
+    timesteps,
+    n_rows: int,
+    n_columns: int,
+    gap_fraction: float,
+    missing_fraction: float,
+    seed: int,
+) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    # Drop a fraction of the timesteps, so they have to be imputed
+    kept = np.sort(
+        rng.choice(n_rows, size=n_rows - int(n_rows * gap_fraction), replace=False)
+    )
+    data = {TIMESTEP_COLUMN: timesteps[kept]}
+    for i in range(n_columns):
+        values = rng.normal(size=len(kept)).cumsum()
+        values[rng.random(len(kept)) < missing_fraction] = np.nan
+        data[f"value{i}"] = values
+    data[TARGET_COLUMN] = rng.normal(size=len(kept)).cumsum()
+    return pd.DataFrame(data)
+
+
+def gappy_daily_series(
+    n_rows: int,
+    n_columns: int = 1,
+    gap_fraction: float = 0.05,
+    missing_fraction: float = 0.05,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Random walks on a daily grid with missing days and missing values.
+
+    :param n_rows: The number of days spanned, before the gaps are removed.
+    :param n_columns: The number of value columns, named value0, value1, ...
+    :param gap_fraction: The fraction of days removed.
+    :param missing_fraction: The fraction of missing values in every value column.
+    :param seed: Seed of the random generator.
+    :return: DataFrame with a 'time', the value and a 'target' column.
+    """
+    timesteps = pd.date_range("2000-01-01", periods=n_rows, freq="D").to_numpy()
+    return _series(timesteps, n_rows, n_columns, gap_fraction, missing_fraction, seed)
+
+
+def second_level_series(
+    n_rows: int,
+    n_columns: int = 1,
+    gap_fraction: float = 0.05,
+    missing_fraction: float = 0.05,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Random walks on a one second grid with missing seconds and missing values, see
+    gappy_daily_series.
+    """
+    timesteps = pd.date_range("2020-01-01", periods=n_rows, freq="S").to_numpy()
+    return _series(timesteps, n_rows, n_columns, gap_fraction, missing_fraction, seed)
+
+
+def integer_step_series(
+    n_rows: int,
+    n_columns: int = 1,
+    gap_fraction: float = 0.05,
+    missing_fraction: float = 0.05,
+    seed: int = 0,
+) -> pd.DataFrame:
+    """
+    Random walks on integer timesteps with missing steps and missing values, see
+    gappy_daily_series.
+    """
+    timesteps = np.arange(n_rows, dtype=np.int64)
+    return _series(timesteps, n_rows, n_columns, gap_fraction, missing_fraction, seed)
+
+
+SERIES_GENERATORS = {
+    "daily": gappy_daily_series,
+    "seconds": second_level_series,
+    "integer": integer_step_series,
+}
+
+
+def _filled(data: pd.DataFrame) -> pd.DataFrame:
+    return data.ffill().bfill()
+
+
+def _impute_timesteps_case(variant, n_rows, n_columns, max_window_size):
+    data = SERIES_GENERATORS[variant](n_rows, n_columns)
+    strategy = get_timestep_imputation_strategy(data, TIMESTEP_COLUMN)
+    return lambda: strategy.impute(data, TIMESTEP_COLUMN)
+
+
+def _impute_values_case(variant, n_rows, n_columns, max_window_size):
+    data = gappy_daily_series(n_rows, n_columns)
+    values = np.stack([data[f"value{i}"].to_numpy() for i in range(n_columns)])
+    imputer = get_value_imputation_strategy(variant)
+    return lambda: imputer.impute_block(values.copy())
+
+
+def _generate_features_case(variant, n_rows, n_columns, max_window_size):
+    data = _filled(gappy_daily_series(n_rows, n_columns))
+    generator = TimeSeriesFeatureGenerator(max_window_size)
+    columns = [f"value{i}" for i in range(n_columns)]
+    if variant == "threads":
+        # The columns on a thread pool of all CPUs, to compare with the default variant
+        return lambda: generator.compute_columns(
+            data, columns, n_jobs=os.cpu_count() or 1
+        )
+
+    def run():
+        for column in columns:
+            generator.compute_features(data, column)
+
+    return run
+
+
+def _select_features_case(variant, n_rows, n_columns, max_window_size):
+    data = _filled(gappy_daily_series(n_rows, n_columns))
+    columns = [f"value{i}" for i in range(n_columns)]
+    selector = get_feature_selector(variant, max(n_columns // 2, 1))
+    return lambda: selector.rank_columns(data, columns, TARGET_COLUMN)
+
+
+def _process_timeseries_features_case(variant, n_rows, n_columns, max_window_size):
+    data = SERIES_GENERATORS[variant](n_rows, n_columns)
+    columns = [f"value{i}" for i in range(n_columns)]
+
+    def run():
+        TimeSeriesData(data.copy(), TIMESTEP_COLUMN).process_timeseries_features(
+            columns, TARGET_COLUMN, max_window_size=max_window_size
+        )
+
+    return run
+
+
+# Every stage with its case setup, the variants it is run for by default, and whether it
+# depends on the window size
+BENCHMARK_STAGES: Dict[str, Tuple[Callable, List[str], bool]] = {
+    "impute_timesteps": (_impute_timesteps_case, list(SERIES_GENERATORS), False),
+    "impute_values": (_impute_values_case, ["last", "linear", "kalman"], False),
+    "generate_features": (_generate_features_case, ["default"], True),
+    "select_features": (_select_features_case, ["XGB"], False),
+    "process_timeseries_features": (_process_timeseries_features_case, ["daily"], True),
+}
+
+
+def measure(run: Callable[[], object], n_repeats: int = 1, trace_memory: bool = True):
+    """
+    Measure the runtime and peak memory of a function.
+
+    :param run: The function to measure.
+    :param n_repeats: The number of timed runs, the fastest one is reported.
+    :param trace_memory: Whether to measure the peak memory in one more run, with
+        tracemalloc, which would distort the timed runs.
+    :return: The runtime in seconds and the peak traced memory in bytes, or None.
+    """
+    seconds = np.inf
+    for _ in range(n_repeats):
+        start = time.perf_counter()
+        run()
+        seconds = min(seconds, time.perf_counter() - start)
+
+    peak_memory = None
+    if trace_memory:
+        was_tracing = tracemalloc.is_tracing()
+        if not was_tracing:
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        run()
+        peak_memory = tracemalloc.get_traced_memory()[1] - current
+        if not was_tracing:
+            tracemalloc.stop()
+    return seconds, peak_memory
+
+
+def run_benchmarks(
+    n_rows: List[int] = (100_000,),
+    n_columns: List[int] = (4,),
+    max_window_sizes: List[int] = (10,),
+    stages: List[str] = None,
+    variants: Dict[str, List[str]] = None,
+    n_repeats: int = 1,
+    trace_memory: bool = True,
+) -> pd.DataFrame:
+    """
+    Benchmark the pipeline stages on synthetic series, for every combination of the sizes.
+
+    :param n_rows: The numbers of rows of the series.
+    :param n_columns: The numbers of value columns of the series.
+    :param max_window_sizes: The maximum window sizes, for the stages that generate
+        features.
+    :param stages: The stages to benchmark, from BENCHMARK_STAGES, defaults to all of them.
+    :param variants: Optional variants to run per stage, e.g. {"impute_values": ["last"]}
+        for value imputation strategies, {"select_features": ["CORR"]} for selectors or
+        {"generate_features": ["default", "threads"]} to compare with the thread pool.
+    :param n_repeats: The number of timed runs of every case, the fastest one is reported.
+    :param trace_memory: Whether to measure the peak memory of every case.
+    :return: DataFrame with one row per case, identified by CASE_COLUMNS, with the runtime
+        in seconds, the number of rows per second and the peak traced memory in bytes.
+    """
+    if stages is None:
+        stages = list(BENCHMARK_STAGES)
+    variants = variants or {}
+    results = []
+    for stage in stages:
+        if stage not in BENCHMARK_STAGES:
+            raise NotImplementedError(f"Benchmark stage {stage} not available")
+        setup, default_variants, uses_windows = BENCHMARK_STAGES[stage]
+        windows = max_window_sizes if uses_windows else [None]
+        for variant, rows, columns, window_size in itertools.product(
+            variants.get(stage, default_variants), n_rows, n_columns, windows
+        ):
+            run = setup(variant, rows, columns, window_size)
+            seconds, peak_memory = measure(run, n_repeats, trace_memory)
+            results.append(
+                {
+                    "stage": stage,
+                    "variant": variant,
+                    "n_rows": rows,
+                    "n_columns": columns,
+                    "max_window_size": window_size,
+                    "seconds": seconds,
+                    "rows_per_second": rows / max(seconds, 1e-12),
+                    "peak_memory_bytes": peak_memory,
+                }
+            )
+    return pd.DataFrame(
+        results,
+        columns=CASE_COLUMNS + ["seconds", "rows_per_second", "peak_memory_bytes"],
+    )
+
+
+def append_history(results: pd.DataFrame, path: str, label: str = None) -> None:
+    """
+    Append benchmark results to a JSON lines history file, one line per case.
+
+    :param results: The output of run_benchmarks.
+    :param path: The path of the history file.
+    :param label: Optional label of the run, e.g. a commit hash.
+    """
+    run = {
+        "timestamp": time.time(),
+        "label": label,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+    }
+    with open(path, "a") as f:
+        for record in results.to_dict(orient="records"):
+            f.write(json.dumps({**run, **record}, default=_json_default) + "\n")
+
+
+def _json_default(value):
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def load_history(path: str) -> pd.DataFrame:
+    """
+    Load a history file written by append_history.
+
+    :param path: The path of the history file.
+    :return: DataFrame with one row per case and run, empty if the file does not exist.
+    """
+    columns = ["timestamp"] + CASE_COLUMNS + ["seconds", "peak_memory_bytes"]
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=columns)
+    with open(path) as f:
+        history = pd.DataFrame([json.loads(line) for line in f if line.strip()])
+    history = history.reindex(columns=history.columns.union(columns, sort=False))
+    # Stages that do not use a window size have no value for it
+    return history.astype({"max_window_size": "float64", "seconds": "float64"})
+
+
+def find_regressions(
+    results: pd.DataFrame,
+    history: pd.DataFrame,
+    tolerance: float = 0.2,
+    n_baseline_runs: int = 5,
+) -> pd.DataFrame:
+    """
+    Compare benchmark results against earlier runs of the same cases.
+
+    The baseline of a case is the median over its last n_baseline_runs runs, which is robust
+    to a single noisy run. Cases without earlier runs are not flagged.
+
+    :param results: The output of run_benchmarks.
+    :param history: Earlier results, e.g. from load_history.
+    :param tolerance: The relative slowdown or memory increase that is flagged.
+    :param n_baseline_runs: The number of most recent runs the baseline is taken over.
+    :return: The results with the baseline seconds and peak memory, their ratios to the
+        baseline and a 'regression' column.
+    """
+    results = results.astype({"max_window_size": "float64"})
+    baseline = history.sort_values("timestamp").groupby(CASE_COLUMNS, dropna=False)
+    baseline = baseline.tail(n_baseline_runs).groupby(CASE_COLUMNS, dropna=False)
+    baseline = baseline[["seconds", "peak_memory_bytes"]].median().reset_index()
+    compared = results.merge(
+        baseline, on=CASE_COLUMNS, how="left", suffixes=("", "_baseline")
+    )
+    compared["seconds_ratio"] = compared["seconds"] / compared["seconds_baseline"]
+    compared["memory_ratio"] = (
+        compared["peak_memory_bytes"] / compared["peak_memory_bytes_baseline"]
+    )
+    compared["regression"] = (compared["seconds_ratio"] > 1 + tolerance) | (
+        compared["memory_ratio"] > 1 + tolerance
+    )
+    return compared
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--columns", type=int, nargs="+", default=[4])
+    parser.add_argument("--max-window-sizes", type=int, nargs="+", default=[10])
+    parser.add_argument("--stages", nargs="+", choices=list(BENCHMARK_STAGES))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--no-memory", action="store_true")
+    parser.add_argument(
+        "--history", help="JSON lines file to compare against and append to"
+    )
+    parser.add_argument(
+        "--label", help="Label of this run in the history, e.g. a commit"
+    )
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    results = run_benchmarks(
+        args.rows,
+        args.columns,
+        args.max_window_sizes,
+        args.stages,
+        n_repeats=args.repeats,
+        trace_memory=not args.no_memory,
+    )
+    if args.history is None:
+        print(results.to_string(index=False))
+        return 0
+
+    compared = find_regressions(results, load_history(args.history), args.tolerance)
+    print(compared.drop(columns=["seconds_baseline"]).to_string(index=False))
+    append_history(results, args.history, args.label)
+    return 1 if compared["regression"].any() else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import List, Optional
+
+_METADATA_FILE = "metadata.json"
+
+
+def _is_plain_numpy(series: pd.Series) -> bool:
+    return isinstance(series.dtype, np.dtype) and series.dtype.kind in "biufcmM"
+
+
+class FeatureCache:
+    def __init__(self, directory: str, max_bytes: int = 10 * 1024**3):
+        """
+        On-disk cache of imputation and feature generation results, keyed by a hash of the
+        inputs that produced them.
+
+        Entries are stored as .npy files, which are memory mapped on load, and the least
+        recently used entries are evicted once the cache grows beyond max_bytes.
+
+        :param directory: The directory to store the cache entries in.
+        :param max_bytes: The maximum total size of the cache entries.
+        """
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def key(*parts) -> str:
+        """
+        Hash the inputs of a computation into a cache key.
+
+        :param parts: Strings, numbers, lists, numpy arrays or pandas Series.
+        :return: The hex digest of the inputs.
+        """
+        digest = hashlib.blake2b(digest_size=20)
+        for part in parts:
+            if isinstance(part, pd.Series):
+                if _is_plain_numpy(part):
+                    digest.update(part.dtype.str.encode())
+                    digest.update(np.ascontiguousarray(part.to_numpy()).view(np.uint8))
+                else:
+                    digest.update(str(part.dtype).encode())
+                    digest.update(
+                        pd.util.hash_pandas_object(part, index=False).to_numpy()
+                    )
+            elif isinstance(part, np.ndarray):
+                digest.update(part.dtype.str.encode())
+                digest.update(np.ascontiguousarray(part).view(np.uint8))
+            else:
+                digest.update(json.dumps(part).encode())
+            # Separate the parts so that different splits never hash alike
+            digest.update(b"\x00")
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def get_array(self, key: str) -> Optional[np.ndarray]:
+        """
+        Load a cached array as a read-only memory map.
+
+        :param key: The cache key.
+        :return: The cached array, or None on a cache miss.
+        """
+        path = self._path(key)
+        if not os.path.isdir(path):
+            return None
+        self._touch(path)
+        return np.load(os.path.join(path, "0.npy"), mmap_mode="r")
+
+    def put_array(self, key: str, values: np.ndarray) -> None:
+        """
+        Store an array in the cache.
+
+        :param key: The cache key.
+        :param values: The array to cache.
+        """
+        self._write(key, lambda path: np.save(os.path.join(path, "0.npy"), values))
+
+    def get_frame(self, key: str) -> Optional[pd.DataFrame]:
+        """
+        Load a cached DataFrame.
+
+        :param key: The cache key.
+        :return: The cached DataFrame, or None on a cache miss.
+        """
+        path = self._path(key)
+        if not os.path.isdir(path):
+            return None
+        self._touch(path)
+        with open(os.path.join(path, _METADATA_FILE)) as f:
+            metadata = json.load(f)
+
+        columns = {}
+        for i, (column, pickled) in enumerate(
+            zip(metadata["columns"], metadata["pickled"])
+        ):
+            if pickled:
+                columns[column] = pd.read_pickle(os.path.join(path, f"{i}.pkl"))
+            else:
+                columns[column] = np.load(os.path.join(path, f"{i}.npy"), mmap_mode="r")
+        return pd.DataFrame(columns, columns=metadata["columns"])
+
+    def put_frame(self, key: str, data: pd.DataFrame) -> None:
+        """
+        Store a DataFrame in the cache. Its index is not stored.
+
+        :param key: The cache key.
+        :param data: The DataFrame to cache.
+        """
+
+        def write(path: str) -> None:
+            pickled = []
+            for i, column in enumerate(data.columns):
+                series = data[column].reset_index(drop=True)
+                if _is_plain_numpy(series):
+                    np.save(os.path.join(path, f"{i}.npy"), series.to_numpy())
+                    pickled.append(False)
+                else:
+                    # Extension dtypes keep their exact dtype when pickled
+                    series.to_pickle(os.path.join(path, f"{i}.pkl"))
+                    pickled.append(True)
+            with open(os.path.join(path, _METADATA_FILE), "w") as f:
+                json.dump({"columns": data.columns.tolist(), "pickled": pickled}, f)
+
+        self._write(key, write)
+
+    def _write(self, key: str, write) -> None:
+        path = self._path(key)
+        if os.path.isdir(path):
+            self._touch(path)
+            return
+        # Write to a temporary directory first, so readers never see a partial entry
+        tmp_path = tempfile.mkdtemp(dir=self.directory, prefix=".tmp-")
+        try:
+            write(tmp_path)
+            os.replace(tmp_path, path)
+        except OSError:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            if not os.path.isdir(path):
+                raise
+        self.evict()
+
+    @staticmethod
+    def _touch(path: str) -> None:
+        os.utime(path)
+
+    def entries(self) -> List[dict]:
+        """
+        List the cache entries, least recently used first.
+
+        :return: List of dicts with the key, size in bytes and last use time of each entry.
+        """
+        entries = []
+        for key in os.listdir(self.directory):
+            path = self._path(key)
+            if key.startswith(".") or not os.path.isdir(path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(path))
+            entries.append(
+                {"key": key, "size": size, "last_used": os.stat(path).st_mtime}
+            )
+        return sorted(entries, key=lambda entry: entry["last_used"])
+
+    def evict(self) -> None:
+        """
+        Remove the least recently used entries until the cache fits in max_bytes.
+        """
+        entries = self.entries()
+        total = sum(entry["size"] for entry in entries)
+        for entry in entries:
+            if total <= self.max_bytes:
+                break
+            shutil.rmtree(self._path(entry["key"]), ignore_errors=True)
+            total -= entry["size"]
+
+    def clear(self) -> None:
+        """
+        Remove all cache entries.
+        """
+        for entry in self.entries():
+            shutil.rmtree(self._path(entry["key"]), ignore_errors=True)
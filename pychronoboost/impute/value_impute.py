@@ -1,4 +1,7 @@
+import time
+import warnings
 from abc import ABC, abstractmethod
+from typing import List
 import pandas as pd
 import numpy as np
 
@@ -12,16 +15,75 @@ class ValueImputationStrategy(ABC):
         """
         pass
 
+    def impute_block(self, values: np.ndarray) -> np.ndarray:
+        """
+        Impute missing values in many float columns at once, in place.
+        :param values: Array of shape (columns, rows) with NaN for missing values.
+        :return: The imputed array.
+        """
+        for i, column in enumerate(values):
+            values[i] = self.impute(pd.Series(column)).to_numpy(dtype=values.dtype)
+        return values
+
+
+def _flat_view(values: np.ndarray) -> np.ndarray:
+    if not values.flags.c_contiguous:
+        raise ValueError("The block must be C-contiguous to be imputed in place")
+    return values.reshape(-1)
+
+
+def _missing_runs(values: np.ndarray):
+    """
+    Locate the missing values of a (columns, rows) block and the valid values around each
+    run of them. After one isnan pass, only the missing positions are touched.
+
+    :return: The flat positions of the missing values, and for each of them the flat position
+        of the previous and the next valid value in its column, or -1 if there is none.
+    """
+    n_rows = values.shape[1]
+    missing = np.flatnonzero(np.isnan(values))
+    if missing.size == 0:
+        return missing, missing, missing
+
+    # A run starts wherever the missing positions are not consecutive within one column
+    run_start = np.ones(len(missing), dtype=bool)
+    run_start[1:] = (np.diff(missing) != 1) | (missing[1:] % n_rows == 0)
+    first = np.flatnonzero(run_start)
+    last = np.append(first[1:] - 1, len(missing) - 1)
+    run = np.cumsum(run_start) - 1
+
+    previous = missing[first] - 1
+    previous[missing[first] % n_rows == 0] = -1
+    following = missing[last] + 1
+    following[following % n_rows == 0] = -1
+    return missing, previous[run], following[run]
+
+
+def _fill(flat: np.ndarray, missing, previous, following):
+    # Forward fill, and back fill the values before the first valid one of each column.
+    # Only missing positions are written, so every source value is still the original one.
+    source = np.where(previous >= 0, previous, following)
+    has_source = source >= 0
+    flat[missing[has_source]] = flat[source[has_source]]
+
 
 class LastValueImputation(ValueImputationStrategy):
     def impute(self, data):
         return data.fillna(method="ffill").fillna(method="bfill")
 
+    def impute_block(self, values: np.ndarray) -> np.ndarray:
+        _fill(_flat_view(values), *_missing_runs(values))
+        return values
+
 
 class ZeroImputation(ValueImputationStrategy):
     def impute(self, data):
         return data.fillna(0)
 
+    def impute_block(self, values: np.ndarray) -> np.ndarray:
+        np.copyto(values, 0.0, where=np.isnan(values))
+        return values
+
 
 class LinearImputation(ValueImputationStrategy):
     def impute(self, data):
@@ -35,24 +97,227 @@ class LinearImputation(ValueImputationStrategy):
             .fillna(method="bfill")
         )
 
+    def impute_block(self, values: np.ndarray) -> np.ndarray:
+        flat = _flat_view(values)
+        missing, previous, following = _missing_runs(values)
+        inner = (previous >= 0) & (following >= 0)
+        _fill(flat, missing[~inner], previous[~inner], following[~inner])
+
+        # Interpolate the gaps between valid values like np.interp
+        missing, previous, following = missing[inner], previous[inner], following[inner]
+        slope = (flat[following] - flat[previous]) / (following - previous)
+        flat[missing] = slope * (missing - previous) + flat[previous]
+        return values
+
+
+def _check_numeric(data):
+    if not pd.api.types.is_numeric_dtype(data):
+        raise ValueError(f"{type(data).__name__} needs a numeric column")
+
+
+class SeasonalNaiveImputation(ValueImputationStrategy):
+    def __init__(self, period: int = 7):
+        """
+        Fills each missing value with the value at the same phase one period back, or one
+        period ahead at the start of the series. Values still missing, e.g. when a phase is
+        never observed, are filled with the last value.
+
+        :param period: The number of timesteps in one season, e.g. 7 for weekly seasonality
+            of daily data.
+        """
+        if period < 1:
+            raise ValueError("period must be a positive integer")
+        self.period = period
+
+    def impute(self, data):
+        phase = np.arange(len(data)) % self.period
+        seasonal = data.groupby(phase).ffill()
+        seasonal = seasonal.fillna(seasonal.groupby(phase).bfill())
+        return LastValueImputation().impute(seasonal)
+
+    def impute_block(self, values: np.ndarray) -> np.ndarray:
+        n_columns, n_rows = values.shape
+        n_periods = -(-n_rows // self.period)
+        if n_rows == 0:
+            return values
+
+        # Lay out every phase of every column as one contiguous row, pad with NaN
+        padded = np.full((n_columns, n_periods * self.period), np.nan, values.dtype)
+        padded[:, :n_rows] = values
+        phases = padded.reshape(n_columns, n_periods, self.period).transpose(0, 2, 1)
+        phases = np.ascontiguousarray(phases).reshape(-1, n_periods)
+        _fill(_flat_view(phases), *_missing_runs(phases))
+
+        seasonal = phases.reshape(n_columns, self.period, n_periods).transpose(0, 2, 1)
+        values[:] = seasonal.reshape(n_columns, -1)[:, :n_rows]
+        return LastValueImputation().impute_block(values)
+
+
+# Number of values gathered at once when computing the medians of windows
+_GATHER_BATCH_SIZE = 2**22
 
-def get_value_imputation_strategy(strategy: str) -> ValueImputationStrategy:
+
+class RollingMedianImputation(ValueImputationStrategy):
+    def __init__(self, window_size: int = 7):
+        """
+        Fills each missing value with the median of the observed values in a window centered
+        on it. Gaps longer than the window are filled with the last value.
+
+        :param window_size: The number of timesteps in the window.
+        """
+        if window_size < 1:
+            raise ValueError("window_size must be a positive integer")
+        self.window_size = window_size
+
+    def impute(self, data):
+        _check_numeric(data)
+        median = data.rolling(self.window_size, center=True, min_periods=1).median()
+        return LastValueImputation().impute(data.fillna(median))
+
+    def impute_block(self, values: np.ndarray) -> np.ndarray:
+        # Only the windows around missing values are gathered, a batch at a time
+        offsets = np.arange(self.window_size) - self.window_size // 2
+        padding = self.window_size
+        padded = np.full(
+            (values.shape[0], values.shape[1] + 2 * padding), np.nan, values.dtype
+        )
+        padded[:, padding:-padding] = values
+        columns, rows = np.nonzero(np.isnan(values))
+        batch_size = max(_GATHER_BATCH_SIZE // self.window_size, 1)
+        for start in range(0, len(rows), batch_size):
+            batch = slice(start, start + batch_size)
+            windows = padded[
+                columns[batch, None], rows[batch, None] + offsets + padding
+            ]
+            with warnings.catch_warnings():
+                # Windows without any observed value stay missing
+                warnings.simplefilter("ignore", RuntimeWarning)
+                values[columns[batch], rows[batch]] = np.nanmedian(windows, axis=1)
+        return LastValueImputation().impute_block(values)
+
+
+# A level that does not change at all is smoothed to the mean of the observed values
+_MIN_GAIN = 1e-9
+
+
+class KalmanImputation(ValueImputationStrategy):
+    def __init__(self, noise_ratio: float = None):
+        """
+        Fills missing values with the smoothed level of a local level model, a random walk
+        observed with noise. The Kalman filter and smoother run with their steady-state gain,
+        which makes them a forward and a backward exponential smoothing of the observed
+        values, in O(n). Missing values in a gap lie on the line between the smoothed levels
+        at its ends, which is where the random walk is expected to be given both of them.
+
+        :param noise_ratio: The variance of the level changes relative to the variance of the
+            observation noise. It is estimated from the differences of the observed values by
+            default.
+        """
+        self.noise_ratio = noise_ratio
+
+    def _gain(self, observed: np.ndarray) -> float:
+        if self.noise_ratio is not None:
+            ratio = self.noise_ratio
+        else:
+            # For a random walk with noise, differences have variance q + 2r and a lag one
+            # covariance of -r
+            diffs = np.diff(observed)
+            diffs = diffs - diffs.mean()
+            observation_var = max(-np.mean(diffs[1:] * diffs[:-1]), 0.0)
+            level_var = max(np.mean(diffs**2) - 2 * observation_var, 0.0)
+            if observation_var == 0:
+                return 1.0
+            ratio = level_var / observation_var
+        if np.isinf(ratio):
+            return 1.0
+        # Steady-state predicted variance, in units of the observation noise variance
+        predicted_var = (ratio + np.sqrt(ratio**2 + 4 * ratio)) / 2
+        return predicted_var / (predicted_var + 1)
+
+    def impute(self, data):
+        _check_numeric(data)
+        observed = data.dropna()
+        if len(observed) < 3:
+            return LinearImputation().impute(data)
+
+        gain = max(self._gain(observed.to_numpy(dtype=np.float64)), _MIN_GAIN)
+        # The adjusted weights start the filter like a diffuse prior, the smoother pass is the
+        # steady-state RTS recursion, which for a random walk is s_t = K m_t + (1 - K) s_t+1
+        filtered = observed.ewm(alpha=gain, adjust=True).mean()
+        smoothed = filtered[::-1].ewm(alpha=gain, adjust=False).mean()[::-1]
+
+        level = np.full((1, len(data)), np.nan)
+        level[0, data.notna().to_numpy()] = smoothed.to_numpy()
+        LinearImputation().impute_block(level)
+        return data.fillna(pd.Series(level[0], index=data.index))
+
+
+def get_value_imputation_strategy(
+    strategy: str, **strategy_options
+) -> ValueImputationStrategy:
     """
     Finds the corresponding value imputation strategy class
 
     :param strategy: name of the strategy to be used
+    :param strategy_options: Further options of the strategy, e.g. period for 'seasonal' or
+        window_size for 'median'
     :return: A value imputation strategy class object
     """
     value_imputation_strategy = {
-        "last": LastValueImputation(),
-        "zero": ZeroImputation(),
-        "linear": LinearImputation(),
+        "last": LastValueImputation,
+        "zero": ZeroImputation,
+        "linear": LinearImputation,
+        "seasonal": SeasonalNaiveImputation,
+        "median": RollingMedianImputation,
+        "kalman": KalmanImputation,
     }
 
     if strategy not in value_imputation_strategy:
         raise NotImplementedError(f"Strategy {strategy} not available")
 
-    return value_imputation_strategy[strategy]
+    return value_imputation_strategy[strategy](**strategy_options)
+
+
+def benchmark_value_imputation_strategies(
+    values: np.ndarray,
+    strategies: List[str] = None,
+    n_repeats: int = 1,
+) -> pd.DataFrame:
+    """
+    Compare the runtime of value imputation strategies on one series.
+
+    :param values: The float values of the series, with NaN for missing values.
+    :param strategies: Names of the strategies to compare, defaults to all of them.
+    :param n_repeats: The number of runs of each strategy, the fastest one is reported.
+    :return: DataFrame indexed by strategy name, with the runtime in seconds of imputing the
+        series with impute() and with impute_block(), and the number of rows per second.
+    """
+    if strategies is None:
+        strategies = ["last", "zero", "linear", "seasonal", "median", "kalman"]
+    values = np.asarray(values, dtype=np.float64)
+
+    results = {}
+    for strategy in strategies:
+        imputer = get_value_imputation_strategy(strategy)
+        series_seconds, block_seconds = np.inf, np.inf
+        for _ in range(n_repeats):
+            series = pd.Series(values)
+            start = time.perf_counter()
+            imputer.impute(series)
+            series_seconds = min(series_seconds, time.perf_counter() - start)
+
+            block = values.reshape(1, -1).copy()
+            start = time.perf_counter()
+            imputer.impute_block(block)
+            block_seconds = min(block_seconds, time.perf_counter() - start)
+        results[strategy] = {
+            "series_seconds": series_seconds,
+            "block_seconds": block_seconds,
+            "rows_per_second": len(values)
+            / max(min(series_seconds, block_seconds), 1e-12),
+        }
+
+    return pd.DataFrame.from_dict(results, orient="index")
 
 
 # Usage
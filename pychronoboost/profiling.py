@@ -0,0 +1,361 @@
+import functools
+import logging
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from abc import ABC
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+import pandas as pd
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+try:
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_trace = None
+
+logger = logging.getLogger(__name__)
+
+
+def peak_rss_bytes() -> Optional[int]:
+    """
+    The peak resident set size of the process so far, or None where it is not available.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class StageRecord:
+    def __init__(self, name: str, parent: str = None, depth: int = 0):
+        """
+        Measurements of one run of a pipeline stage.
+
+        :param name: The name of the stage, e.g. 'impute_values'.
+        :param parent: The name of the stage this one ran within, if any.
+        :param depth: The number of enclosing stages.
+        """
+        self.name = name
+        self.parent = parent
+        self.depth = depth
+        self.start_time = None
+        self.wall_seconds = None
+        self.cpu_seconds = None
+        self.memory_delta_bytes = None
+        self.peak_memory_bytes = None
+        self.peak_rss_bytes = None
+        self.rows_before = None
+        self.columns_before = None
+        self.rows_after = None
+        self.columns_after = None
+        self.error = None
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+class ProfileReport:
+    def __init__(self, records: List[StageRecord]):
+        """
+        The stage records of a profiled run, in the order the stages finished.
+
+        :param records: The stage records.
+        """
+        self.records = records
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        :return: DataFrame with one row per stage run and one column per measurement.
+        """
+        columns = list(vars(StageRecord(""))) if not self.records else None
+        return pd.DataFrame(
+            [record.to_dict() for record in self.records], columns=columns
+        )
+
+    def summary(self) -> pd.DataFrame:
+        """
+        :return: DataFrame indexed by stage name with the number of runs, the total wall and
+            CPU time and the largest memory peak of every stage, slowest stage first.
+        """
+        frame = self.to_frame()
+        if frame.empty:
+            return pd.DataFrame(
+                columns=["runs", "wall_seconds", "cpu_seconds", "peak_memory_bytes"]
+            )
+        summary = frame.groupby("name", sort=False).agg(
+            runs=("name", "size"),
+            wall_seconds=("wall_seconds", "sum"),
+            cpu_seconds=("cpu_seconds", "sum"),
+            peak_memory_bytes=("peak_memory_bytes", "max"),
+        )
+        return summary.sort_values("wall_seconds", ascending=False)
+
+    def to_prometheus(self) -> str:
+        """
+        :return: The summary in the Prometheus text exposition format.
+        """
+        return prometheus_text(self.summary())
+
+
+def prometheus_text(summary: pd.DataFrame, prefix: str = "pychronoboost_stage") -> str:
+    """
+    Format per-stage totals in the Prometheus text exposition format.
+
+    :param summary: DataFrame indexed by stage name, as returned by ProfileReport.summary.
+    :param prefix: The prefix of the metric names.
+    :return: The metrics text.
+    """
+    metrics = [
+        ("runs", "runs_total", "counter", "Number of runs of the stage."),
+        ("wall_seconds", "wall_seconds_total", "counter", "Wall time of the stage."),
+        ("cpu_seconds", "cpu_seconds_total", "counter", "CPU time of the stage."),
+        (
+            "peak_memory_bytes",
+            "peak_memory_bytes",
+            "gauge",
+            "Largest traced memory increase within the stage.",
+        ),
+    ]
+    lines = []
+    for column, metric, metric_type, description in metrics:
+        values = summary[column].dropna()
+        if values.empty:
+            continue
+        lines.append(f"# HELP {prefix}_{metric} {description}")
+        lines.append(f"# TYPE {prefix}_{metric} {metric_type}")
+        for stage, value in values.items():
+            lines.append(f'{prefix}_{metric}{{stage="{stage}"}} {float(value):.10g}')
+    return "\n".join(lines) + "\n"
+
+
+class StageCallback(ABC):
+    """
+    Receives every stage run of a StageProfiler. Both methods do nothing by default.
+    """
+
+    def on_stage_start(self, record: StageRecord) -> None:
+        pass
+
+    def on_stage_end(self, record: StageRecord) -> None:
+        pass
+
+
+class LoggingCallback(StageCallback):
+    def __init__(self, stage_logger: logging.Logger = None, level: int = logging.INFO):
+        """
+        Logs one line with the measurements of every finished stage.
+
+        :param stage_logger: The logger to log to, defaults to the logger of this module.
+        :param level: The log level.
+        """
+        self.logger = stage_logger or logger
+        self.level = level
+
+    def on_stage_end(self, record: StageRecord) -> None:
+        self.logger.log(
+            self.level,
+            "%s%s: %.3fs wall, %.3fs cpu, %s -> %s rows, %s -> %s columns",
+            "  " * record.depth,
+            record.name,
+            record.wall_seconds,
+            record.cpu_seconds,
+            record.rows_before,
+            record.rows_after,
+            record.columns_before,
+            record.columns_after,
+        )
+
+
+class PrometheusCallback(StageCallback):
+    def __init__(self, path: str = None):
+        """
+        Accumulates per-stage metrics over all runs, e.g. for the node exporter textfile
+        collector.
+
+        :param path: If set, the metrics are written to this file whenever an outermost
+            stage finishes. The file is replaced atomically.
+        """
+        self.path = path
+        self.records = []
+
+    def on_stage_end(self, record: StageRecord) -> None:
+        self.records.append(record)
+        if self.path is not None and record.depth == 0:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            with os.fdopen(fd, "w") as f:
+                f.write(self.text())
+            os.replace(tmp_path, self.path)
+
+    def text(self) -> str:
+        """
+        :return: The accumulated metrics in the Prometheus text exposition format.
+        """
+        return ProfileReport(self.records).to_prometheus()
+
+
+class SpanCallback(StageCallback):
+    def __init__(self, tracer=None):
+        """
+        Reports every stage as a span, nested like the stages.
+
+        :param tracer: Optional OpenTelemetry-style tracer. Its start_span(name, context) is
+            called when a stage starts, with the span of the enclosing stage as the context if
+            opentelemetry is installed. The span gets the measurements as attributes and is
+            ended when the stage finishes. Without a tracer, spans are kept as dicts in
+            self.spans.
+        """
+        self.tracer = tracer
+        self.spans = []
+        self._open = []
+
+    def on_stage_start(self, record: StageRecord) -> None:
+        if self.tracer is not None:
+            context = None
+            if otel_trace is not None and self._open:
+                context = otel_trace.set_span_in_context(self._open[-1])
+            self._open.append(self.tracer.start_span(record.name, context=context))
+        else:
+            parent = self._open[-1]["span_id"] if self._open else None
+            span = {
+                "name": record.name,
+                "span_id": len(self.spans),
+                "parent_id": parent,
+            }
+            self.spans.append(span)
+            self._open.append(span)
+
+    def on_stage_end(self, record: StageRecord) -> None:
+        span = self._open.pop()
+        attributes = {
+            key: value
+            for key, value in record.to_dict().items()
+            if key not in ("name", "parent", "depth", "start_time")
+            and value is not None
+        }
+        if self.tracer is not None:
+            for key, value in attributes.items():
+                span.set_attribute(key, value)
+            span.end()
+        else:
+            span["start_time"] = record.start_time
+            span["end_time"] = record.start_time + record.wall_seconds
+            span["attributes"] = attributes
+
+
+class StageProfiler:
+    def __init__(
+        self, callbacks: List[StageCallback] = None, trace_memory: bool = False
+    ):
+        """
+        Records the wall time, CPU time, memory and data shape of every pipeline stage.
+
+        :param callbacks: Callbacks receiving every stage run, e.g. a LoggingCallback.
+        :param trace_memory: Whether to trace Python memory allocations with tracemalloc to
+            measure the memory increase and peak of every stage. Tracing slows down
+            allocation heavy stages, so it is off by default. Before Python 3.9 the peak
+            cannot be reset, so a stage's peak may include earlier stages' peaks.
+        """
+        self.callbacks = callbacks or []
+        self.trace_memory = trace_memory
+        self.records = []
+        # The open stages, each with the largest traced memory seen while it ran
+        self._stack: List[Tuple[StageRecord, Dict]] = []
+        self._started_tracing = False
+
+    @property
+    def report(self) -> ProfileReport:
+        return ProfileReport(list(self.records))
+
+    def reset(self) -> None:
+        self.records = []
+
+    @contextmanager
+    def stage(self, name: str, shape: Callable[[], Tuple[int, int]] = None):
+        """
+        Profile the code run within the context as one stage.
+
+        :param name: The name of the stage.
+        :param shape: Optional function returning the (rows, columns) of the data, called
+            before and after the stage.
+        """
+        parent = self._stack[-1] if self._stack else None
+        record = StageRecord(
+            name, parent[0].name if parent else None, depth=len(self._stack)
+        )
+        if shape is not None:
+            record.rows_before, record.columns_before = shape()
+
+        memory = {}
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracing = True
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                # The peak is reset for this stage, so carry the parent's peak so far over
+                parent[1]["peak"] = max(parent[1]["peak"], peak)
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+            memory = {"start": current, "peak": current}
+
+        self._stack.append((record, memory))
+        for callback in self.callbacks:
+            callback.on_stage_start(record)
+        record.start_time = time.time()
+        wall_start = time.perf_counter()
+        cpu_start = time.process_time()
+        try:
+            yield record
+        except BaseException as error:
+            record.error = type(error).__name__
+            raise
+        finally:
+            record.wall_seconds = time.perf_counter() - wall_start
+            record.cpu_seconds = time.process_time() - cpu_start
+            self._stack.pop()
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                peak = max(memory["peak"], peak)
+                record.memory_delta_bytes = current - memory["start"]
+                record.peak_memory_bytes = peak - memory["start"]
+                if parent is not None:
+                    parent[1]["peak"] = max(parent[1]["peak"], peak)
+                elif self._started_tracing:
+                    tracemalloc.stop()
+                    self._started_tracing = False
+            record.peak_rss_bytes = peak_rss_bytes()
+            if shape is not None:
+                record.rows_after, record.columns_after = shape()
+            self.records.append(record)
+            for callback in self.callbacks:
+                callback.on_stage_end(record)
+
+
+def profiled_stage(name: str):
+    """
+    Decorator profiling a method of an object with a 'profiler' and a 'data' attribute as
+    one stage. Without a profiler, the method is called directly.
+
+    :param name: The name of the stage.
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if self.profiler is None:
+                return method(self, *args, **kwargs)
+            with self.profiler.stage(name, lambda: self.data.shape):
+                return method(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
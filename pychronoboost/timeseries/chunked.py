@@ -0,0 +1,494 @@
+import os
+import numpy as np
+import pandas as pd
+from typing import Callable, Iterator, List
+from pychronoboost.impute.timestep_impute import FREQ_INFER
+from pychronoboost.impute.value_impute import get_value_imputation_strategy
+from pychronoboost.timeseries.data import TimeSeriesData
+from pychronoboost.timeseries.feature_generator import (
+    FEATURE_DTYPES,
+    TimeSeriesFeatureGenerator,
+    check_feature_dtype,
+    get_window_sizes,
+    uses_calendar_windows,
+)
+from pychronoboost.timeseries.feature_selector import get_feature_selector
+
+# Value imputations that look at the whole series, or at values ahead of the deferred rows,
+# so chunks could not match imputing the series in memory
+_UNCHUNKED_VALUE_IMPUTATIONS = ["median", "kalman"]
+
+
+def iter_source_chunks(source, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """
+    Read a time series source a chunk of rows at a time.
+
+    Supported sources are pandas DataFrames, dicts of 1-D numpy arrays or memmaps, numpy
+    structured arrays or memmaps, paths to .npy files holding a structured array (memory
+    mapped), paths to Parquet files, and pyarrow Tables or RecordBatchReaders. Reading
+    Parquet files and Arrow data requires pyarrow.
+
+    :param source: The time series source, sorted by timestep.
+    :param chunk_rows: The maximum number of rows per chunk.
+    :return: Iterator over DataFrames of consecutive rows.
+    """
+    if chunk_rows < 1:
+        raise ValueError("chunk_rows must be a positive integer")
+
+    if isinstance(source, (str, os.PathLike)):
+        path = os.fspath(source)
+        if path.endswith(".npy"):
+            source = np.load(path, mmap_mode="r")
+        elif path.endswith(".parquet"):
+            try:
+                import pyarrow.parquet as pq
+            except ImportError:
+                raise ImportError("Reading Parquet files requires pyarrow.")
+            for batch in pq.ParquetFile(path).iter_batches(batch_size=chunk_rows):
+                yield batch.to_pandas()
+            return
+        else:
+            raise ValueError(f"Unsupported time series source file: {path}")
+
+    if isinstance(source, pd.DataFrame):
+        for start in range(0, len(source), chunk_rows):
+            yield source.iloc[start : start + chunk_rows]
+    elif isinstance(source, dict):
+        n_rows = len(next(iter(source.values()))) if source else 0
+        for start in range(0, n_rows, chunk_rows):
+            yield pd.DataFrame(
+                {
+                    col: values[start : start + chunk_rows]
+                    for col, values in source.items()
+                }
+            )
+    elif isinstance(source, np.ndarray) and source.dtype.names is not None:
+        for start in range(0, len(source), chunk_rows):
+            chunk = source[start : start + chunk_rows]
+            yield pd.DataFrame({col: chunk[col] for col in source.dtype.names})
+    elif hasattr(source, "to_batches"):
+        for batch in source.to_batches(max_chunksize=chunk_rows):
+            yield batch.to_pandas()
+    elif hasattr(source, "read_next_batch"):
+        for batch in source:
+            yield batch.to_pandas()
+    else:
+        raise ValueError(f"Unsupported time series source type: {type(source)}")
+
+
+class ParquetSink:
+    def __init__(self, path: str):
+        """
+        Writes processed chunks to a Parquet file as they are produced. Requires pyarrow.
+
+        :param path: The path of the Parquet file to write.
+        """
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("Writing Parquet files requires pyarrow.")
+        self._pa = pyarrow
+        self._pq = pyarrow.parquet
+        self.path = path
+        self.writer = None
+
+    def __call__(self, chunk: pd.DataFrame) -> None:
+        table = self._pa.Table.from_pandas(chunk, preserve_index=False)
+        if self.writer is None:
+            self.writer = self._pq.ParquetWriter(self.path, table.schema)
+        self.writer.write_table(table)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+            self.writer = None
+
+
+class _ChunkProcessor:
+    """
+    Imputes and generates features for consecutive chunks of one series, carrying the state
+    needed to continue across chunk boundaries.
+
+    The last processed row is prepended to each chunk, so timestep imputation fills gaps
+    between chunks and value imputation continues from the last imputed value. For seasonal
+    imputation the last period of rows is prepended, and the first chunk is held back, for up
+    to max_deferred_rows further rows, until it observes every phase of the season. Rows
+    after the last fully observed row are deferred to the next chunk, so they can be
+    interpolated towards later values. Window features are generated incrementally, with the rolling
+    state holding the last max_window_size - 1 values of every column. Calendar windows are
+    resolved with the frequency of the first chunk.
+    """
+
+    def __init__(
+        self,
+        timestep_column: str,
+        feature_columns: List[str],
+        value_impute_strategy: str,
+        max_window_size: int,
+        max_deferred_rows: int,
+        timestep_freq=FREQ_INFER,
+        value_impute_options: dict = None,
+        window_features: List[str] = None,
+        window_schedule=None,
+        feature_dtype=np.float64,
+    ):
+        if value_impute_strategy in _UNCHUNKED_VALUE_IMPUTATIONS:
+            raise ValueError(
+                f"Value imputation strategy {value_impute_strategy} is not supported for "
+                "chunks, as it depends on values beyond the next chunk."
+            )
+        self.timestep_column = timestep_column
+        self.timestep_freq = timestep_freq
+        self.feature_columns = feature_columns
+        self.value_impute_strategy = value_impute_strategy
+        self.value_impute_options = value_impute_options
+        self.max_window_size = max_window_size
+        self.window_features = window_features
+        self.window_schedule = window_schedule
+        self.feature_dtype = feature_dtype
+        self.feature_generator = None
+        if not uses_calendar_windows(window_schedule):
+            self.feature_generator = TimeSeriesFeatureGenerator(
+                max_window_size,
+                window_features,
+                get_window_sizes(max_window_size, window_schedule),
+                feature_dtype,
+            )
+        self.feature_imputer = get_value_imputation_strategy("last")
+        self.period = None
+        if value_impute_strategy == "seasonal":
+            self.period = get_value_imputation_strategy(
+                "seasonal", **(value_impute_options or {})
+            ).period
+        self.max_deferred_rows = max_deferred_rows
+        self.context = None
+        self.feature_context = None
+        self.deferred = None
+
+    def process(self, chunk: pd.DataFrame, final: bool = False) -> pd.DataFrame:
+        if self.deferred is not None:
+            chunk = pd.concat([self.deferred, chunk], ignore_index=True)
+            self.deferred = None
+
+        if not final:
+            observed = chunk[self.feature_columns].notna().all(axis=1).to_numpy()
+            n_ready = (
+                len(observed) - int(np.argmax(observed[::-1])) if observed.any() else 0
+            )
+            if len(chunk) - n_ready <= self.max_deferred_rows:
+                self.deferred = chunk.iloc[n_ready:]
+                chunk = chunk.iloc[:n_ready]
+        if len(chunk) == 0:
+            return None
+
+        n_context = 0 if self.context is None else len(self.context)
+        if n_context:
+            chunk = pd.concat([self.context, chunk], ignore_index=True)
+        ts_data = TimeSeriesData(
+            chunk.reset_index(drop=True),
+            self.timestep_column,
+            timestep_freq=self.timestep_freq,
+        )
+        ts_data.impute_timesteps()
+        if (
+            self.period is not None
+            and not n_context
+            and not final
+            and len(chunk) <= 2 * self.max_deferred_rows
+            and not self._observes_every_phase(ts_data.data)
+        ):
+            # Seasonal imputation fills a phase from its first observation at the start
+            if self.deferred is not None:
+                chunk = pd.concat([chunk, self.deferred], ignore_index=True)
+            self.deferred = chunk
+            return None
+        if self.timestep_freq == FREQ_INFER and len(chunk) > 1:
+            # Keep the frequency inferred from the first chunk, so all chunks share one grid
+            self.timestep_freq = ts_data.timestep_strategy.freq
+        ts_data.impute_values(
+            self.feature_columns,
+            self.value_impute_strategy,
+            options=self.value_impute_options,
+        )
+        if self.feature_generator is None:
+            self.feature_generator = TimeSeriesFeatureGenerator(
+                self.max_window_size,
+                self.window_features,
+                ts_data.window_sizes(self.max_window_size, self.window_schedule),
+                self.feature_dtype,
+            )
+        data = ts_data.data.iloc[n_context:].reset_index(drop=True)
+        if len(data) == 0:
+            return None
+        self.context = ts_data.data.iloc[-(self.period or 1) :]
+
+        features = self.feature_generator.update(data, self.feature_columns)
+        if self.feature_context is not None:
+            features = self.feature_imputer.impute(
+                pd.concat([self.feature_context, features])
+            ).iloc[1:]
+        else:
+            features = self.feature_imputer.impute(features)
+        self.feature_context = features.iloc[-1:]
+        return pd.concat([data, features], axis=1)
+
+    def _observes_every_phase(self, data: pd.DataFrame) -> bool:
+        phases = np.arange(len(data)) % self.period
+        return all(
+            len(np.unique(phases[data[col].notna().to_numpy()])) == self.period
+            for col in self.feature_columns
+        )
+
+    @property
+    def window_sizes(self) -> List[int]:
+        # Calendar windows are unknown until a chunk has been processed
+        if self.feature_generator is None:
+            return []
+        return self.feature_generator.window_sizes
+
+
+class ChunkedTimeSeries:
+    def __init__(
+        self,
+        source,
+        timestep_column: str,
+        chunk_rows: int = 1_000_000,
+        timestep_freq=FREQ_INFER,
+        feature_dtype: str = None,
+    ):
+        """
+        Initializes a time series that is processed out of core, a chunk of rows at a time, so
+        peak memory does not depend on the length of the series.
+
+        Args:
+            source: The time series source, sorted by timestep. See iter_source_chunks for the
+                supported sources, e.g. a Parquet file path or a numpy memmap.
+            timestep_column (str): The name of the column that represents the timestep.
+            chunk_rows (int): The number of source rows read per chunk.
+            timestep_freq: Step of the imputed timesteps, or 'infer' to use the native
+                frequency of the first chunk.
+            feature_dtype (str): The dtype of generated features, 'float64' (the default) or
+                'float32'. The 'compact' dtype is not supported, as it could differ between
+                chunks.
+
+        Raises:
+            ValueError: If 'feature_dtype' is 'compact'.
+        """
+        if check_feature_dtype(feature_dtype) == "compact":
+            raise ValueError("The compact feature dtype is not supported for chunks.")
+        self.feature_dtype = check_feature_dtype(feature_dtype)
+        self.source = source
+        self.timestep_freq = timestep_freq
+        self.timestep_column = timestep_column
+        self.chunk_rows = chunk_rows
+        self.selected_features = []
+        self.window_sizes = []
+
+    def _candidate_names(
+        self,
+        feature_columns: List[str],
+        max_window_size: int,
+        window_features: List[str] = None,
+    ) -> List[str]:
+        if not self.window_sizes:
+            return []
+        feature_generator = TimeSeriesFeatureGenerator(
+            max_window_size, window_features, self.window_sizes
+        )
+        return [
+            name
+            for col in feature_columns
+            for name in feature_generator.feature_names(col)
+        ]
+
+    def _iter_processed(
+        self,
+        feature_columns: List[str],
+        value_impute_strategy: str,
+        max_window_size: int,
+        value_impute_options: dict = None,
+        window_features: List[str] = None,
+        window_schedule=None,
+    ) -> Iterator[pd.DataFrame]:
+        processor = _ChunkProcessor(
+            self.timestep_column,
+            feature_columns,
+            value_impute_strategy,
+            max_window_size,
+            max_deferred_rows=self.chunk_rows,
+            timestep_freq=self.timestep_freq,
+            value_impute_options=value_impute_options,
+            window_features=window_features,
+            window_schedule=window_schedule,
+            feature_dtype=FEATURE_DTYPES[self.feature_dtype],
+        )
+        self.window_sizes = processor.window_sizes
+        for chunk in iter_source_chunks(self.source, self.chunk_rows):
+            if self.timestep_column not in chunk.columns:
+                raise ValueError(
+                    f"The timestep column '{self.timestep_column}' is not in the source."
+                )
+            processed = processor.process(chunk)
+            self.window_sizes = processor.window_sizes
+            if processed is not None:
+                yield processed
+        if processor.deferred is not None:
+            processed = processor.process(processor.deferred.iloc[:0], final=True)
+            self.window_sizes = processor.window_sizes
+            if processed is not None:
+                yield processed
+
+    def generate_candidate_features(
+        self,
+        feature_columns: List[str],
+        sink: Callable[[pd.DataFrame], None],
+        value_impute_strategy: str = "last",
+        max_window_size: int = 3,
+        value_impute_options: dict = None,
+        window_features: List[str] = None,
+        window_schedule=None,
+    ) -> List[str]:
+        """
+        Imputes the series and generates all candidate features, writing each processed chunk
+        to the sink as soon as it is ready.
+
+        Args:
+            feature_columns (List[str]): A list of column names to be used for feature generation.
+            sink (Callable): Called with every processed chunk, e.g. a ParquetSink.
+            value_impute_strategy (str): Strategy for imputing missing values. 'median' and
+                'kalman' are not supported, as they depend on values beyond the next chunk.
+            max_window_size (int): Maximum window size for feature generation.
+            value_impute_options (dict): Further options of the value imputation strategy.
+            window_features (List[str]): The window statistics to generate.
+            window_schedule: The window sizes to generate features for, see
+                get_window_sizes. Calendar windows use the frequency of the first chunk.
+
+        Returns:
+            List[str]: A list of names of the generated features.
+        """
+        for processed in self._iter_processed(
+            feature_columns,
+            value_impute_strategy,
+            max_window_size,
+            value_impute_options,
+            window_features,
+            window_schedule,
+        ):
+            sink(processed)
+        return self._candidate_names(feature_columns, max_window_size, window_features)
+
+    def process_timeseries_features(
+        self,
+        feature_columns: List[str],
+        target_column: str,
+        sink: Callable[[pd.DataFrame], None],
+        value_impute_strategy: str = "last",
+        max_window_size: int = 3,
+        feature_selector_model: str = "XGB",
+        max_features: int = 5,
+        sample_rows: int = 100_000,
+        feature_selector_options: dict = None,
+        value_impute_options: dict = None,
+        window_features: List[str] = None,
+        window_schedule=None,
+    ) -> List[str]:
+        """
+        Processes time series features out of core in two passes over the source. The first
+        pass selects features on a sample of rows spread evenly over time, the second writes
+        the imputed data with the selected features to the sink a chunk at a time.
+
+        Args:
+            feature_columns (List[str]): A list of column names to be used for feature generation.
+            target_column (str): The name of the target column.
+            sink (Callable): Called with every processed chunk, e.g. a ParquetSink.
+            value_impute_strategy (str): Strategy for imputing missing values. 'median' and
+                'kalman' are not supported, as they depend on values beyond the next chunk.
+            max_window_size (int): Maximum window size for feature generation.
+            feature_selector_model (str): Model to use for feature selection.
+            max_features (int): Maximum number of features to select.
+            sample_rows (int): Maximum number of rows the features are selected on.
+            feature_selector_options (dict): Further options of the feature selection model.
+            value_impute_options (dict): Further options of the value imputation strategy.
+            window_features (List[str]): The window statistics to generate candidates from.
+            window_schedule: The window sizes to generate candidates for.
+
+        Returns:
+            List[str]: The names of the selected features.
+        """
+        sample = self._sample_rows(
+            feature_columns,
+            value_impute_strategy,
+            max_window_size,
+            sample_rows,
+            value_impute_options,
+            window_features,
+            window_schedule,
+        )
+        generated_features = self._candidate_names(
+            feature_columns, max_window_size, window_features
+        )
+        feature_selector = get_feature_selector(
+            feature_selector_model, max_features, **(feature_selector_options or {})
+        )
+        # Like in memory, the back filled rows before the first full window are left out of
+        # the selection, unless no rows would remain
+        warmup_rows = int((sample.index < max(self.window_sizes, default=1) - 1).sum())
+        importance = feature_selector.rank_columns(
+            sample,
+            generated_features,
+            target_column,
+            warmup_rows if warmup_rows < len(sample) else 0,
+        )
+        selected = set(importance.nlargest(max_features).index)
+        self.selected_features = [
+            name for name in generated_features if name in selected
+        ]
+
+        columns_to_drop = [name for name in generated_features if name not in selected]
+        for processed in self._iter_processed(
+            feature_columns,
+            value_impute_strategy,
+            max_window_size,
+            value_impute_options,
+            window_features,
+            # Reuse the windows of the first pass, so both passes share the candidates
+            self.window_sizes or window_schedule,
+        ):
+            sink(processed.drop(columns=columns_to_drop))
+        return self.selected_features
+
+    def _sample_rows(
+        self,
+        feature_columns: List[str],
+        value_impute_strategy: str,
+        max_window_size: int,
+        sample_rows: int,
+        value_impute_options: dict = None,
+        window_features: List[str] = None,
+        window_schedule=None,
+    ) -> pd.DataFrame:
+        # Keep every stride-th row, doubling the stride whenever the sample grows too large
+        stride = 1
+        n_seen = 0
+        samples = []
+        n_sampled = 0
+        for processed in self._iter_processed(
+            feature_columns,
+            value_impute_strategy,
+            max_window_size,
+            value_impute_options,
+            window_features,
+            window_schedule,
+        ):
+            positions = np.arange(n_seen, n_seen + len(processed))
+            sample = processed[positions % stride == 0]
+            sample.index = positions[positions % stride == 0]
+            samples.append(sample)
+            n_sampled += len(sample)
+            n_seen += len(processed)
+            while n_sampled > sample_rows:
+                stride *= 2
+                samples = [sample[sample.index % stride == 0] for sample in samples]
+                n_sampled = sum(len(sample) for sample in samples)
+        return pd.concat(samples) if samples else pd.DataFrame()
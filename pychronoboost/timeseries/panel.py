@@ -0,0 +1,263 @@
+import os
+import numpy as np
+import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import List, Tuple
+from pychronoboost.cache import FeatureCache
+from pychronoboost.impute.timestep_impute import FREQ_INFER
+from pychronoboost.timeseries.feature_generator import (
+    DEFAULT_MAX_PAIRS,
+    select_column_pairs,
+)
+
+
+def resolve_n_jobs(n_jobs: int) -> int:
+    """
+    Resolve the number of worker processes, where -1 means all available CPUs.
+
+    :param n_jobs: Requested number of workers.
+    :return: The number of workers to use.
+    """
+    if n_jobs == -1:
+        return os.cpu_count() or 1
+    if n_jobs < 1:
+        raise ValueError(f"n_jobs must be a positive integer or -1, got {n_jobs}")
+    return n_jobs
+
+
+def _is_shareable(series: pd.Series) -> bool:
+    # Only plain numpy dtypes have a fixed-width buffer that can live in shared memory
+    return isinstance(series.dtype, np.dtype) and series.dtype.kind in "biufcmM"
+
+
+class SharedFrame:
+    """
+    Column store of a DataFrame in one shared memory block, so worker processes can slice
+    rows out of it instead of receiving a pickled copy of every slice.
+
+    Columns without a fixed-width numpy dtype (e.g. object or categorical) are kept in the
+    parent and sent along with each slice.
+    """
+
+    def __init__(self, data: pd.DataFrame, order: np.ndarray):
+        """
+        Copy the columns of data, reordered by order, into shared memory.
+
+        :param data: The DataFrame to share.
+        :param order: Row positions giving the order the rows are stored in.
+        """
+        self.columns = data.columns.tolist()
+        self.n_rows = len(order)
+        self.spec = []
+        self.local_columns = {}
+
+        offset = 0
+        for col in self.columns:
+            if _is_shareable(data[col]):
+                self.spec.append((col, data[col].dtype.str, offset))
+                offset += data[col].dtype.itemsize * self.n_rows
+            else:
+                self.local_columns[col] = data[col].take(order).reset_index(drop=True)
+
+        self.shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+        for col, dtype, col_offset in self.spec:
+            view = np.ndarray(
+                (self.n_rows,), dtype=dtype, buffer=self.shm.buf, offset=col_offset
+            )
+            np.take(data[col].to_numpy(), order, out=view)
+
+    def task(self, start: int, stop: int) -> dict:
+        """
+        Build the picklable description of a row slice for a worker process.
+        """
+        return {
+            "shm_name": self.shm.name,
+            "spec": self.spec,
+            "n_rows": self.n_rows,
+            "columns": self.columns,
+            "start": start,
+            "stop": stop,
+            "local_columns": {
+                col: values.iloc[start:stop]
+                for col, values in self.local_columns.items()
+            },
+        }
+
+    def close(self) -> None:
+        self.shm.close()
+        self.shm.unlink()
+
+
+def read_shared_slice(task: dict) -> pd.DataFrame:
+    """
+    Rebuild the DataFrame rows of a task from shared memory.
+
+    :param task: A task created by SharedFrame.task.
+    :return: A new DataFrame holding a copy of the rows.
+    """
+    shm = shared_memory.SharedMemory(name=task["shm_name"])
+    try:
+        start, stop = task["start"], task["stop"]
+        columns = {}
+        for col, dtype, offset in task["spec"]:
+            view = np.ndarray(
+                (task["n_rows"],), dtype=dtype, buffer=shm.buf, offset=offset
+            )
+            columns[col] = view[start:stop].copy()
+    finally:
+        shm.close()
+
+    for col, values in task["local_columns"].items():
+        columns[col] = values.to_numpy()
+
+    return pd.DataFrame(columns, columns=task["columns"])
+
+
+def _process_shared_group(
+    task: dict, group_key, config: dict
+) -> Tuple[pd.DataFrame, List[str]]:
+    return _process_group(read_shared_slice(task), group_key, config)
+
+
+def _process_group(
+    data: pd.DataFrame, group_key, config: dict
+) -> Tuple[pd.DataFrame, List[str]]:
+    # Imported here as the data module depends on this one
+    from pychronoboost.timeseries.data import TimeSeriesData
+
+    ts_data = TimeSeriesData(
+        data,
+        config["timestep_column"],
+        cache=config["cache"],
+        timestep_freq=config["timestep_freq"],
+        timestep_aggregation=config["timestep_aggregation"],
+        feature_dtype=config["feature_dtype"],
+    )
+    generated_features = ts_data.generate_candidate_features(
+        config["feature_columns"],
+        config["value_impute_strategy"],
+        config["max_window_size"],
+        config["value_impute_options"],
+        config["window_features"],
+        config["window_sizes"],
+        config["pair_features"],
+        column_pairs=config["column_pairs"],
+    )
+    ts_data.data[config["group_column"]] = group_key
+    return ts_data.data, generated_features
+
+
+def group_boundaries(
+    data: pd.DataFrame, group_column: str
+) -> Tuple[np.ndarray, list, np.ndarray]:
+    """
+    Find the row order that makes each group contiguous, and where each group starts.
+
+    Rows with a missing group key are left out, consistent with pandas groupby.
+
+    :param data: The DataFrame holding the panel data.
+    :param group_column: The name of the column identifying each series.
+    :return: The row order, the group keys and the boundaries of each group in that order.
+    """
+    codes, keys = pd.factorize(data[group_column], sort=True)
+    order = np.argsort(codes, kind="stable")
+    bounds = np.searchsorted(codes[order], np.arange(len(keys) + 1))
+    return order[bounds[0] :], list(keys), bounds - bounds[0]
+
+
+def process_groups(
+    data: pd.DataFrame,
+    timestep_column: str,
+    group_column: str,
+    feature_columns: List[str],
+    value_impute_strategy: str,
+    max_window_size: int,
+    n_jobs: int = 1,
+    cache: FeatureCache = None,
+    timestep_freq=FREQ_INFER,
+    timestep_aggregation: str = None,
+    value_impute_options: dict = None,
+    window_features: List[str] = None,
+    window_sizes: List[int] = None,
+    pair_features: List[str] = None,
+    max_pairs: int = DEFAULT_MAX_PAIRS,
+    feature_dtype: str = None,
+) -> Tuple[pd.DataFrame, List[str]]:
+    """
+    Impute and generate features independently for every series of a long-format panel.
+
+    With n_jobs > 1 and several groups, the groups are processed on a process pool. The input
+    is placed in shared memory once and every worker reads its own rows from it. Otherwise
+    every group is sliced from the input directly.
+
+    :param data: The DataFrame holding all series in long format.
+    :param timestep_column: The name of the timestep column.
+    :param group_column: The name of the column identifying each series.
+    :param feature_columns: Column names to be used for feature generation.
+    :param value_impute_strategy: Strategy for imputing missing values.
+    :param max_window_size: Maximum window size for feature generation.
+    :param n_jobs: Number of worker processes, -1 to use all CPUs.
+    :param cache: Optional on-disk cache used when processing each group.
+    :param timestep_freq: Step of the imputed timesteps, inferred for each group by default.
+    :param timestep_aggregation: Optional aggregation to resample each group onto its grid.
+    :param value_impute_options: Further options of the value imputation strategy.
+    :param window_features: The window statistics to generate, defaults to WINDOW_FEATURES.
+    :param window_sizes: The window sizes to generate features for, shared by all groups,
+        defaults to every window size up to max_window_size.
+    :param pair_features: If set, the statistics to generate for pairs of feature columns.
+    :param max_pairs: The maximum number of column pairs to generate pair features for. The
+        pairs are selected once on the whole panel and shared by all groups.
+    :param feature_dtype: The dtype of the generated features, see TimeSeriesData.
+    :return: The processed groups concatenated together, and the generated feature names.
+    """
+    n_jobs = resolve_n_jobs(n_jobs)
+    column_pairs = None
+    if pair_features is not None:
+        column_pairs = select_column_pairs(data, feature_columns, max_pairs)
+    order, keys, bounds = group_boundaries(data, group_column)
+    config = {
+        "timestep_column": timestep_column,
+        "group_column": group_column,
+        "feature_columns": feature_columns,
+        "value_impute_strategy": value_impute_strategy,
+        "max_window_size": max_window_size,
+        "cache": cache,
+        "timestep_freq": timestep_freq,
+        "timestep_aggregation": timestep_aggregation,
+        "value_impute_options": value_impute_options,
+        "window_features": window_features,
+        "window_sizes": window_sizes,
+        "pair_features": pair_features,
+        "column_pairs": column_pairs,
+        "feature_dtype": feature_dtype,
+    }
+
+    if n_jobs == 1 or len(keys) <= 1:
+        results = [
+            _process_group(
+                data.iloc[order[bounds[i] : bounds[i + 1]]].reset_index(drop=True),
+                key,
+                config,
+            )
+            for i, key in enumerate(keys)
+        ]
+    else:
+        # Only worker processes read their rows from shared memory
+        shared = SharedFrame(data, order)
+        try:
+            tasks = [shared.task(bounds[i], bounds[i + 1]) for i in range(len(keys))]
+            with ProcessPoolExecutor(max_workers=min(n_jobs, len(keys))) as executor:
+                results = list(
+                    executor.map(
+                        _process_shared_group, tasks, keys, [config] * len(keys)
+                    )
+                )
+        finally:
+            shared.close()
+
+    if not results:
+        return data.iloc[:0].copy(), []
+
+    processed = pd.concat([frame for frame, _ in results], ignore_index=True)
+    return processed, results[0][1]
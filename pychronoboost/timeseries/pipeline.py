@@ -0,0 +1,343 @@
+import json
+from itertools import combinations
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+from pychronoboost.impute.timestep_impute import FREQ_INFER
+from pychronoboost.timeseries.data import TimeSeriesData
+from pychronoboost.timeseries.feature_generator import (
+    DEFAULT_MAX_PAIRS,
+    FEATURE_DTYPES,
+    PairFeatureGenerator,
+    TimeSeriesFeatureGenerator,
+    compact_features,
+)
+from pychronoboost.timeseries.panel import group_boundaries
+from pychronoboost.timeseries.rolling import (
+    compute_pair_features,
+    compute_window_feature,
+)
+
+PIPELINE_FORMAT_VERSION = 1
+
+
+class FeaturePipeline:
+    def __init__(
+        self,
+        timestep_column: str,
+        feature_columns: List[str],
+        target_column: str,
+        value_impute_strategy: str = "last",
+        max_window_size: int = 3,
+        feature_selector_model: str = "XGB",
+        max_features: int = 5,
+        group_column: str = None,
+        feature_selector_options: dict = None,
+        timestep_freq=FREQ_INFER,
+        timestep_aggregation: str = None,
+        value_impute_options: dict = None,
+        window_features: List[str] = None,
+        window_schedule=None,
+        pair_features: List[str] = None,
+        max_pairs: int = DEFAULT_MAX_PAIRS,
+        feature_dtype: str = None,
+    ):
+        """
+        Initializes a feature pipeline, which remembers the features selected on fit so that
+        new data can be transformed without generating other candidates or refitting the
+        feature selector.
+
+        Args:
+            timestep_column (str): The name of the column that represents the timestep.
+            feature_columns (List[str]): A list of column names to be used for feature generation.
+            target_column (str): The name of the target column.
+            value_impute_strategy (str): Strategy for imputing missing values.
+            max_window_size (int): Maximum window size for feature generation.
+            feature_selector_model (str): Model to use for feature selection.
+            max_features (int): Maximum number of features to select.
+            group_column (str): Optional name of the column identifying each series.
+            feature_selector_options (dict): Further options of the feature selection model.
+            timestep_freq: Step of the imputed timesteps, or 'infer' to use the native frequency.
+                A frequency inferred on fit is reused by transform, unless 'group_column' is
+                set, in which case it is inferred for each series.
+            timestep_aggregation (str): Optional aggregation to resample rows onto the grid.
+            value_impute_options (dict): Further options of the value imputation strategy.
+            window_features (List[str]): The window statistics to generate candidates from,
+                defaults to min, max, avg and nth.
+            window_schedule: The window sizes to generate candidates for, e.g. 'geometric',
+                'calendar' or an explicit list of sizes. See get_window_sizes.
+            pair_features (List[str]): If set, also generates these statistics for pairs of
+                feature columns, e.g. ["corr", "ratio"].
+            max_pairs (int): The maximum number of column pairs to generate pair features for.
+            feature_dtype (str): The dtype of generated features, 'float64', 'float32' or
+                'compact'. See TimeSeriesData.
+        """
+        self.timestep_column = timestep_column
+        self.feature_columns = feature_columns
+        self.target_column = target_column
+        self.value_impute_strategy = value_impute_strategy
+        self.max_window_size = max_window_size
+        self.feature_selector_model = feature_selector_model
+        self.max_features = max_features
+        self.group_column = group_column
+        self.feature_selector_options = feature_selector_options
+        self.timestep_freq = timestep_freq
+        self.timestep_aggregation = timestep_aggregation
+        self.value_impute_options = value_impute_options
+        self.window_features = window_features
+        self.window_schedule = window_schedule
+        self.pair_features = pair_features
+        self.max_pairs = max_pairs
+        self.feature_dtype = feature_dtype
+        self.selected_features = []
+
+    @property
+    def is_fitted(self) -> bool:
+        return len(self.selected_features) > 0
+
+    @property
+    def selected_feature_names(self) -> List[str]:
+        return [spec["name"] for spec in self.selected_features]
+
+    def fit(
+        self, data: pd.DataFrame, n_jobs: int = 1, copy_on_write: bool = False
+    ) -> "FeaturePipeline":
+        """
+        Runs the full feature processing on data and records the selected features.
+
+        Args:
+            data (pd.DataFrame): The time series data to fit on. It is modified in place,
+                unless 'copy_on_write' is set.
+            n_jobs (int): Number of processes used when 'group_column' is set.
+            copy_on_write (bool): Whether to leave data unmodified, see TimeSeriesData.
+
+        Returns:
+            FeaturePipeline: The fitted pipeline.
+        """
+        self.fit_transform(data, n_jobs, copy_on_write)
+        return self
+
+    def fit_transform(
+        self, data: pd.DataFrame, n_jobs: int = 1, copy_on_write: bool = False
+    ) -> pd.DataFrame:
+        """
+        Runs the full feature processing on data and records the selected features.
+
+        Args:
+            data (pd.DataFrame): The time series data to fit on. It is modified in place,
+                unless 'copy_on_write' is set.
+            n_jobs (int): Number of processes used when 'group_column' is set.
+            copy_on_write (bool): Whether to leave data unmodified, see TimeSeriesData.
+
+        Returns:
+            pd.DataFrame: The processed DataFrame with imputed and selected features.
+        """
+        ts_data = TimeSeriesData(
+            data,
+            self.timestep_column,
+            self.group_column,
+            timestep_freq=self.timestep_freq,
+            timestep_aggregation=self.timestep_aggregation,
+            feature_dtype=self.feature_dtype,
+            copy_on_write=copy_on_write,
+        )
+        processed_data = ts_data.process_timeseries_features(
+            self.feature_columns,
+            self.target_column,
+            value_impute_strategy=self.value_impute_strategy,
+            max_window_size=self.max_window_size,
+            feature_selector_model=self.feature_selector_model,
+            max_features=self.max_features,
+            n_jobs=n_jobs,
+            feature_selector_options=self.feature_selector_options,
+            value_impute_options=self.value_impute_options,
+            window_features=self.window_features,
+            window_schedule=self.window_schedule,
+            pair_features=self.pair_features,
+            max_pairs=self.max_pairs,
+        )
+
+        if self.timestep_freq == FREQ_INFER and ts_data.timestep_strategy is not None:
+            self.timestep_freq = ts_data.timestep_strategy.freq
+
+        # Keep the selected features in the order they were generated in
+        selected = set(ts_data.selected_features)
+        window_sizes = ts_data.window_sizes(self.max_window_size, self.window_schedule)
+        self.selected_features = [
+            spec
+            for spec in self._candidate_specs(window_sizes)
+            if spec["name"] in selected
+        ]
+        return processed_data
+
+    def transform(self, data: pd.DataFrame) -> pd.DataFrame:
+        """
+        Imputes data and computes only the features selected on fit.
+
+        Args:
+            data (pd.DataFrame): The time series data to transform.
+
+        Returns:
+            pd.DataFrame: The processed DataFrame, with the same columns as on fit.
+
+        Raises:
+            ValueError: If the pipeline has not been fitted.
+        """
+        if not self.is_fitted:
+            raise ValueError("The pipeline must be fitted before calling transform.")
+
+        if self.group_column is None:
+            return self._transform_series(data)
+
+        order, keys, bounds = group_boundaries(data, self.group_column)
+        frames = []
+        for i, key in enumerate(keys):
+            group = data.take(order[bounds[i] : bounds[i + 1]]).reset_index(drop=True)
+            frame = self._transform_series(group)
+            frame[self.group_column] = key
+            frames.append(frame)
+        return pd.concat(frames, ignore_index=True)
+
+    def _transform_series(self, data: pd.DataFrame) -> pd.DataFrame:
+        ts_data = TimeSeriesData(
+            data,
+            self.timestep_column,
+            timestep_freq=self.timestep_freq,
+            timestep_aggregation=self.timestep_aggregation,
+            feature_dtype=self.feature_dtype,
+            # The data to transform is never modified
+            copy_on_write=True,
+        )
+        ts_data.impute_timesteps()
+        ts_data.impute_values(
+            self.feature_columns,
+            self.value_impute_strategy,
+            options=self.value_impute_options,
+        )
+
+        names = self.selected_feature_names
+        features = np.empty(
+            (len(names), len(ts_data.data)), dtype=FEATURE_DTYPES[ts_data.feature_dtype]
+        )
+        for i, spec in enumerate(self.selected_features):
+            values = ts_data.data[spec["column"]].to_numpy(
+                dtype=np.float64, na_value=np.nan
+            )
+            if "other_column" in spec:
+                other_values = ts_data.data[spec["other_column"]].to_numpy(
+                    dtype=np.float64, na_value=np.nan
+                )
+                compute_pair_features(
+                    np.stack([values, other_values]),
+                    [(0, 1)],
+                    [spec["window_size"]],
+                    out=features[i : i + 1],
+                    features=[spec["feature"]],
+                )
+            else:
+                features[i] = compute_window_feature(
+                    values, spec["feature"], spec["window_size"]
+                )
+
+        ts_data.data = pd.concat(
+            [
+                ts_data.data,
+                pd.DataFrame(
+                    features.T, index=ts_data.data.index, columns=names, copy=False
+                ),
+            ],
+            axis=1,
+        )
+        ts_data.impute_values(names, "last")
+        if ts_data.feature_dtype == "compact":
+            compact_features(ts_data.data, names)
+        return ts_data.data
+
+    def _candidate_specs(self, window_sizes: List[int]) -> List[Dict]:
+        feature_generator = TimeSeriesFeatureGenerator(
+            self.max_window_size, self.window_features, window_sizes
+        )
+        specs = [
+            {
+                "name": name,
+                "column": column,
+                "feature": feature,
+                "window_size": window_size,
+            }
+            for column in self.feature_columns
+            for name, feature, window_size in feature_generator.feature_specs(column)
+        ]
+        if self.pair_features is not None:
+            # Every pair the prefilter may have kept, only the selected ones are matched
+            pair_generator = PairFeatureGenerator(
+                self.max_window_size, self.pair_features, window_sizes
+            )
+            pairs = list(combinations(dict.fromkeys(self.feature_columns), 2))
+            specs += [
+                {
+                    "name": name,
+                    "column": column,
+                    "other_column": other_column,
+                    "feature": feature,
+                    "window_size": window_size,
+                }
+                for name, column, other_column, feature, window_size in (
+                    pair_generator.feature_specs(pairs)
+                )
+            ]
+        return specs
+
+    def to_dict(self) -> Dict:
+        """
+        Returns a JSON serializable description of the pipeline.
+        """
+        return {
+            "version": PIPELINE_FORMAT_VERSION,
+            "timestep_column": self.timestep_column,
+            "feature_columns": self.feature_columns,
+            "target_column": self.target_column,
+            "value_impute_strategy": self.value_impute_strategy,
+            "max_window_size": self.max_window_size,
+            "feature_selector_model": self.feature_selector_model,
+            "max_features": self.max_features,
+            "group_column": self.group_column,
+            "feature_selector_options": self.feature_selector_options,
+            "timestep_freq": self.timestep_freq,
+            "timestep_aggregation": self.timestep_aggregation,
+            "value_impute_options": self.value_impute_options,
+            "window_features": self.window_features,
+            "window_schedule": self.window_schedule,
+            "pair_features": self.pair_features,
+            "max_pairs": self.max_pairs,
+            "feature_dtype": self.feature_dtype,
+            "selected_features": self.selected_features,
+        }
+
+    @classmethod
+    def from_dict(cls, config: Dict) -> "FeaturePipeline":
+        """
+        Creates a pipeline from the output of to_dict.
+        """
+        config = dict(config)
+        version = config.pop("version", None)
+        if version != PIPELINE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported pipeline format version: {version}")
+        selected_features = config.pop("selected_features")
+        pipeline = cls(**config)
+        pipeline.selected_features = selected_features
+        return pipeline
+
+    def save(self, path: str) -> None:
+        """
+        Saves the pipeline to a JSON file.
+        """
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    @classmethod
+    def load(cls, path: str) -> "FeaturePipeline":
+        """
+        Loads a pipeline saved with save.
+        """
+        with open(path) as f:
+            return cls.from_dict(json.load(f))
@@ -0,0 +1,828 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Sequence, Tuple
+
+# The window statistics generated by default
+WINDOW_FEATURES = ["min", "max", "avg", "nth"]
+# All window statistics that can be generated
+AVAILABLE_WINDOW_FEATURES = WINDOW_FEATURES + [
+    "sum",
+    "std",
+    "var",
+    "median",
+    "q25",
+    "q75",
+    "skew",
+    "ewm",
+    "diff",
+    "pct_change",
+    "slope",
+]
+# The statistics generated for pairs of series
+PAIR_FEATURES = ["cov", "corr", "ratio", "spread"]
+_QUANTILES = {"median": 0.5, "q25": 0.25, "q75": 0.75}
+# Number of window values sorted at once when computing quantiles
+_SORT_BATCH_SIZE = 2**22
+
+
+def check_window_features(features: Sequence[str] = None) -> List[str]:
+    """
+    Validate a selection of window statistics.
+
+    :param features: Names from AVAILABLE_WINDOW_FEATURES, defaults to WINDOW_FEATURES.
+    :return: The list of window statistics.
+    """
+    if features is None:
+        return list(WINDOW_FEATURES)
+    for feature in features:
+        if feature not in AVAILABLE_WINDOW_FEATURES:
+            raise NotImplementedError(f"Window feature {feature} not available")
+    if len(set(features)) != len(features):
+        raise ValueError("Window features must not repeat")
+    return list(features)
+
+
+def window_feature_names(
+    value_column: str, window_sizes: Sequence[int], features: Sequence[str] = None
+) -> List[str]:
+    """
+    Build the generated feature names in the order they are laid out by compute_window_features.
+
+    :param value_column: The name of the column the features are generated from.
+    :param window_sizes: The window sizes to generate features for.
+    :param features: The window statistics to generate, defaults to WINDOW_FEATURES.
+    :return: List of feature names, grouped by window size.
+    """
+    features = WINDOW_FEATURES if features is None else features
+    return [
+        f"{value_column}_{feature}_{window_size}"
+        for window_size in window_sizes
+        for feature in features
+    ]
+
+
+def _doubling_levels(
+    values: np.ndarray, func, max_window_size: int
+) -> List[np.ndarray]:
+    """
+    Build a sparse table where level k holds func over the trailing window of size 2**k.
+
+    Leading positions without a full window, and windows containing a NaN, are NaN.
+    """
+    levels = [values]
+    span = 1
+    while span * 2 <= max_window_size:
+        previous = levels[-1]
+        level = np.full_like(previous, np.nan)
+        func(previous[span:], previous[:-span], out=level[span:])
+        levels.append(level)
+        span *= 2
+    return levels
+
+
+def _rolling_extreme(
+    levels: List[np.ndarray], func, window_size: int, out: np.ndarray
+) -> None:
+    """
+    Combine two overlapping power-of-two windows from the sparse table into one window.
+    """
+    k = window_size.bit_length() - 1
+    span = 1 << k
+    level = levels[k]
+    offset = window_size - span
+    if offset == 0:
+        out[:] = level
+        return
+    out[:offset] = np.nan
+    func(level[offset:], level[:-offset], out=out[offset:])
+
+
+class _BlockedSums:
+    """
+    Prefix sums restarted at every block of rows, so their rounding error stays bounded by
+    the block instead of growing with the length of the series. A window spans at most two
+    blocks, and its sum adds a suffix sum over the tail of the first block to the prefix sum
+    over the head of the second.
+
+    The prefix sums are taken over 'head', the values centered on their own block, and the
+    suffix sums over 'tail', the values centered on the next block, so every window is summed
+    around the center of the block of its last row.
+
+    The sums run along the last axis, so many series are summed in one operation. The blocks
+    are aligned to the position 'start' of the first row in the whole series, so the sums of
+    a continued series are the same as those of the whole series.
+    """
+
+    def __init__(
+        self, head: np.ndarray, tail: np.ndarray, block_size: int, start: int = 0
+    ):
+        n_rows = head.shape[-1]
+        lead = start % block_size
+        n_blocks = max(-(-(lead + n_rows) // block_size), 1)
+        blocked_shape = head.shape[:-1] + (n_blocks, block_size)
+        padded = np.zeros(head.shape[:-1] + (n_blocks * block_size,))
+        rows = slice(lead, lead + n_rows)
+        padded[..., rows] = head
+        local = np.cumsum(padded.reshape(blocked_shape), axis=-1)
+        self.block_size = block_size
+        self.start = start
+        self.n_rows = n_rows
+        self.inclusive = local.reshape(padded.shape)[..., rows]
+        exclusive = np.zeros_like(local)
+        exclusive[..., 1:] = local[..., :-1]
+        self.exclusive = exclusive.reshape(padded.shape)[..., rows]
+        padded[..., rows] = tail
+        suffix = np.cumsum(padded.reshape(blocked_shape)[..., ::-1], axis=-1)[..., ::-1]
+        self.suffix = suffix.reshape(padded.shape)[..., rows]
+
+    def _spans(self, window_size: int) -> np.ndarray:
+        # Whether each full trailing window starts in an earlier block than its last row
+        starts = self.start + np.arange(self.n_rows - window_size + 1)
+        return (
+            starts // self.block_size != (starts + window_size - 1) // self.block_size
+        )
+
+    def window_sums(self, window_size: int) -> np.ndarray:
+        """
+        Sums over every full trailing window, for windows ending at window_size - 1 onwards.
+        """
+        n_rows = self.n_rows
+        heads = self.inclusive[..., window_size - 1 :]
+        sums = heads - self.exclusive[..., : n_rows - window_size + 1]
+        spans = self._spans(window_size)
+        sums[..., spans] = (
+            self.suffix[..., : n_rows - window_size + 1][..., spans] + heads[..., spans]
+        )
+        return sums
+
+    def head_sums(self, window_size: int) -> np.ndarray:
+        """
+        Sums over the part of every full trailing window in the block of its last row.
+        """
+        spans = self._spans(window_size)
+        return np.where(spans, self.inclusive[..., window_size - 1 :], 0.0)
+
+
+# Rows per block of the blocked prefix sums
+_SUM_BLOCK_SIZE = 4096
+
+
+class _WindowStatistics:
+    """
+    Shared state of one series from which all window statistics are read.
+
+    Every piece of state is built once, on first use, and shared by all statistics and window
+    sizes that need it: NaN counts for the windows holding a NaN, blocked prefix sums of the
+    powers of the centered values for sums, averages and moments, the doubling tables for min/max, and the sorted windows of
+    one window size for all of its quantiles.
+    """
+
+    def __init__(self, values: np.ndarray, max_window_size: int, start: int = 0):
+        self.values = values
+        self.max_window_size = max_window_size
+        # Position of the first value in the whole series, which aligns the blocks of sums
+        self.start = start
+        self._state = {}
+
+    def _get(self, key, build):
+        if key not in self._state:
+            self._state[key] = build()
+        return self._state[key]
+
+    def window_has_nan(self, window_size: int) -> np.ndarray:
+        """
+        Whether each full trailing window contains a NaN, for windows ending at window_size - 1
+        onwards.
+        """
+
+        def build():
+            nan_mask = np.isnan(self.values)
+            if not nan_mask.any():
+                return None
+            return np.concatenate(([0], np.cumsum(nan_mask)))
+
+        nan_count = self._get("nan_count", build)
+        if nan_count is None:
+            return np.zeros(len(self.values) - window_size + 1, dtype=bool)
+        return nan_count[window_size:] - nan_count[:-window_size] > 0
+
+    def _levels(self, func) -> List[np.ndarray]:
+        return self._get(
+            func.__name__,
+            lambda: _doubling_levels(self.values, func, self.max_window_size),
+        )
+
+    def _block_size(self) -> int:
+        return max(_SUM_BLOCK_SIZE, self.max_window_size)
+
+    def _positions(self) -> np.ndarray:
+        # Position of every value in the whole series
+        return self.start + np.arange(len(self.values))
+
+    def _centers(self) -> np.ndarray:
+        # Every block is centered on its first observed value, which keeps the power sums
+        # small wherever the series wanders, so they lose little precision
+        def build():
+            block_size = self._block_size()
+            lead = self.start % block_size
+            n_blocks = max(-(-(lead + len(self.values)) // block_size), 1)
+            padded = np.full(n_blocks * block_size, np.nan)
+            padded[lead : lead + len(self.values)] = self.values
+            blocks = padded.reshape(n_blocks, block_size)
+            observed = ~np.isnan(blocks)
+            # A trailing center for the values of the last block centered on the next one
+            centers = np.zeros(n_blocks + 1)
+            centers[:-1] = blocks[np.arange(n_blocks), observed.argmax(axis=1)]
+            centers[:-1][~observed.any(axis=1)] = 0.0
+            return centers
+
+        return self._get("centers", build)
+
+    def _centered(self, next_block: bool = False) -> np.ndarray:
+        # The values centered on their own block, or on the next block for the windows
+        # reaching into it, and zero where missing
+        def build():
+            block_size = self._block_size()
+            blocks = self._positions() // block_size - self.start // block_size
+            centered = self.values - self._centers()[blocks + next_block]
+            centered[np.isnan(centered)] = 0.0
+            return centered
+
+        return self._get(("centered", next_block), build)
+
+    def _power_sums(self, power: int) -> _BlockedSums:
+        return self._get(
+            ("power_sums", power),
+            lambda: _BlockedSums(
+                self._centered() ** power,
+                self._centered(next_block=True) ** power,
+                self._block_size(),
+                self.start,
+            ),
+        )
+
+    def _moments(self, window_size: int):
+        """
+        Second and third central moments of every full window.
+        """
+
+        def build():
+            first, second, third = (
+                self._power_sums(power).window_sums(window_size) / window_size
+                for power in (1, 2, 3)
+            )
+            variance = second - first * first
+            skewness = third - first * first * first - 3 * first * variance
+            return variance, skewness
+
+        return self._get(("moments", window_size), build)
+
+    def _is_constant(self, window_size: int) -> np.ndarray:
+        minimum = np.empty(len(self.values))
+        maximum = np.empty(len(self.values))
+        _rolling_extreme(self._levels(np.minimum), np.minimum, window_size, minimum)
+        _rolling_extreme(self._levels(np.maximum), np.maximum, window_size, maximum)
+        return (minimum == maximum)[window_size - 1 :]
+
+    def compute(self, feature: str, window_size: int, out: np.ndarray) -> None:
+        """
+        Compute one window statistic, except quantiles, into out.
+        """
+        if feature in ("min", "max"):
+            func = np.minimum if feature == "min" else np.maximum
+            _rolling_extreme(self._levels(func), func, window_size, out)
+        elif feature in ("avg", "sum"):
+            self._sum(window_size, out, mean=feature == "avg")
+        elif feature == "nth":
+            _shift(self.values, window_size - 1, out)
+        elif feature in ("diff", "pct_change"):
+            _shift(self.values, window_size - 1, out)
+            if feature == "diff":
+                np.subtract(self.values, out, out=out)
+            else:
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    np.divide(self.values, out, out=out)
+                out -= 1
+        elif feature == "ewm":
+            self._ewm(window_size, out)
+        else:
+            out[: window_size - 1] = np.nan
+            valid = out[window_size - 1 :]
+            if feature in ("var", "std"):
+                self._variance(window_size, valid)
+                if feature == "std":
+                    np.sqrt(valid, out=valid)
+            elif feature == "skew":
+                self._skew(window_size, valid)
+            else:
+                self._slope(window_size, valid)
+            valid[self.window_has_nan(window_size)] = np.nan
+
+    def _sum(self, window_size: int, out: np.ndarray, mean: bool) -> None:
+        # Blocked sums of the centered values, so the error neither grows with the length of
+        # the series nor with the magnitude of its level
+        out[: window_size - 1] = np.nan
+        valid = out[window_size - 1 :]
+        np.copyto(valid, self._power_sums(1).window_sums(window_size))
+        # Every window is centered on the block of its last row
+        block_size = self._block_size()
+        blocks = self._positions()[window_size - 1 :] // block_size
+        centers = self._centers()[blocks - self.start // block_size]
+        if mean:
+            valid /= window_size
+            valid += centers
+        else:
+            valid += window_size * centers
+        valid[self.window_has_nan(window_size)] = np.nan
+
+    def _variance(self, window_size: int, out: np.ndarray) -> None:
+        if window_size < 2:
+            out[:] = np.nan
+            return
+        variance, _ = self._moments(window_size)
+        np.multiply(variance, window_size / (window_size - 1), out=out)
+        # Like pandas, constant windows have no variance and rounding never makes it negative
+        out[(out < 0) | self._is_constant(window_size)] = 0.0
+
+    def _skew(self, window_size: int, out: np.ndarray) -> None:
+        if window_size < 3:
+            out[:] = np.nan
+            return
+        variance, skewness = self._moments(window_size)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            np.divide(
+                np.sqrt(window_size * (window_size - 1.0)) * skewness,
+                (window_size - 2) * variance**1.5,
+                out=out,
+            )
+        out[variance <= 1e-14] = np.nan
+        out[self._is_constant(window_size)] = 0.0
+
+    def _slope(self, window_size: int, out: np.ndarray) -> None:
+        # Least squares slope against the positions 0 .. w - 1 within the window, from the
+        # sums of the values and of the values weighted by their position within the block
+        if window_size < 2:
+            out[:] = np.nan
+            return
+        block_size = self._block_size()
+        positions = self._positions() % block_size
+
+        def build():
+            return _BlockedSums(
+                positions * self._centered(),
+                positions * self._centered(next_block=True),
+                block_size,
+                self.start,
+            )
+
+        weighted_sums = self._get("weighted_sums", build)
+        sums = self._power_sums(1)
+        window_sums = sums.window_sums(window_size)
+        # Position of each value within the window, as a block offset minus the window start
+        weighted = weighted_sums.window_sums(window_size)
+        weighted += block_size * sums.head_sums(window_size)
+        weighted -= positions[: len(window_sums)] * window_sums
+        weighted -= (window_size - 1) / 2 * window_sums
+        np.divide(weighted, window_size * (window_size**2 - 1) / 12, out=out)
+
+    def _ewm(self, window_size: int, out: np.ndarray) -> None:
+        # Exponentially weighted mean with span window_size over the forward filled series,
+        # NaN wherever the trailing window is incomplete or holds a NaN
+        filled = self._get("filled", lambda: pd.Series(self.values).ffill().to_numpy())
+        alpha = 2.0 / (window_size + 1)
+        out[:] = pd.Series(filled).ewm(alpha=alpha, adjust=False).mean().to_numpy()
+        out[: window_size - 1] = np.nan
+        out[window_size - 1 :][self.window_has_nan(window_size)] = np.nan
+
+    def compute_quantiles(self, window_size: int, outs: Dict[str, np.ndarray]) -> None:
+        """
+        Compute all requested quantiles of one window size from one sort of its windows.
+
+        :param window_size: The window size.
+        :param outs: Arrays to write to, keyed by quantile feature name.
+        """
+        for out in outs.values():
+            out[: window_size - 1] = np.nan
+        windows = np.lib.stride_tricks.sliding_window_view(self.values, window_size)
+        batch_size = max(_SORT_BATCH_SIZE // window_size, 1)
+        lower, upper = (window_size - 1) // 2, window_size // 2
+        for start in range(0, len(windows), batch_size):
+            # NaN sorts last, so a window holds a NaN if its largest value is NaN
+            ordered = np.sort(windows[start : start + batch_size], axis=1)
+            has_nan = np.isnan(ordered[:, -1])
+            rows = slice(
+                window_size - 1 + start, window_size - 1 + start + len(ordered)
+            )
+            for feature, out in outs.items():
+                if feature == "median":
+                    # Averaged like the pandas rolling median, not interpolated
+                    values = (ordered[:, lower] + ordered[:, upper]) / 2
+                else:
+                    position = _QUANTILES[feature] * (window_size - 1)
+                    low = int(np.floor(position))
+                    high = min(low + 1, window_size - 1)
+                    values = ordered[:, low] + (ordered[:, high] - ordered[:, low]) * (
+                        position - low
+                    )
+                values[has_nan] = np.nan
+                out[rows] = values
+
+
+def _shift(values: np.ndarray, periods: int, out: np.ndarray) -> None:
+    out[:periods] = np.nan
+    out[periods:] = values[: len(values) - periods]
+
+
+def compute_window_features(
+    values: np.ndarray,
+    window_sizes: Sequence[int],
+    out: Optional[np.ndarray] = None,
+    features: Sequence[str] = None,
+    start: int = 0,
+) -> np.ndarray:
+    """
+    Compute window statistics for every window size in one pass over the series.
+
+    All statistics are read from state shared across statistics and window sizes. Rolling
+    min/max come from a sparse table built by repeated doubling, so every window size costs one
+    vectorized comparison instead of a full rolling rescan. Sums, averages, variances, skews
+    and slopes are differences of prefix sums of the values and their powers, restarted at
+    every block of rows and centered on the level of each block, so their precision degrades
+    neither with the length nor with the level or drift of the series. All quantiles of a
+    window size come from one sort of its windows. Results match pandas rolling statistics,
+    ``shift``, ``diff`` and ``pct_change`` over w - 1 periods, and ``ewm(span=w,
+    adjust=False)``: positions without a full window, or with a NaN in the window, are NaN.
+
+    :param values: 1-D array with the series values.
+    :param window_sizes: The window sizes to generate features for.
+    :param out: Optional preallocated array of shape (len(features) * len(window_sizes), n)
+        to write the features into. Features are computed in float64 and cast if out has
+        another float dtype, e.g. float32 to halve its memory.
+    :param features: The window statistics to compute, defaults to WINDOW_FEATURES.
+    :param start: Position of the first value in a longer series, which the blocks of the
+        prefix sums are aligned to, so a continued series gets exactly the features of the
+        whole series, see RollingWindowState.
+    :return: Array of shape (len(features) * len(window_sizes), n), one row per feature in the
+        order given by window_feature_names.
+    """
+    features = check_window_features(features)
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    n_features = len(features) * len(window_sizes)
+    if out is None:
+        out = np.empty((n_features, len(values)), dtype=np.float64)
+    elif out.shape != (n_features, len(values)):
+        raise ValueError(
+            f"out has shape {out.shape}, expected {(n_features, len(values))}"
+        )
+    if len(window_sizes) == 0:
+        return out
+    if min(window_sizes) < 1:
+        raise ValueError("Window sizes must be positive integers")
+
+    statistics = _WindowStatistics(values, max(window_sizes), start)
+    # Other dtypes are written one window size at a time from a float64 buffer
+    buffer = None if out.dtype == np.float64 else np.empty((len(features), len(values)))
+    for i, window_size in enumerate(window_sizes):
+        target = out[i * len(features) : (i + 1) * len(features)]
+        rows = target if buffer is None else buffer
+        if window_size > len(values):
+            target[:] = np.nan
+            continue
+        quantiles = {}
+        for feature, row in zip(features, rows):
+            if feature in _QUANTILES:
+                quantiles[feature] = row
+            else:
+                statistics.compute(feature, window_size, row)
+        if quantiles:
+            statistics.compute_quantiles(window_size, quantiles)
+        if buffer is not None:
+            target[:] = buffer
+
+    return out
+
+
+def compute_window_feature(
+    values: np.ndarray, feature: str, window_size: int
+) -> np.ndarray:
+    """
+    Compute a single window feature, without computing any other window size.
+
+    :param values: 1-D array with the series values.
+    :param feature: One of AVAILABLE_WINDOW_FEATURES.
+    :param window_size: The window size of the feature.
+    :return: 1-D array with the feature, equal to the matching row of compute_window_features.
+    """
+    check_window_features([feature])
+    if window_size < 1:
+        raise ValueError("Window sizes must be positive integers")
+    return compute_window_features(values, [window_size], features=[feature])[0]
+
+
+def check_pair_features(features: Sequence[str] = None) -> List[str]:
+    """
+    Validate a selection of pair statistics.
+
+    :param features: Names from PAIR_FEATURES, defaults to all of them.
+    :return: The list of pair statistics.
+    """
+    if features is None:
+        return list(PAIR_FEATURES)
+    for feature in features:
+        if feature not in PAIR_FEATURES:
+            raise NotImplementedError(f"Pair feature {feature} not available")
+    if len(set(features)) != len(features):
+        raise ValueError("Pair features must not repeat")
+    return list(features)
+
+
+def pair_feature_names(
+    pairs: Sequence[Tuple[str, str]],
+    window_sizes: Sequence[int],
+    features: Sequence[str] = None,
+) -> List[str]:
+    """
+    Build the pair feature names in the order they are laid out by compute_pair_features.
+
+    :param pairs: The (first, second) column names of every pair.
+    :param window_sizes: The window sizes to generate features for.
+    :param features: The pair statistics to generate, defaults to PAIR_FEATURES.
+    :return: List of feature names, grouped by pair and then by window size.
+    """
+    features = PAIR_FEATURES if features is None else features
+    return [
+        f"{first}_{second}_{feature}_{window_size}"
+        for first, second in pairs
+        for window_size in window_sizes
+        for feature in features
+    ]
+
+
+# Number of pair values processed at once
+_PAIR_BATCH_SIZE = 2**22
+
+
+def compute_pair_features(
+    values: np.ndarray,
+    pairs: Sequence[Tuple[int, int]],
+    window_sizes: Sequence[int],
+    out: Optional[np.ndarray] = None,
+    features: Sequence[str] = None,
+) -> np.ndarray:
+    """
+    Compute statistics of pairs of series for every window size, for a batch of pairs at once.
+
+    The products of the centered series of a batch of pairs are summed by one blocked prefix
+    sum over a (pairs, blocks, rows) array, and every window size and pair then costs a few
+    vectorized differences. Per series state, i.e. the sums and variances of each series, is
+    shared by all pairs it is part of. 'cov' and 'corr' match the pandas rolling cov and corr,
+    NaN for constant windows, and 'ratio' and 'spread' divide and subtract the second series
+    lagged by w - 1 periods from the first. Positions without a full window, or with a NaN in
+    the window of either series, are NaN.
+
+    :param values: Array of shape (series, n) with the values of every series.
+    :param pairs: The (first, second) row indices of every pair in values.
+    :param window_sizes: The window sizes to generate features for.
+    :param out: Optional preallocated float array of shape
+        (len(pairs) * len(window_sizes) * len(features), n) to write the features into.
+    :param features: The pair statistics to compute, defaults to PAIR_FEATURES.
+    :return: Array with one row per feature in the order given by pair_feature_names.
+    """
+    features = check_pair_features(features)
+    values = np.ascontiguousarray(values, dtype=np.float64)
+    if values.ndim != 2:
+        raise ValueError("values must have shape (series, rows)")
+    n_rows = values.shape[1]
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    n_per_pair = len(window_sizes) * len(features)
+    n_features = len(pairs) * n_per_pair
+    if out is None:
+        out = np.empty((n_features, n_rows), dtype=np.float64)
+    elif out.shape != (n_features, n_rows):
+        raise ValueError(f"out has shape {out.shape}, expected {(n_features, n_rows)}")
+    if len(window_sizes) == 0 or len(pairs) == 0:
+        return out
+    if min(window_sizes) < 1:
+        raise ValueError("Window sizes must be positive integers")
+    rows = out.reshape(len(pairs), len(window_sizes), len(features), n_rows)
+
+    max_window_size = max(window_sizes)
+    statistics = {
+        series: _WindowStatistics(values[series], max_window_size)
+        for series in np.unique(pairs)
+    }
+    batch_size = max(_PAIR_BATCH_SIZE // max(n_rows, 1), 1)
+    for start in range(0, len(pairs), batch_size):
+        batch = pairs[start : start + batch_size]
+        # Statistics of every series in the batch, indexed by its position in the batch
+        series, positions = np.unique(batch, return_inverse=True)
+        positions = positions.reshape(batch.shape)
+        batch_statistics = [statistics[i] for i in series]
+        products = None
+        if "cov" in features or "corr" in features:
+            # One 3-D blocked prefix sum covers the products of the whole batch
+            centered = np.stack([stats._centered() for stats in batch_statistics])
+            head = centered[positions[:, 0]] * centered[positions[:, 1]]
+            centered = np.stack(
+                [stats._centered(next_block=True) for stats in batch_statistics]
+            )
+            tail = centered[positions[:, 0]] * centered[positions[:, 1]]
+            del centered
+            products = _BlockedSums(head, tail, batch_statistics[0]._block_size())
+            del head, tail
+            nan_mask = np.isnan(values[batch[:, 0]]) | np.isnan(values[batch[:, 1]])
+            nan_counts = np.zeros((len(batch), n_rows + 1), dtype=np.int64)
+            np.cumsum(nan_mask, axis=1, out=nan_counts[:, 1:])
+
+        for i, window_size in enumerate(window_sizes):
+            target = rows[start : start + len(batch), i]
+            if window_size > n_rows:
+                target[:] = np.nan
+                continue
+            if products is not None:
+                _pair_moments(
+                    batch_statistics,
+                    positions,
+                    products,
+                    nan_counts,
+                    window_size,
+                    {
+                        feature: target[:, j]
+                        for j, feature in enumerate(features)
+                        if feature in ("cov", "corr")
+                    },
+                )
+            for j, feature in enumerate(features):
+                if feature in ("ratio", "spread"):
+                    lagged = np.full((len(batch), n_rows), np.nan)
+                    lagged[:, window_size - 1 :] = values[
+                        batch[:, 1], : n_rows - window_size + 1
+                    ]
+                    if feature == "spread":
+                        np.subtract(values[batch[:, 0]], lagged, out=target[:, j])
+                    else:
+                        with np.errstate(divide="ignore", invalid="ignore"):
+                            np.divide(values[batch[:, 0]], lagged, out=target[:, j])
+
+    return out
+
+
+def _pair_moments(
+    statistics: List["_WindowStatistics"],
+    positions: np.ndarray,
+    products: _BlockedSums,
+    nan_counts: np.ndarray,
+    window_size: int,
+    outs: Dict[str, np.ndarray],
+) -> None:
+    # Rolling covariance and correlation of a batch of pairs, into arrays of shape (pairs, n).
+    # Sums and variances are computed once per series and gathered for every pair.
+    n_rows = products.n_rows
+    for out in outs.values():
+        out[:, : window_size - 1] = np.nan
+    if window_size < 2:
+        for out in outs.values():
+            out[:] = np.nan
+        return
+
+    sums = np.stack(
+        [stats._power_sums(1).window_sums(window_size) for stats in statistics]
+    )
+    covariance = products.window_sums(window_size)
+    covariance -= sums[positions[:, 0]] * sums[positions[:, 1]] / window_size
+    covariance /= window_size - 1
+
+    has_nan = nan_counts[:, window_size:] - nan_counts[:, :-window_size] > 0
+    if "cov" in outs:
+        outs["cov"][:, window_size - 1 :] = covariance
+        outs["cov"][:, window_size - 1 :][has_nan] = np.nan
+    if "corr" in outs:
+        variances = np.empty((len(statistics), n_rows - window_size + 1))
+        for row, stats in zip(variances, statistics):
+            stats._variance(window_size, row)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            correlation = covariance / np.sqrt(
+                variances[positions[:, 0]] * variances[positions[:, 1]]
+            )
+        # Like pandas, constant windows have no correlation, and rounding stays within [-1, 1]
+        constant = variances == 0
+        correlation[constant[positions[:, 0]] | constant[positions[:, 1]]] = np.nan
+        np.clip(correlation, -1.0, 1.0, out=correlation)
+        correlation[has_nan] = np.nan
+        outs["corr"][:, window_size - 1 :] = correlation
+
+
+class RollingWindowState:
+    """
+    Trailing state of one series, used to compute the window features of appended values
+    without revisiting the history.
+
+    The state holds a bounded buffer of the last values, enough to reach back from every
+    appended value to the start of its block of prefix sums and to the start of its window.
+    The appended values are computed together with the buffer by compute_window_features,
+    aligned to their position in the series, so every statistic is identical to a batch
+    computation over the full series. Exponentially weighted means carry their last value and
+    the last observed value forward.
+    """
+
+    def __init__(self, max_window_size: int, features: Sequence[str] = None):
+        """
+        :param max_window_size: The largest window size features are computed for.
+        :param features: The window statistics to compute, defaults to WINDOW_FEATURES.
+        """
+        if max_window_size < 1:
+            raise ValueError("Window sizes must be positive integers")
+        self.max_window_size = max_window_size
+        self.features = check_window_features(features)
+        # The last values of the series, of which the first is at position 'start'
+        self.values = np.empty(0)
+        self.start = 0
+        self.last_valid = np.nan
+        self.ewm_levels = {}
+        self.n_seen = 0
+
+    @property
+    def buffer_size(self) -> int:
+        """
+        The number of trailing values kept, which bounds the memory of the state.
+        """
+        block_size = max(_SUM_BLOCK_SIZE, self.max_window_size)
+        return block_size + self.max_window_size - 2
+
+    def update(self, values: np.ndarray, window_sizes: Sequence[int]) -> np.ndarray:
+        """
+        Append values to the series and compute their window features.
+
+        Costs about as much as compute_window_features over the appended values and the
+        buffered ones, so appending many values at once is cheapest.
+
+        :param values: 1-D array with the appended values.
+        :param window_sizes: The window sizes to return features for, none above max_window_size.
+        :return: Array of shape (len(values), len(features) * len(window_sizes)), one column
+            per feature in the order given by window_feature_names.
+        """
+        values = np.asarray(values, dtype=np.float64)
+        window_sizes = [int(window_size) for window_size in window_sizes]
+        if window_sizes and (
+            min(window_sizes) < 1 or max(window_sizes) > self.max_window_size
+        ):
+            raise ValueError(
+                f"Window sizes must be between 1 and {self.max_window_size}"
+            )
+        if "ewm" in self.features and self.n_seen:
+            untracked = set(window_sizes) - set(self.ewm_levels)
+            if untracked:
+                raise ValueError(
+                    f"ewm was not tracked from the start for window sizes {sorted(untracked)}"
+                )
+        n_new = len(values)
+        series = np.concatenate((self.values, values))
+        features = np.empty((len(window_sizes), len(self.features), n_new))
+        batch_features = [feature for feature in self.features if feature != "ewm"]
+        batch = compute_window_features(
+            series, window_sizes, features=batch_features, start=self.start
+        )[:, len(self.values) :]
+        batch = batch.reshape(len(window_sizes), len(batch_features), n_new)
+        for i, feature in enumerate(self.features):
+            if feature == "ewm":
+                features[:, i] = self._update_ewm(values, window_sizes, series)
+            else:
+                features[:, i] = batch[:, batch_features.index(feature)]
+
+        self.n_seen += n_new
+        keep = min(len(series), self.buffer_size)
+        self.values = series[len(series) - keep :]
+        self.start = self.n_seen - keep
+
+        return features.transpose(2, 0, 1).reshape(n_new, -1)
+
+    def _update_ewm(
+        self, values: np.ndarray, window_sizes: List[int], series: np.ndarray
+    ) -> np.ndarray:
+        filled = pd.Series(np.concatenate(([self.last_valid], values))).ffill()
+        if len(values):
+            self.last_valid = filled.iloc[-1]
+        filled = filled.to_numpy()[1:]
+
+        # Missing values counted up to every position of the buffered and appended values
+        nan_counts = np.concatenate(([0], np.cumsum(np.isnan(series))))
+        ends = np.arange(len(series) - len(values), len(series)) + 1
+        out = np.empty((len(window_sizes), len(values)))
+        for i, window_size in enumerate(window_sizes):
+            level = self.ewm_levels.get(window_size, np.nan)
+            # Starting the recursion from the carried level continues it exactly
+            ewm = (
+                pd.Series(np.concatenate(([level], filled)))
+                .ewm(alpha=2.0 / (window_size + 1), adjust=False)
+                .mean()
+                .to_numpy()
+            )
+            if len(values):
+                self.ewm_levels[window_size] = ewm[-1]
+            out[i] = ewm[1:]
+            # NaN where the window is incomplete or holds a NaN, as in the batch computation
+            starts = ends - window_size
+            incomplete = self.start + starts < 0
+            has_nan = nan_counts[ends] - nan_counts[np.maximum(starts, 0)] > 0
+            out[i, incomplete | has_nan] = np.nan
+        return out
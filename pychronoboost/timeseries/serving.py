@@ -0,0 +1,288 @@
+import asyncio
+import json
+import os
+from collections import deque
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from itertools import combinations
+from typing import Dict, List
+import numpy as np
+import pandas as pd
+from pychronoboost.cache import FeatureCache
+from pychronoboost.impute.timestep_impute import FREQ_INFER
+from pychronoboost.timeseries.data import TimeSeriesData
+from pychronoboost.timeseries.feature_generator import (
+    DEFAULT_MAX_PAIRS,
+    FEATURE_DTYPES,
+    check_feature_dtype,
+    get_window_sizes,
+    uses_calendar_windows,
+)
+from pychronoboost.timeseries.rolling import WINDOW_FEATURES
+
+# Copies of the feature block made while it is attached to the data and imputed
+FEATURE_BLOCK_COPIES = 2
+
+
+def estimate_memory_bytes(
+    data: pd.DataFrame,
+    feature_columns: List[str],
+    max_window_size: int = 3,
+    window_features: List[str] = None,
+    window_schedule=None,
+    pair_features: List[str] = None,
+    max_pairs: int = DEFAULT_MAX_PAIRS,
+    chunk_size: int = None,
+    feature_dtype: str = None,
+    **options,
+) -> int:
+    """
+    Estimates the peak memory of processing data with process_timeseries_features, from the
+    size of the input and the number of candidate features.
+
+    Args:
+        data (pd.DataFrame): The time series data.
+        feature_columns (List[str]): The columns to generate features for.
+        max_window_size (int): Maximum window size for feature generation.
+        window_features (List[str]): The window statistics to generate.
+        window_schedule: The window schedule. Calendar windows are counted as every size up
+            to max_window_size, as their sizes depend on the timestep.
+        pair_features (List[str]): The statistics to generate for pairs of feature columns.
+        max_pairs (int): The maximum number of column pairs.
+        chunk_size (int): If set, the number of candidates held in memory at once.
+        feature_dtype (str): The dtype of the generated features.
+        options: Further options of process_timeseries_features, which are ignored.
+
+    Returns:
+        int: The estimated number of bytes.
+    """
+    if uses_calendar_windows(window_schedule):
+        n_windows = max_window_size
+    else:
+        n_windows = len(get_window_sizes(max_window_size, window_schedule))
+    n_candidates = (
+        len(feature_columns) * len(window_features or WINDOW_FEATURES) * n_windows
+    )
+    if pair_features is not None:
+        n_pairs = len(list(combinations(dict.fromkeys(feature_columns), 2)))
+        if max_pairs is not None:
+            n_pairs = min(n_pairs, max_pairs)
+        n_candidates += n_pairs * len(pair_features) * n_windows
+    if chunk_size is not None:
+        n_candidates = min(n_candidates, chunk_size)
+
+    itemsize = np.dtype(FEATURE_DTYPES[check_feature_dtype(feature_dtype)]).itemsize
+    data_bytes = int(data.memory_usage(index=True, deep=True).sum())
+    return data_bytes + FEATURE_BLOCK_COPIES * len(data) * n_candidates * itemsize
+
+
+class MemoryBudget:
+    def __init__(self, budget_bytes: int = None):
+        """
+        Admits jobs in arrival order while their estimated memory fits in the budget. A job
+        larger than the whole budget runs alone.
+
+        Args:
+            budget_bytes (int): The budget in bytes, None for no limit.
+        """
+        if budget_bytes is not None and budget_bytes < 1:
+            raise ValueError("budget_bytes must be a positive integer")
+        self.budget_bytes = budget_bytes
+        self.in_use = 0
+        self._waiters = deque()
+
+    def _fits(self, n_bytes: int) -> bool:
+        return (
+            self.budget_bytes is None
+            or self.in_use == 0
+            or self.in_use + n_bytes <= self.budget_bytes
+        )
+
+    async def acquire(self, n_bytes: int) -> None:
+        if not self._waiters and self._fits(n_bytes):
+            self.in_use += n_bytes
+            return
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append((n_bytes, waiter))
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Admitted just before being cancelled
+                self.release(n_bytes)
+            else:
+                self._waiters.remove((n_bytes, waiter))
+                self._admit()
+            raise
+
+    def release(self, n_bytes: int) -> None:
+        self.in_use -= n_bytes
+        self._admit()
+
+    def _admit(self) -> None:
+        while self._waiters and self._fits(self._waiters[0][0]):
+            n_bytes, waiter = self._waiters.popleft()
+            self.in_use += n_bytes
+            waiter.set_result(None)
+
+
+class AsyncTimeSeriesProcessor:
+    def __init__(
+        self,
+        max_workers: int = None,
+        memory_budget_bytes: int = None,
+        executor: Executor = None,
+        cache: FeatureCache = None,
+    ):
+        """
+        Runs process_timeseries_features from asyncio code, e.g. a web service, without
+        blocking the event loop. The pandas, NumPy and XGBoost work runs on a thread pool,
+        and concurrent requests for the same data and settings share one computation.
+
+        Args:
+            max_workers (int): The number of threads of the pool, defaults to the CPU count.
+            memory_budget_bytes (int): If set, jobs wait until their estimated memory, see
+                estimate_memory_bytes, fits in this budget together with the running ones.
+            executor (Executor): Optional executor to run the jobs on instead of an own
+                thread pool. It is not shut down by close.
+            cache (FeatureCache): Optional on-disk cache used by every job.
+        """
+        self._owns_executor = executor is None
+        self.executor = executor or ThreadPoolExecutor(
+            max_workers=max_workers or os.cpu_count() or 1,
+            thread_name_prefix="pychronoboost",
+        )
+        self.budget = MemoryBudget(memory_budget_bytes)
+        self.cache = cache
+        self._jobs: Dict[str, asyncio.Task] = {}
+
+    async def __aenter__(self) -> "AsyncTimeSeriesProcessor":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.close()
+
+    @property
+    def n_jobs_in_flight(self) -> int:
+        return len(self._jobs)
+
+    def request_key(self, data: pd.DataFrame, config: dict) -> str:
+        """
+        Hashes the data and settings of a request, so identical requests are coalesced.
+        This reads every value, so it runs on a thread rather than the event loop.
+        """
+        return FeatureCache.key(
+            json.dumps(config, sort_keys=True, default=str),
+            [str(column) for column in data.columns],
+            *(data[column] for column in data.columns),
+        )
+
+    async def process_timeseries_features(
+        self,
+        data: pd.DataFrame,
+        timestep_column: str,
+        feature_columns: List[str],
+        target_column: str,
+        group_column: str = None,
+        timestep_freq=FREQ_INFER,
+        timestep_aggregation: str = None,
+        feature_dtype: str = None,
+        **options,
+    ) -> pd.DataFrame:
+        """
+        Processes time series features like TimeSeriesData.process_timeseries_features.
+
+        'data' is left unmodified and must not be modified until the result is available.
+        Callers of a coalesced request each get their own shallow copy of the result, so
+        adding or replacing columns is safe, but writing into the values is not.
+
+        Args:
+            data (pd.DataFrame): The time series data.
+            timestep_column (str): The name of the timestep column.
+            feature_columns (List[str]): A list of column names to be used for feature generation.
+            target_column (str): The name of the target column.
+            group_column (str): Optional name of the column identifying each series.
+            timestep_freq: Step of the imputed timesteps, see TimeSeriesData.
+            timestep_aggregation (str): Optional aggregation to resample rows onto the grid.
+            feature_dtype (str): The dtype of generated features, see TimeSeriesData.
+            options: Further options of process_timeseries_features, e.g. max_window_size.
+
+        Returns:
+            pd.DataFrame: The processed DataFrame with imputed and selected features.
+        """
+        config = {
+            "timestep_column": timestep_column,
+            "feature_columns": feature_columns,
+            "target_column": target_column,
+            "group_column": group_column,
+            "timestep_freq": timestep_freq,
+            "timestep_aggregation": timestep_aggregation,
+            "feature_dtype": feature_dtype,
+            "options": options,
+        }
+        # Hashed on the default executor, so it does not queue behind the running jobs
+        key = await asyncio.get_running_loop().run_in_executor(
+            None, self.request_key, data, config
+        )
+        job = self._jobs.get(key)
+        if job is None:
+            job = asyncio.ensure_future(self._run(data, config))
+            self._jobs[key] = job
+            job.add_done_callback(lambda done: self._forget(key, done))
+        # A cancelled caller does not cancel the job the other callers wait for
+        result = await asyncio.shield(job)
+        return result.copy(deep=False)
+
+    def _forget(self, key: str, job: asyncio.Task) -> None:
+        self._jobs.pop(key, None)
+        if not job.cancelled():
+            # Mark the error as retrieved, in case every caller was cancelled
+            job.exception()
+
+    async def _run(self, data: pd.DataFrame, config: dict) -> pd.DataFrame:
+        loop = asyncio.get_running_loop()
+        # The deep memory usage of object columns reads every value as well
+        n_bytes = await loop.run_in_executor(
+            None,
+            partial(
+                estimate_memory_bytes,
+                data,
+                config["feature_columns"],
+                feature_dtype=config["feature_dtype"],
+                **config["options"],
+            ),
+        )
+        await self.budget.acquire(n_bytes)
+        try:
+            return await loop.run_in_executor(
+                self.executor, _process, data, config, self.cache
+            )
+        finally:
+            self.budget.release(n_bytes)
+
+    async def close(self) -> None:
+        """
+        Waits for the running jobs and shuts down the own thread pool.
+        """
+        if self._jobs:
+            await asyncio.gather(*self._jobs.values(), return_exceptions=True)
+        if self._owns_executor:
+            await asyncio.get_running_loop().run_in_executor(
+                None, self.executor.shutdown
+            )
+
+
+def _process(data: pd.DataFrame, config: dict, cache: FeatureCache) -> pd.DataFrame:
+    ts_data = TimeSeriesData(
+        data,
+        config["timestep_column"],
+        config["group_column"],
+        cache=cache,
+        timestep_freq=config["timestep_freq"],
+        timestep_aggregation=config["timestep_aggregation"],
+        feature_dtype=config["feature_dtype"],
+        copy_on_write=True,
+    )
+    return ts_data.process_timeseries_features(
+        config["feature_columns"], config["target_column"], **config["options"]
+    )
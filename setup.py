@@ -21,11 +21,10 @@ setup(
         'Intended Audience :: Science/Research',
         'License :: OSI Approved :: Apache Software License',
         'Programming Language :: Python :: 3',
-        'Programming Language :: Python :: 3.7',
         'Programming Language :: Python :: 3.8',
         'Programming Language :: Python :: 3.9',
         'Topic :: Scientific/Engineering',
     ],
-    python_requires='>=3.7',
+    python_requires='>=3.8',
     keywords='time series, feature generation, feature selection',
 )
@@ -7,6 +7,7 @@ from pychronoboost.impute.timestep_impute import (
     IntegerImputation,
     FloatImputation,
     get_timestep_imputation_strategy,
+    infer_frequency,
 )
 
 from pychronoboost.utils import (
@@ -97,3 +98,157 @@ def test_get_timestep_imputation_strategy_error():
 def test_check_timeseries_type_error(data, column):
     with pytest.raises(ValueError):
         check_timeseries_type(data, column)
+
+
+@pytest.mark.parametrize(
+    "data,column,expected",
+    [
+        (date_data, "date", "2D"),
+        (datetime_data, "datetime", "2H"),
+        (integer_data, "integer", 1),
+        (float_data, "float", 1.0),
+        (
+            pd.DataFrame(
+                {
+                    "time": pd.to_datetime(
+                        [
+                            "2020-01-01 00:00",
+                            "2020-01-01 00:01",
+                            "2020-01-01 00:05",
+                            "2020-01-01 00:06",
+                        ]
+                    )
+                }
+            ),
+            "time",
+            "T",
+        ),
+        (pd.DataFrame({"time": [0.0, 0.3, 0.6, 1.2]}), "time", 0.3),
+        # The most common step is 2, but only a step of 1 keeps the timestep 7
+        (pd.DataFrame({"time": [0, 2, 4, 6, 7, 8]}), "time", 1),
+        (pd.DataFrame({"time": [0.0, 0.5, 1.0, 1.5, 1.75, 2.0]}), "time", 0.25),
+        (
+            pd.DataFrame(
+                {"time": pd.to_datetime(["2020-01-01", "2020-01-03", "2020-01-06"])}
+            ),
+            "time",
+            "D",
+        ),
+        (pd.DataFrame({"time": [5]}), "time", None),
+    ],
+)
+def test_infer_frequency(data, column, expected):
+    assert infer_frequency(data.copy(), column) == expected
+
+
+def test_get_timestep_imputation_strategy_frequency():
+    assert get_timestep_imputation_strategy(datetime_data, "datetime").freq == "2H"
+    assert (
+        get_timestep_imputation_strategy(datetime_data, "datetime", freq=None).freq
+        == "S"
+    )
+    assert get_timestep_imputation_strategy(integer_data, "integer", freq=2).freq == 2
+    with pytest.raises(NotImplementedError):
+        get_timestep_imputation_strategy(integer_data, "integer", aggregation="median")
+
+
+def test_inferred_frequency_keeps_native_grid():
+    data = pd.DataFrame(
+        {
+            "time": pd.date_range("2020-01-01", periods=6, freq="T").delete(2),
+            "value": [1.0, 2.0, 4.0, 5.0, 6.0],
+        }
+    )
+    strategy = get_timestep_imputation_strategy(data, "time")
+    imputed_data = strategy.impute(data, "time")
+    assert len(imputed_data) == 6
+    assert imputed_data["value"].isna().sum() == 1
+
+
+def test_inferred_frequency_keeps_irregular_timesteps():
+    data = pd.DataFrame({"time": [0, 2, 4, 6, 7, 8], "value": range(6)})
+    imputed_data = get_timestep_imputation_strategy(data, "time").impute(data, "time")
+    assert imputed_data["time"].tolist() == list(range(9))
+    assert imputed_data["value"].dropna().tolist() == list(range(6))
+
+
+@pytest.mark.parametrize("unit", ["s", "ms", "us", "ns"])
+def test_infer_frequency_datetime_units(unit):
+    timesteps = pd.date_range("2020-01-01", periods=10, freq="H").delete(4)
+    data = pd.DataFrame({"time": timesteps.astype(f"datetime64[{unit}]")})
+    assert infer_frequency(data, "time") == "H"
+
+
+def test_infer_frequency_falls_back_to_median_step():
+    timesteps = pd.Series(pd.date_range("2020-01-01", periods=100, freq="T"))
+    timesteps[5] += pd.Timedelta("1ms")
+    with pytest.warns(UserWarning):
+        assert infer_frequency(pd.DataFrame({"time": timesteps}), "time") == "T"
+
+    rng = np.random.default_rng(0)
+    offsets = np.sort(rng.choice(20_000_000, size=1000, replace=False))
+    data = pd.DataFrame(
+        {
+            "time": pd.Timestamp("2020-01-01") + pd.to_timedelta(offsets, unit="us"),
+            "value": 1.0,
+        }
+    )
+    with pytest.warns(UserWarning):
+        imputed_data = get_timestep_imputation_strategy(data, "time").impute(
+            data, "time"
+        )
+    assert len(imputed_data) < 2 * len(data)
+
+
+@pytest.mark.parametrize(
+    "aggregation,expected",
+    [("mean", [1.5, 3.5, 5.0]), ("last", [2.0, 4.0, 5.0]), ("sum", [3.0, 7.0, 5.0])],
+)
+def test_datetime_downsampling(aggregation, expected):
+    data = pd.DataFrame(
+        {
+            "time": pd.date_range("2020-01-01", periods=5, freq="30S"),
+            "value": [1.0, 2.0, 3.0, 4.0, 5.0],
+        }
+    )
+    imputed_data = DateTimeImputation("T", aggregation).impute(data, "time")
+    assert imputed_data["time"].tolist() == list(
+        pd.date_range("2020-01-01", periods=3, freq="T")
+    )
+    assert imputed_data["value"].tolist() == expected
+
+
+def test_integer_downsampling():
+    data = pd.DataFrame({"integer": [0, 1, 2, 7], "value": [1.0, 2.0, 3.0, 4.0]})
+    imputed_data = IntegerImputation(2, "sum").impute(data, "integer")
+    assert imputed_data["integer"].tolist() == [0, 2, 4, 6]
+    assert imputed_data["value"].tolist()[:2] == [3.0, 3.0]
+    assert np.isnan(imputed_data["value"].iloc[2])
+    assert imputed_data["value"].iloc[3] == 4.0
+
+
+def test_float_imputation_step():
+    data = pd.DataFrame({"float": [0.0, 0.1, 0.3, 0.5], "value": [1, 2, 4, 6]})
+    imputed_data = FloatImputation(0.1).impute(data, "float")
+    assert len(imputed_data) == 6
+    assert imputed_data["value"].isna().sum() == 2
+
+
+def test_is_complete():
+    timesteps = pd.Series(pd.date_range("2020-01-01", periods=4, freq="T"))
+    assert DateTimeImputation("T").is_complete(timesteps)
+    assert not DateTimeImputation("T").is_complete(timesteps.drop(1))
+    assert not DateTimeImputation("T", "mean").is_complete(timesteps)
+    assert not DateImputation("M").is_complete(timesteps)
+    assert IntegerImputation(2).is_complete(pd.Series([0, 2, 4]))
+    assert not IntegerImputation(2).is_complete(pd.Series([4, 2, 0]))
+    assert FloatImputation(0.5).is_complete(pd.Series([0.0, 0.5, 1.0]))
+    assert not FloatImputation(0.5).is_complete(pd.Series([0.0, np.nan, 1.0]))
+
+
+@pytest.mark.parametrize("unit", ["s", "ms", "us", "ns"])
+def test_is_complete_datetime_units(unit):
+    timesteps = pd.Series(pd.date_range("2020-01-01", periods=4, freq="T"))
+    timesteps = timesteps.astype(f"datetime64[{unit}]")
+    assert DateTimeImputation("T").is_complete(timesteps)
+    assert not DateTimeImputation("T").is_complete(timesteps.drop(1))
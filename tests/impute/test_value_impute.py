@@ -6,6 +6,10 @@ from pychronoboost.impute.value_impute import (
     LastValueImputation,
     ZeroImputation,
     LinearImputation,
+    SeasonalNaiveImputation,
+    RollingMedianImputation,
+    KalmanImputation,
+    benchmark_value_imputation_strategies,
 )
 
 
@@ -14,6 +18,12 @@ def test_correct_strategy_creation():
     assert isinstance(get_value_imputation_strategy("last"), LastValueImputation)
     assert isinstance(get_value_imputation_strategy("zero"), ZeroImputation)
     assert isinstance(get_value_imputation_strategy("linear"), LinearImputation)
+    assert isinstance(
+        get_value_imputation_strategy("seasonal"), SeasonalNaiveImputation
+    )
+    assert isinstance(get_value_imputation_strategy("median"), RollingMedianImputation)
+    assert isinstance(get_value_imputation_strategy("kalman"), KalmanImputation)
+    assert get_value_imputation_strategy("seasonal", period=24).period == 24
 
 
 # Test for exception on unrecognized strategy
@@ -41,3 +51,72 @@ def test_linear_imputation():
     data = pd.DataFrame({"col1": [1, None, 3, 4]})
     data["imputed"] = strategy.impute(data["col1"])
     assert data["imputed"][1] == 2  # Assuming linear interpolation between 1 and 3
+
+
+@pytest.mark.parametrize(
+    "strategy", ["last", "zero", "linear", "seasonal", "median", "kalman"]
+)
+def test_impute_block_matches_series(strategy):
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=(6, 50))
+    values[rng.random(values.shape) < 0.4] = np.nan
+    values[0] = np.nan
+    values[1, :10] = np.nan
+    values[2, -10:] = np.nan
+    values[3, 1:-1] = np.nan
+    imputer = get_value_imputation_strategy(strategy)
+    expected = np.stack([imputer.impute(pd.Series(row)).to_numpy() for row in values])
+
+    imputed = imputer.impute_block(values.copy())
+    np.testing.assert_array_equal(imputed, expected)
+
+
+def test_impute_block_empty():
+    for strategy in ["last", "zero", "linear", "seasonal", "median"]:
+        imputer = get_value_imputation_strategy(strategy)
+        assert imputer.impute_block(np.empty((2, 0))).shape == (2, 0)
+
+
+def test_seasonal_naive_imputation():
+    data = pd.Series([1.0, 2.0, 3.0, None, 2.0, None, 4.0, None])
+    imputed = SeasonalNaiveImputation(period=3).impute(data)
+    assert imputed.tolist() == [1.0, 2.0, 3.0, 1.0, 2.0, 3.0, 4.0, 2.0]
+
+    data = pd.Series([None, 2.0, 1.0, 5.0])
+    imputed = SeasonalNaiveImputation(period=2).impute(data)
+    assert imputed.tolist() == [1.0, 2.0, 1.0, 5.0]
+
+
+def test_rolling_median_imputation():
+    data = pd.Series([1.0, 100.0, None, 2.0, 3.0, None, None, None, None, 7.0])
+    imputed = RollingMedianImputation(window_size=5).impute(data)
+    assert imputed[2] == 2.5
+    assert imputed[5] == 2.5
+    assert imputed[7] == 7.0
+    assert imputed.isna().sum() == 0
+
+
+def test_kalman_imputation():
+    rng = np.random.default_rng(0)
+    level = np.cumsum(rng.normal(size=2000)) * 0.3
+    data = pd.Series(level + rng.normal(size=2000))
+    missing = rng.random(2000) < 0.3
+    data[missing] = np.nan
+
+    imputed = KalmanImputation().impute(data)
+    assert imputed[~missing].equals(data[~missing])
+    kalman_error = np.mean((imputed[missing] - level[missing]) ** 2)
+    linear = LinearImputation().impute(data)
+    assert kalman_error < np.mean((linear[missing] - level[missing]) ** 2)
+
+    # Without observation noise, the smoothed level interpolates the observed values
+    exact = KalmanImputation(noise_ratio=np.inf).impute(data)
+    np.testing.assert_allclose(exact, linear)
+
+
+def test_benchmark_value_imputation_strategies():
+    values = np.arange(100, dtype=np.float64)
+    values[::3] = np.nan
+    results = benchmark_value_imputation_strategies(values, ["last", "kalman"])
+    assert results.index.tolist() == ["last", "kalman"]
+    assert (results["block_seconds"] >= 0).all()
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pychronoboost.benchmark import (
+    CASE_COLUMNS,
+    SERIES_GENERATORS,
+    append_history,
+    find_regressions,
+    load_history,
+    main,
+    run_benchmarks,
+)
+
+
+@pytest.mark.parametrize("kind", list(SERIES_GENERATORS))
+def test_series_generators(kind):
+    data = SERIES_GENERATORS[kind](1000, n_columns=2, gap_fraction=0.1, seed=1)
+    assert data.columns.tolist() == ["time", "value0", "value1", "target"]
+    assert len(data) == 900
+    assert data["time"].is_monotonic_increasing
+    assert data["value0"].isna().any()
+    assert not data["target"].isna().any()
+
+
+def test_run_benchmarks():
+    results = run_benchmarks(
+        n_rows=[500],
+        n_columns=[1, 2],
+        max_window_sizes=[2, 3],
+        stages=["impute_values", "generate_features"],
+        variants={"impute_values": ["last"]},
+    )
+    assert results[CASE_COLUMNS[:2]].drop_duplicates().values.tolist() == [
+        ["impute_values", "last"],
+        ["generate_features", "default"],
+    ]
+    # The window size only multiplies the cases of stages that depend on it
+    assert len(results) == 2 + 4
+    assert (
+        results.loc[results["stage"] == "impute_values", "max_window_size"].isna().all()
+    )
+    assert (results["seconds"] > 0).all()
+    assert (results["peak_memory_bytes"] > 0).all()
+
+    with pytest.raises(NotImplementedError):
+        run_benchmarks(stages=["unknown"])
+
+
+def test_run_benchmarks_threads():
+    results = run_benchmarks(
+        n_rows=[500],
+        n_columns=[3],
+        max_window_sizes=[3],
+        stages=["generate_features"],
+        variants={"generate_features": ["default", "threads"]},
+        trace_memory=False,
+    )
+    assert results["variant"].tolist() == ["default", "threads"]
+    assert (results["seconds"] > 0).all()
+
+
+def test_find_regressions(tmp_path):
+    path = str(tmp_path / "history.jsonl")
+    assert load_history(path).empty
+    results = pd.DataFrame(
+        {
+            "stage": ["impute_values", "generate_features"],
+            "variant": ["last", "default"],
+            "n_rows": [100, 100],
+            "n_columns": [1, 1],
+            "max_window_size": [None, 3],
+            "seconds": [1.0, 1.0],
+            "rows_per_second": [100.0, 100.0],
+            "peak_memory_bytes": [1000, 1000],
+        }
+    )
+    append_history(results, path, label="before")
+    history = load_history(path)
+    assert history["label"].tolist() == ["before", "before"]
+
+    slower = results.assign(seconds=[1.1, 2.0])
+    compared = find_regressions(slower, history, tolerance=0.2)
+    assert compared["regression"].tolist() == [False, True]
+    np.testing.assert_allclose(compared["seconds_ratio"], [1.1, 2.0])
+
+    # Cases without earlier runs are not flagged
+    new_case = results.assign(n_rows=200)
+    assert not find_regressions(new_case, history)["regression"].any()
+
+
+def test_main(tmp_path, capsys):
+    path = str(tmp_path / "history.jsonl")
+    argv = ["--rows", "300", "--stages", "impute_timesteps", "--repeats", "1"]
+    assert main(argv + ["--history", path]) == 0
+    assert "impute_timesteps" in capsys.readouterr().out
+    assert len(load_history(path)) == len(SERIES_GENERATORS)
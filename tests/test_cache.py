@@ -0,0 +1,88 @@
+import time
+import numpy as np
+import pandas as pd
+import pytest
+from pychronoboost.cache import FeatureCache
+from pychronoboost.timeseries.data import TimeSeriesData
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FeatureCache(str(tmp_path / "cache"))
+
+
+def test_key():
+    series = pd.Series([1.0, 2.0, np.nan])
+    assert FeatureCache.key("a", 3, series) == FeatureCache.key("a", 3, series.copy())
+    assert FeatureCache.key("a", 3, series) != FeatureCache.key("a", 4, series)
+    assert FeatureCache.key("a", series) != FeatureCache.key(
+        "a", series.astype("float32")
+    )
+    assert FeatureCache.key("ab", "c") != FeatureCache.key("a", "bc")
+    assert FeatureCache.key(pd.Series(["x", "y"])) != FeatureCache.key(
+        pd.Series(["x", "z"])
+    )
+
+
+def test_array_round_trip(cache):
+    values = np.arange(12, dtype=np.float64).reshape(3, 4)
+    assert cache.get_array("missing") is None
+    cache.put_array("key", values)
+    np.testing.assert_array_equal(cache.get_array("key"), values)
+
+
+def test_frame_round_trip(cache):
+    data = pd.DataFrame(
+        {
+            "time": pd.date_range("2021-01-01", periods=3, freq="D", tz="UTC"),
+            "value": [1.0, None, 3.0],
+            "count": [1, 2, 3],
+            "name": ["a", "b", None],
+            "group": pd.Categorical(["x", "y", "x"]),
+        }
+    )
+    assert cache.get_frame("missing") is None
+    cache.put_frame("key", data)
+    pd.testing.assert_frame_equal(cache.get_frame("key"), data)
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = FeatureCache(str(tmp_path / "cache"), max_bytes=2500)
+    for key in ["a", "b"]:
+        cache.put_array(key, np.zeros(100))
+        time.sleep(0.01)
+    cache.get_array("a")
+    time.sleep(0.01)
+    cache.put_array("c", np.zeros(100))
+
+    assert [entry["key"] for entry in cache.entries()] == ["a", "c"]
+    cache.clear()
+    assert cache.entries() == []
+
+
+def test_time_series_data_reuses_cached_results(cache):
+    data = pd.DataFrame(
+        {
+            "timestamp": ["2022-01-01", "2022-01-02", "2022-01-04", "2022-01-05"],
+            "value": [1.0, None, 4.0, 5.0],
+            "target": [1.0, 2.0, 3.0, 4.0],
+        }
+    )
+
+    def run():
+        ts_data = TimeSeriesData(data.copy(), "timestamp", cache=cache)
+        generated = ts_data.generate_candidate_features(["value"], "linear", 3)
+        return ts_data.data, generated
+
+    expected, expected_generated = run()
+    keys = {entry["key"] for entry in cache.entries()}
+    assert len(keys) == 3
+
+    cached, cached_generated = run()
+    assert {entry["key"] for entry in cache.entries()} == keys
+    assert cached_generated == expected_generated
+    pd.testing.assert_frame_equal(cached, expected)
+
+    uncached = TimeSeriesData(data.copy(), "timestamp")
+    uncached.generate_candidate_features(["value"], "linear", 3)
+    pd.testing.assert_frame_equal(cached, uncached.data)
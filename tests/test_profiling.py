@@ -0,0 +1,134 @@
+import logging
+import numpy as np
+import pandas as pd
+import pytest
+from pychronoboost.profiling import (
+    LoggingCallback,
+    PrometheusCallback,
+    SpanCallback,
+    StageProfiler,
+)
+from pychronoboost.timeseries.data import TimeSeriesData
+
+
+@pytest.fixture
+def sample_data():
+    rng = np.random.default_rng(0)
+    return pd.DataFrame(
+        {
+            "time": pd.date_range("2021-01-01", periods=100, freq="D").delete([3, 7]),
+            "value": rng.normal(size=98),
+            "target": rng.normal(size=98),
+        }
+    )
+
+
+def test_profile_process_timeseries_features(sample_data):
+    profiler = StageProfiler(trace_memory=True)
+    ts_data = TimeSeriesData(sample_data, "time", profiler=profiler)
+    ts_data.process_timeseries_features(["value"], "target", max_window_size=3)
+
+    report = profiler.report.to_frame().set_index("name")
+    assert report.index.tolist() == [
+        "detect_timestep_type",
+        "impute_timesteps",
+        "impute_values",
+        "generate_features",
+        "impute_values",
+        "select_features",
+        "process_timeseries_features",
+    ]
+    assert report.loc["impute_timesteps", "rows_before"] == 98
+    assert report.loc["impute_timesteps", "rows_after"] == 100
+    assert report.loc["generate_features", "columns_after"] == 3 + 12
+    assert report.loc["process_timeseries_features", "depth"] == 0
+    assert report.loc["generate_features", "parent"] == "process_timeseries_features"
+    assert report.loc["detect_timestep_type", "parent"] == "impute_timesteps"
+    assert (report["wall_seconds"] >= 0).all()
+    # The memory peak of a stage covers the peaks of the stages within it
+    assert (
+        report.loc["process_timeseries_features", "peak_memory_bytes"]
+        >= report.loc["generate_features", "peak_memory_bytes"]
+        > 0
+    )
+
+    summary = profiler.report.summary()
+    assert summary.loc["impute_values", "runs"] == 2
+    assert summary.index[0] == "process_timeseries_features"
+
+
+def test_profile_memory_without_reset_peak(sample_data, monkeypatch):
+    # Python 3.8 has no tracemalloc.reset_peak
+    monkeypatch.delattr("tracemalloc.reset_peak")
+    profiler = StageProfiler(trace_memory=True)
+    TimeSeriesData(sample_data, "time", profiler=profiler).impute_timesteps()
+    assert profiler.records[-1].peak_memory_bytes > 0
+
+
+def test_profile_without_memory_tracing(sample_data):
+    profiler = StageProfiler()
+    TimeSeriesData(sample_data, "time", profiler=profiler).impute_timesteps()
+    record = profiler.records[-1]
+    assert record.name == "impute_timesteps"
+    assert record.peak_memory_bytes is None
+    assert record.cpu_seconds >= 0
+
+
+def test_profile_records_errors():
+    profiler = StageProfiler()
+    with pytest.raises(KeyError):
+        with profiler.stage("failing"):
+            raise KeyError("column")
+    assert profiler.records[0].error == "KeyError"
+
+
+def test_callbacks(sample_data, caplog, tmp_path):
+    spans = SpanCallback()
+    path = tmp_path / "metrics.prom"
+    prometheus = PrometheusCallback(str(path))
+    profiler = StageProfiler([LoggingCallback(), spans, prometheus])
+    ts_data = TimeSeriesData(sample_data, "time", profiler=profiler)
+    with caplog.at_level(logging.INFO, logger="pychronoboost.profiling"):
+        ts_data.generate_candidate_features(["value"], max_window_size=2)
+
+    assert any("generate_features" in message for message in caplog.messages)
+    names = [span["name"] for span in spans.spans]
+    assert names[:2] == ["impute_timesteps", "detect_timestep_type"]
+    assert spans.spans[1]["parent_id"] == spans.spans[0]["span_id"]
+    assert spans.spans[0]["end_time"] >= spans.spans[0]["start_time"]
+
+    text = path.read_text()
+    assert 'pychronoboost_stage_runs_total{stage="impute_values"} 2' in text
+    assert "# TYPE pychronoboost_stage_wall_seconds_total counter" in text
+    assert text == prometheus.text()
+
+
+def test_span_callback_with_tracer():
+    class Span:
+        def __init__(self, name):
+            self.name = name
+            self.attributes = {}
+            self.ended = False
+
+        def set_attribute(self, key, value):
+            self.attributes[key] = value
+
+        def end(self):
+            self.ended = True
+
+    class Tracer:
+        def __init__(self):
+            self.spans = []
+
+        def start_span(self, name, context=None):
+            self.spans.append(Span(name))
+            return self.spans[-1]
+
+    tracer = Tracer()
+    profiler = StageProfiler([SpanCallback(tracer)])
+    with profiler.stage("outer"):
+        with profiler.stage("inner", lambda: (10, 2)):
+            pass
+    assert [span.name for span in tracer.spans] == ["outer", "inner"]
+    assert all(span.ended for span in tracer.spans)
+    assert tracer.spans[1].attributes["rows_after"] == 10
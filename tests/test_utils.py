@@ -56,4 +56,41 @@ def test_check_timeseries_type_invalid_data():
     assert (
         "The column must contain integers, floats, or be convertible to dates/datetime."
         in str(excinfo.value)
-    )
\ No newline at end of file
+    )
+
+
+def test_check_timeseries_type_date_with_missing_values():
+    df = pd.DataFrame({"time": pd.to_datetime(["2020-01-01", None, "1960-01-03"])})
+    assert check_timeseries_type(df, "time") == TIMESTEP_DATE
+
+
+@pytest.mark.parametrize("unit", ["s", "ms", "us", "ns"])
+def test_check_timeseries_type_datetime_units(unit):
+    times = pd.Series(pd.date_range("1960-01-01", periods=3, freq="D")).astype(
+        f"datetime64[{unit}]"
+    )
+    assert check_timeseries_type(pd.DataFrame({"time": times}), "time") == TIMESTEP_DATE
+    df = pd.DataFrame({"time": times + pd.Timedelta(seconds=1)})
+    assert check_timeseries_type(df, "time") == TIMESTEP_DATETIME
+
+
+def test_check_timeseries_type_timezone_aware():
+    times = pd.date_range("2020-01-01", periods=3, freq="D", tz="Europe/Berlin")
+    assert check_timeseries_type(pd.DataFrame({"time": times}), "time") == TIMESTEP_DATE
+    df = pd.DataFrame({"time": times + pd.Timedelta(hours=1)})
+    assert check_timeseries_type(df, "time") == TIMESTEP_DATETIME
+
+
+def test_check_timeseries_type_with_format():
+    df = pd.DataFrame({"time": ["01/02/2020 10:30", "02/02/2020 11:30"]})
+    assert (
+        check_timeseries_type(df, "time", datetime_format="%d/%m/%Y %H:%M")
+        == TIMESTEP_DATETIME
+    )
+    assert df["time"].iloc[0] == pd.Timestamp("2020-02-01 10:30")
+
+
+def test_check_timeseries_type_sampled_invalid_data():
+    df = pd.DataFrame({"time": ["not a date"] * 100})
+    with pytest.raises(ValueError):
+        check_timeseries_type(df, "time", sample_size=10)
@@ -0,0 +1,166 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pychronoboost.timeseries.chunked import (
+    ChunkedTimeSeries,
+    ParquetSink,
+    iter_source_chunks,
+)
+from pychronoboost.timeseries.data import TimeSeriesData
+from pychronoboost.timeseries.feature_selector import FeatureSelectionStrategy
+
+
+@pytest.fixture
+def sample_data():
+    rng = np.random.default_rng(0)
+    timestamps = pd.date_range("2022-01-01", periods=120, freq="D").delete(
+        [4, 30, 31, 32, 77]
+    )
+    value = rng.normal(size=115).cumsum()
+    value[[0, 10, 11, 12, 40, 59, 60, 114]] = np.nan
+    return pd.DataFrame(
+        {
+            "timestamp": timestamps,
+            "value": value,
+            "target": np.arange(115, dtype=float),
+        }
+    )
+
+
+def in_memory(data, strategy, max_window_size):
+    ts_data = TimeSeriesData(data.copy(), "timestamp")
+    ts_data.generate_candidate_features(["value"], strategy, max_window_size)
+    return ts_data.data
+
+
+@pytest.mark.parametrize("chunk_rows", [7, 10, 33, 500])
+@pytest.mark.parametrize("strategy", ["last", "linear", "zero", "seasonal"])
+def test_chunks_match_in_memory_processing(sample_data, chunk_rows, strategy):
+    chunks = []
+    chunked = ChunkedTimeSeries(sample_data, "timestamp", chunk_rows=chunk_rows)
+    generated = chunked.generate_candidate_features(
+        ["value"], chunks.append, strategy, max_window_size=6
+    )
+
+    expected = in_memory(sample_data, strategy, 6)
+    assert generated == expected.columns.tolist()[3:]
+    # The first seasonal chunk may be held back until it observes every phase
+    max_rows = (3 if strategy == "seasonal" else 2) * chunk_rows + 3
+    assert all(len(chunk) <= max_rows for chunk in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), expected)
+
+
+@pytest.mark.parametrize("chunk_rows", [30, 200])
+@pytest.mark.parametrize("period", [5, 24])
+def test_seasonal_chunks_match_in_memory_processing(chunk_rows, period):
+    rng = np.random.default_rng(1)
+    timestamps = pd.date_range("2022-01-01", periods=1000, freq="H").delete([5, 300])
+    value = np.sin(np.arange(998) * 2 * np.pi / 24) * 5 + rng.normal(size=998)
+    value[rng.random(998) < 0.1] = np.nan
+    value[:8] = np.nan
+    data = pd.DataFrame({"timestamp": timestamps, "value": value})
+    options = {"period": period}
+
+    chunks = []
+    chunked = ChunkedTimeSeries(data, "timestamp", chunk_rows=chunk_rows)
+    chunked.generate_candidate_features(
+        ["value"], chunks.append, "seasonal", 3, value_impute_options=options
+    )
+    ts_data = TimeSeriesData(data.copy(), "timestamp")
+    ts_data.generate_candidate_features(["value"], "seasonal", 3, options)
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), ts_data.data)
+
+
+@pytest.mark.parametrize("strategy", ["median", "kalman"])
+def test_chunks_reject_value_imputations_looking_ahead(sample_data, strategy):
+    with pytest.raises(ValueError):
+        ChunkedTimeSeries(sample_data, "timestamp").generate_candidate_features(
+            ["value"], lambda chunk: None, strategy
+        )
+
+
+def test_chunks_with_calendar_window_schedule(sample_data):
+    chunks = []
+    chunked = ChunkedTimeSeries(sample_data, "timestamp", chunk_rows=20)
+    generated = chunked.generate_candidate_features(
+        ["value"], chunks.append, max_window_size=10, window_schedule="calendar"
+    )
+    assert generated == [
+        f"value_{f}_{w}" for w in [1, 7] for f in ["min", "max", "avg", "nth"]
+    ]
+
+    ts_data = TimeSeriesData(sample_data.copy(), "timestamp")
+    ts_data.generate_candidate_features(
+        ["value"], max_window_size=10, window_schedule="calendar"
+    )
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), ts_data.data)
+
+
+def test_structured_memmap_source(sample_data, tmp_path):
+    path = str(tmp_path / "series.npy")
+    records = sample_data.to_records(index=False)
+    np.save(path, records)
+
+    chunks = list(iter_source_chunks(path, 50))
+    assert [len(chunk) for chunk in chunks] == [50, 50, 15]
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), sample_data)
+
+    source = {col: sample_data[col].to_numpy() for col in sample_data.columns}
+    chunks = list(iter_source_chunks(source, 100))
+    pd.testing.assert_frame_equal(pd.concat(chunks, ignore_index=True), sample_data)
+
+
+def test_unsupported_source():
+    with pytest.raises(ValueError):
+        list(iter_source_chunks([1, 2, 3], 10))
+
+
+def test_process_timeseries_features(sample_data):
+    chunks = []
+    chunked = ChunkedTimeSeries(sample_data, "timestamp", chunk_rows=20)
+    selected = chunked.process_timeseries_features(
+        ["value"],
+        "target",
+        chunks.append,
+        max_window_size=4,
+        max_features=3,
+        sample_rows=50,
+    )
+    assert len(selected) == 3
+    processed = pd.concat(chunks, ignore_index=True)
+    assert processed.columns.tolist() == ["timestamp", "value", "target"] + selected
+    assert len(processed) == 120
+
+
+def test_selection_leaves_out_warmup_rows(sample_data, monkeypatch):
+    ranked = []
+    rank_columns = FeatureSelectionStrategy.rank_columns
+
+    def spy(self, data, feature_columns, target_column, warmup_rows=0):
+        ranked.append((data.index[:warmup_rows].tolist(), warmup_rows))
+        return rank_columns(self, data, feature_columns, target_column, warmup_rows)
+
+    monkeypatch.setattr(FeatureSelectionStrategy, "rank_columns", spy)
+    chunked = ChunkedTimeSeries(sample_data, "timestamp", chunk_rows=20)
+    chunked.process_timeseries_features(
+        ["value"], "target", lambda chunk: None, max_window_size=4, sample_rows=50
+    )
+    # The sample keeps every fourth row, of which only the first is a warm-up row
+    assert ranked == [([0], 1)]
+
+
+def test_parquet_source_and_sink(sample_data, tmp_path):
+    pytest.importorskip("pyarrow")
+    source = str(tmp_path / "source.parquet")
+    output = str(tmp_path / "output.parquet")
+    sample_data.to_parquet(source)
+
+    sink = ParquetSink(output)
+    ChunkedTimeSeries(source, "timestamp", chunk_rows=25).generate_candidate_features(
+        ["value"], sink, max_window_size=3
+    )
+    sink.close()
+
+    pd.testing.assert_frame_equal(
+        pd.read_parquet(output), in_memory(sample_data, "last", 3), check_dtype=False
+    )
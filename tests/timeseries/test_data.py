@@ -1,6 +1,8 @@
+import numpy as np
 import pandas as pd
 import pytest
 from pychronoboost.timeseries.data import TimeSeriesData
+from pychronoboost.timeseries.feature_selector import get_feature_selector
 
 
 def test_time_series_data_importable():
@@ -83,3 +85,333 @@ def test_process_timeseries_features():
     assert "value2" in processed_data_columns
     assert "target" in processed_data_columns
     assert len(processed_data) == 6
+
+
+def test_process_timeseries_features_with_selector_threads(monkeypatch):
+    data = pd.DataFrame(
+        {
+            "timestamp": pd.date_range("2022-01-01", periods=30, freq="D"),
+            "value1": [float(i % 7) for i in range(30)],
+            "value2": [float(i % 5) for i in range(30)],
+            "target": [float(i) for i in range(30)],
+        }
+    )
+
+    default = TimeSeriesData(data.copy(), "timestamp").process_timeseries_features(
+        ["value1", "value2"], "target", max_window_size=4, max_features=3
+    )
+    selectors = []
+
+    def spy(*args, **kwargs):
+        selectors.append(get_feature_selector(*args, **kwargs))
+        return selectors[-1]
+
+    monkeypatch.setattr("pychronoboost.timeseries.data.get_feature_selector", spy)
+    single_thread = TimeSeriesData(
+        data.copy(), "timestamp"
+    ).process_timeseries_features(
+        ["value1", "value2"],
+        "target",
+        max_window_size=4,
+        max_features=3,
+        feature_selector_options={"n_jobs": 1},
+    )
+    assert [selector.n_jobs for selector in selectors] == [1]
+    pd.testing.assert_frame_equal(single_thread, default)
+
+
+def test_process_timeseries_features_in_chunks():
+    data = pd.DataFrame(
+        {
+            "timestamp": pd.date_range("2022-01-01", periods=30, freq="D"),
+            "value1": [float(i % 7) for i in range(30)],
+            "value2": [float(i % 5) for i in range(30)],
+            "target": [float(i) for i in range(30)],
+        }
+    )
+
+    eager = TimeSeriesData(data.copy(), "timestamp").process_timeseries_features(
+        ["value1", "value2"], "target", max_window_size=4, max_features=3
+    )
+    ts_data = TimeSeriesData(data.copy(), "timestamp")
+    single_chunk = ts_data.process_timeseries_features(
+        ["value1", "value2"], "target", max_window_size=4, max_features=3, chunk_size=32
+    )
+    pd.testing.assert_frame_equal(single_chunk, eager)
+    assert len(ts_data.selected_features) == 3
+
+    chunked = TimeSeriesData(data.copy(), "timestamp").process_timeseries_features(
+        ["value1", "value2"], "target", max_window_size=4, max_features=3, chunk_size=4
+    )
+    assert chunked.columns.tolist()[:4] == ["timestamp", "value1", "value2", "target"]
+    assert len(chunked.columns) == 7
+
+
+def test_impute_timesteps_with_aggregation():
+    data = pd.DataFrame(
+        {
+            "time": pd.date_range("2020-01-01", periods=6, freq="20S"),
+            "value": [1.0, 2.0, 3.0, 4.0, 5.0, 6.0],
+        }
+    )
+    ts_data = TimeSeriesData(
+        data, "time", timestep_freq="T", timestep_aggregation="mean"
+    )
+    ts_data.impute_timesteps()
+    assert ts_data.timestep_strategy.freq == "T"
+    assert ts_data.data["value"].tolist() == [2.0, 5.0]
+
+
+def test_impute_timesteps_gap_free_is_not_copied():
+    data = pd.DataFrame(
+        {"time": pd.date_range("2020-01-01", periods=5, freq="H"), "value": range(5)}
+    )
+    ts_data = TimeSeriesData(data, "time")
+    before = ts_data.data
+    ts_data.impute_timesteps()
+    assert ts_data.data is not before
+    assert np.shares_memory(
+        ts_data.data["value"].to_numpy(), before["value"].to_numpy()
+    )
+
+
+def test_impute_values_of_gap_free_series_leaves_input_unmodified():
+    values = [1.0, np.nan, 3.0, 4.0, np.nan]
+    data = pd.DataFrame(
+        {"time": pd.date_range("2020-01-01", periods=5, freq="D"), "value": values}
+    )
+    ts_data = TimeSeriesData(data, "time")
+    ts_data.impute_timesteps()
+    ts_data.impute_values(["value"], "last")
+    assert ts_data.data["value"].tolist() == [1.0, 1.0, 3.0, 4.0, 4.0]
+    np.testing.assert_array_equal(data["value"].to_numpy(), values)
+
+
+def test_impute_timesteps_reindexes_unsorted_and_duplicate_timesteps():
+    data = pd.DataFrame({"time": [4, 0, 1], "value": [3.0, 1.0, 2.0]})
+    ts_data = TimeSeriesData(data, "time", timestep_freq=1)
+    ts_data.impute_timesteps()
+    assert ts_data.data["time"].tolist() == [0, 1, 2, 3, 4]
+    assert ts_data.data["value"].tolist()[:2] == [1.0, 2.0]
+    assert ts_data.data["value"].iloc[-1] == 3.0
+
+    data = pd.DataFrame({"time": [0, 0, 2], "value": [1.0, 2.0, 3.0]})
+    ts_data = TimeSeriesData(data, "time", timestep_freq=1)
+    ts_data.impute_timesteps()
+    assert ts_data.data["time"].tolist() == [0, 0, 1, 2]
+    assert ts_data.data["value"].isna().sum() == 1
+
+
+def test_timestep_type_is_converted_once():
+    data = pd.DataFrame({"time": ["2020-01-01", "2020-01-03"], "value": [1.0, 2.0]})
+    ts_data = TimeSeriesData(data, "time", timestep_format="%Y-%m-%d")
+    assert ts_data.timestep_type == "date"
+    converted = ts_data.data["time"]
+    ts_data.impute_timesteps()
+    assert ts_data.timestep_type == "date"
+    assert pd.api.types.is_datetime64_dtype(converted)
+    assert len(ts_data.data) == 2
+
+
+def test_impute_values_mixed_dtypes():
+    data = pd.DataFrame(
+        {
+            "time": [0, 1, 2, 3],
+            "a": [1.0, None, 3.0, None],
+            "b": [None, 2.0, None, 4.0],
+            "c": [1, 2, 3, 4],
+            "d": ["x", None, "y", None],
+        }
+    )
+    ts_data = TimeSeriesData(data, "time")
+    ts_data.impute_values(["a", "b", "c", "d"], "last")
+    assert ts_data.data["a"].tolist() == [1.0, 1.0, 3.0, 3.0]
+    assert ts_data.data["b"].tolist() == [2.0, 2.0, 2.0, 4.0]
+    assert ts_data.data["c"].tolist() == [1, 2, 3, 4]
+    assert ts_data.data["d"].tolist() == ["x", "x", "y", "y"]
+    assert ts_data.data["c"].dtype == np.int64
+
+
+def test_impute_values_keeps_float_dtypes():
+    data = pd.DataFrame(
+        {
+            "time": [0, 1, 2],
+            "a": np.array([1.0, np.nan, 3.0], dtype=np.float32),
+            "b": [np.nan, 2.0, 3.0],
+        }
+    )
+    ts_data = TimeSeriesData(data, "time")
+    ts_data.impute_values(["a", "b"], "linear")
+    assert ts_data.data["a"].dtype == np.float32
+    assert ts_data.data["a"].tolist() == [1.0, 2.0, 3.0]
+    assert ts_data.data["b"].tolist() == [2.0, 2.0, 3.0]
+
+
+def test_impute_values_with_options():
+    data = pd.DataFrame({"time": range(6), "value": [1.0, 2.0, 3.0, None, 5.0, None]})
+    ts_data = TimeSeriesData(data, "time")
+    ts_data.impute_values(["value"], "seasonal", options={"period": 3})
+    assert ts_data.data["value"].tolist() == [1.0, 2.0, 3.0, 1.0, 5.0, 3.0]
+
+
+def test_generate_candidate_features_with_window_features():
+    data = pd.DataFrame({"time": range(6), "value": [1.0, 2.0, 4.0, 8.0, 16.0, 32.0]})
+    ts_data = TimeSeriesData(data, "time")
+    generated = ts_data.generate_candidate_features(
+        ["value"], max_window_size=2, window_features=["sum", "diff"]
+    )
+    assert generated == ["value_sum_1", "value_diff_1", "value_sum_2", "value_diff_2"]
+    assert ts_data.data["value_sum_2"].tolist() == [3.0, 3.0, 6.0, 12.0, 24.0, 48.0]
+    assert ts_data.data["value_diff_1"].tolist() == [0.0] * 6
+
+
+def test_generate_features_with_calendar_window_schedule():
+    data = pd.DataFrame(
+        {
+            "time": pd.date_range("2022-01-01", periods=48, freq="H").delete([5]),
+            "value": np.arange(47, dtype=float),
+        }
+    )
+    ts_data = TimeSeriesData(data, "time")
+    generated = ts_data.generate_candidate_features(
+        ["value"],
+        max_window_size=30,
+        window_features=["avg"],
+        window_schedule="calendar",
+    )
+    assert generated == ["value_avg_1", "value_avg_24"]
+    assert ts_data.window_sizes(100, "geometric") == [1, 2, 4, 8, 16, 32, 64, 100]
+
+
+def test_process_timeseries_features_with_pair_features():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(
+        {
+            "time": range(60),
+            "a": rng.normal(size=60).cumsum(),
+            "b": rng.normal(size=60).cumsum(),
+            "c": rng.normal(size=60).cumsum(),
+        }
+    )
+    data["target"] = data["a"] - data["b"].shift(2).fillna(0)
+    ts_data = TimeSeriesData(data, "time")
+    generated = ts_data.generate_candidate_features(
+        ["a", "b", "c"],
+        max_window_size=3,
+        window_features=["avg"],
+        pair_features=["spread"],
+        max_pairs=2,
+    )
+    pair_names = [name for name in generated if "spread" in name]
+    assert len(pair_names) == 6
+    assert not ts_data.data[generated].isna().any().any()
+
+    with pytest.raises(ValueError):
+        TimeSeriesData(data, "time").process_timeseries_features(
+            ["a", "b"], "target", chunk_size=10, pair_features=["corr"]
+        )
+
+
+@pytest.mark.parametrize("feature_dtype", ["float32", "compact"])
+def test_generate_candidate_features_with_feature_dtype(feature_dtype):
+    data = pd.DataFrame(
+        {"time": range(8), "value": [1.0, 2.0, 3.0, 5.0, 8.0, 13.0, 21.0, 34.1]}
+    )
+    expected = TimeSeriesData(data.copy(), "time")
+    expected.generate_candidate_features(["value"], max_window_size=3)
+    ts_data = TimeSeriesData(data.copy(), "time", feature_dtype=feature_dtype)
+    generated = ts_data.generate_candidate_features(["value"], max_window_size=3)
+
+    np.testing.assert_allclose(
+        ts_data.data[generated].to_numpy(np.float64),
+        expected.data[generated].to_numpy(),
+        rtol=1e-6,
+    )
+    dtypes = ts_data.data[generated].dtypes
+    if feature_dtype == "float32":
+        assert (dtypes == np.float32).all()
+    else:
+        # Lags and windows of the integers are exact in int16, 34.1 needs float32
+        assert dtypes["value_nth_3"] == np.int16
+        assert dtypes["value_min_2"] == np.int16
+        assert dtypes["value_max_1"] == np.float32
+        assert dtypes["value_avg_2"] == np.float32
+
+    with pytest.raises(NotImplementedError):
+        TimeSeriesData(data, "time", feature_dtype="int8")
+    if feature_dtype == "compact":
+        with pytest.raises(ValueError):
+            TimeSeriesData(
+                data, "time", feature_dtype=feature_dtype
+            ).process_timeseries_features(["value"], "value", chunk_size=10)
+
+
+def test_copy_on_write_leaves_input_unmodified():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=40)
+    values[[3, 10]] = np.nan
+    data = pd.DataFrame(
+        {
+            "time": pd.date_range("2021-01-01", periods=40, freq="D").strftime(
+                "%Y-%m-%d"
+            ),
+            "value": values,
+            "target": rng.normal(size=40),
+        }
+    )
+    original = data.copy()
+
+    expected = TimeSeriesData(data.copy(), "time").process_timeseries_features(
+        ["value"], "target", max_window_size=3
+    )
+    processed = TimeSeriesData(
+        data, "time", copy_on_write=True
+    ).process_timeseries_features(["value"], "target", max_window_size=3)
+    pd.testing.assert_frame_equal(data, original)
+    pd.testing.assert_frame_equal(processed, expected)
+
+
+def test_copy_on_write_runs_concurrently():
+    from concurrent.futures import ThreadPoolExecutor
+
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=200)
+    values[::7] = np.nan
+    data = pd.DataFrame({"time": range(200), "value": values})
+    original = data.copy()
+    strategies = ["last", "linear", "zero", "kalman"]
+
+    def run(strategy):
+        ts_data = TimeSeriesData(data, "time", copy_on_write=True)
+        ts_data.generate_candidate_features(["value"], strategy, max_window_size=4)
+        return ts_data.data
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(run, strategies))
+    pd.testing.assert_frame_equal(data, original)
+    for strategy, result in zip(strategies, results):
+        pd.testing.assert_frame_equal(result, run(strategy))
+
+
+def test_generate_features_in_threads(tmp_path):
+    from pychronoboost.cache import FeatureCache
+
+    rng = np.random.default_rng(2)
+    data = pd.DataFrame(
+        {"time": range(60), "a": rng.normal(size=60), "b": rng.normal(size=60)}
+    )
+    expected = TimeSeriesData(data.copy(), "time")
+    expected_names = expected.generate_features(["a", "b"], 5, ["avg", "max"])
+
+    cache = FeatureCache(str(tmp_path / "cache"))
+    # Cache only the features of 'b', so the threads compute 'a' alone
+    TimeSeriesData(data.copy(), "time", cache=cache).generate_features(
+        ["b"], 5, ["avg", "max"]
+    )
+    for ts_data in [
+        TimeSeriesData(data.copy(), "time"),
+        TimeSeriesData(data.copy(), "time", cache=cache),
+    ]:
+        names = ts_data.generate_features(["a", "b"], 5, ["avg", "max"], n_jobs=3)
+        assert names == expected_names
+        pd.testing.assert_frame_equal(ts_data.data, expected.data)
@@ -1,7 +1,13 @@
+import numpy as np
 import pytest
 import pandas as pd
 from pychronoboost.timeseries.feature_generator import (
+    FeatureCandidates,
+    PairFeatureGenerator,
     TimeSeriesFeatureGenerator,
+    compact_dtype,
+    get_window_sizes,
+    select_column_pairs,
 )
 
 
@@ -54,3 +60,197 @@ def test_multiple_window_sizes(sample_data):
         assert f"value_max_{window_size}" in sample_data.columns
         assert f"value_avg_{window_size}" in sample_data.columns
         assert f"value_nth_{window_size}" in sample_data.columns
+
+
+def test_update_matches_batch_generation():
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame(
+        {"value": rng.normal(size=40) * 1e3, "other": rng.normal(size=40)}
+    )
+    data.loc[[5, 21], "value"] = np.nan
+
+    batch_generator = TimeSeriesFeatureGenerator(max_window_size=6)
+    batch = data.copy()
+    generated = batch_generator.generate_features(batch, "value")
+    generated += batch_generator.generate_features(batch, "other")
+
+    stream_generator = TimeSeriesFeatureGenerator(max_window_size=6)
+    chunks = [
+        stream_generator.update(data.iloc[start:stop], ["value", "other"])
+        for start, stop in [(0, 1), (1, 4), (4, 25), (25, 26), (26, 40)]
+    ]
+    streamed = pd.concat(chunks)
+
+    assert streamed.columns.tolist() == generated
+    np.testing.assert_array_equal(streamed.to_numpy(), batch[generated].to_numpy())
+
+
+def test_reset_state():
+    data = pd.DataFrame({"value": [1.0, 2.0, 3.0]})
+    feature_generator = TimeSeriesFeatureGenerator(max_window_size=2)
+    feature_generator.update(data, ["value"])
+    feature_generator.reset_state()
+    features = feature_generator.update(data.iloc[:1], ["value"])
+    assert np.isnan(features["value_min_2"].iloc[0])
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 8, 100])
+def test_feature_candidates_chunks(sample_data, chunk_size):
+    sample_data["other"] = [5.0, 3.0, 4.0, 1.0, 2.0]
+    feature_generator = TimeSeriesFeatureGenerator(max_window_size=3)
+    candidates = FeatureCandidates(sample_data, ["value", "other"], feature_generator)
+
+    expected = sample_data.copy()
+    generated = feature_generator.generate_features(expected, "value")
+    generated += feature_generator.generate_features(expected, "other")
+    expected = expected[generated].ffill().bfill()
+
+    chunks = list(candidates.iter_chunks(chunk_size))
+    assert all(len(chunk.columns) <= max(chunk_size, 4) for chunk in chunks)
+    pd.testing.assert_frame_equal(pd.concat(chunks, axis=1), expected)
+    pd.testing.assert_frame_equal(
+        candidates.compute(["other_avg_2", "value_nth_3"]),
+        expected[["other_avg_2", "value_nth_3"]],
+    )
+
+
+def test_generate_selected_window_features(sample_data):
+    feature_generator = TimeSeriesFeatureGenerator(
+        max_window_size=3, features=["std", "ewm"]
+    )
+    generated = feature_generator.generate_features(sample_data, "value")
+    assert generated == [
+        "value_std_1",
+        "value_ewm_1",
+        "value_std_2",
+        "value_ewm_2",
+        "value_std_3",
+        "value_ewm_3",
+    ]
+    assert feature_generator.n_features == 6
+    np.testing.assert_allclose(sample_data["value_std_3"].iloc[2:], 1.0)
+
+    candidates = FeatureCandidates(sample_data, ["value"], feature_generator)
+    chunks = pd.concat(list(candidates.iter_chunks(4)), axis=1)
+    assert chunks.columns.tolist() == generated
+
+
+def test_generate_float32_features(sample_data):
+    feature_generator = TimeSeriesFeatureGenerator(3, dtype=np.float32)
+    features = feature_generator.compute_features(sample_data, "value")
+    assert features.dtype == np.float32
+    np.testing.assert_allclose(
+        features,
+        TimeSeriesFeatureGenerator(3).compute_features(sample_data, "value"),
+        rtol=1e-6,
+    )
+    new_rows = feature_generator.update(sample_data, ["value"])
+    assert (new_rows.dtypes == np.float32).all()
+
+    pair_generator = PairFeatureGenerator(2, dtype=np.float32)
+    sample_data["other"] = sample_data["value"] ** 2
+    assert pair_generator.compute_features(sample_data, [("value", "other")]).dtype == (
+        np.float32
+    )
+
+
+@pytest.mark.parametrize(
+    "values, expected",
+    [
+        ([1.0, -3.0, 30000.0], np.int16),
+        ([1.0, np.nan], np.float16),
+        ([0.5, 0.25, 40000.0], np.float16),
+        ([0.1, 2.0], np.float32),
+        ([1.0, 1e6], np.float32),
+    ],
+)
+def test_compact_dtype(values, expected):
+    assert compact_dtype(np.array(values, dtype=np.float32)) == expected
+
+
+def test_get_window_sizes():
+    assert get_window_sizes(4) == [1, 2, 3, 4]
+    assert get_window_sizes(365, "geometric") == [1, 2, 4, 8, 16, 32, 64, 128, 256, 365]
+    assert get_window_sizes(64, "geometric") == [1, 2, 4, 8, 16, 32, 64]
+    assert get_window_sizes(3, [30, 7, 7]) == [7, 30]
+    with pytest.raises(ValueError):
+        get_window_sizes(3, [0, 2])
+    with pytest.raises(NotImplementedError):
+        get_window_sizes(3, "fibonacci")
+
+
+def test_get_calendar_window_sizes():
+    assert get_window_sizes(400, "calendar", "D") == [1, 7, 30, 91, 365]
+    assert get_window_sizes(200, "calendar", "H") == [1, 24, 168]
+    assert get_window_sizes(24, "calendar", "MS") == [1, 3, 12]
+    assert get_window_sizes(3, ["week", 3], "D") == [3, 7]
+    with pytest.raises(ValueError):
+        get_window_sizes(10, "calendar", 1)
+    with pytest.raises(ValueError):
+        get_window_sizes(10, "calendar", "5A")
+
+
+def test_generate_features_for_window_schedule(sample_data):
+    feature_generator = TimeSeriesFeatureGenerator(
+        max_window_size=4, features=["avg"], window_sizes=[1, 2, 4]
+    )
+    assert feature_generator.generate_features(sample_data, "value") == [
+        "value_avg_1",
+        "value_avg_2",
+        "value_avg_4",
+    ]
+    assert sample_data["value_avg_4"].iloc[3:].tolist() == [2.5, 3.5]
+
+    streamed = TimeSeriesFeatureGenerator(
+        max_window_size=4, features=["avg"], window_sizes=[1, 2, 4]
+    ).update(sample_data, ["value"])
+    pd.testing.assert_frame_equal(streamed, sample_data[streamed.columns.tolist()])
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2, 5])
+def test_compute_columns_in_threads(n_jobs):
+    rng = np.random.default_rng(0)
+    data = pd.DataFrame({"a": rng.normal(size=100), "b": rng.normal(size=100)})
+    data.loc[10:15, "a"] = np.nan
+    feature_generator = TimeSeriesFeatureGenerator(
+        max_window_size=6, features=["avg", "std", "nth"]
+    )
+    expected = np.vstack(
+        [feature_generator.compute_features(data, col) for col in ["a", "b"]]
+    )
+    computed = feature_generator.compute_columns(data, ["a", "b"], n_jobs=n_jobs)
+    np.testing.assert_array_equal(computed, expected)
+
+
+def test_select_column_pairs():
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=200)
+    data = pd.DataFrame(
+        {
+            "a": base,
+            "b": rng.normal(size=200),
+            "c": base * 2 + rng.normal(size=200) * 0.1,
+            "d": 1.0,
+        }
+    )
+    data.loc[3, "a"] = np.nan
+    assert len(select_column_pairs(data, ["a", "b", "c", "d"])) == 6
+    assert select_column_pairs(data, ["a", "b", "c", "d"], max_pairs=1) == [("a", "c")]
+    # The pairs with a constant column come last
+    assert ("a", "d") not in select_column_pairs(data, ["a", "b", "c", "d"], 3)
+
+
+def test_generate_pair_features(sample_data):
+    sample_data["other"] = [5.0, 3.0, 4.0, 1.0, 2.0]
+    feature_generator = PairFeatureGenerator(
+        max_window_size=2, features=["spread", "corr"]
+    )
+    generated = feature_generator.generate_features(sample_data, [("value", "other")])
+    assert generated == [
+        "value_other_spread_1",
+        "value_other_corr_1",
+        "value_other_spread_2",
+        "value_other_corr_2",
+    ]
+    assert sample_data["value_other_spread_2"].tolist()[1:] == [-3.0, 0.0, 0.0, 4.0]
+    assert sample_data["value_other_corr_2"].tolist()[1:] == [-1.0, 1.0, -1.0, 1.0]
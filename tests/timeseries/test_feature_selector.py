@@ -1,8 +1,20 @@
 import pytest
+import numpy as np
 import pandas as pd
 from xgboost import XGBRegressor
 from pychronoboost.timeseries.feature_selector import (
+    CorrelationFeatureSelector,
+    HistogramBoostingFeatureSelector,
+    L1FeatureSelector,
+    MutualInformationFeatureSelector,
+    SuccessiveHalvingFeatureSelector,
     XGBoostFeatureSelector,
+    benchmark_feature_selectors,
+    complete_rows,
+    feature_matrix,
+    get_feature_selector,
+    min_ranks,
+    temporal_sample,
 )
 
 
@@ -57,3 +69,145 @@ def test_xgboost_feature_importance(sample_time_series_data):
 
     # Check if feature1 is selected as it's expected to be the most important
     assert "feature1" in sample_time_series_data.columns
+
+
+@pytest.fixture
+def candidate_features():
+    rng = np.random.default_rng(0)
+    X = pd.DataFrame(rng.normal(size=(200, 6)), columns=[f"f{i}" for i in range(6)])
+    y = 3 * X["f2"] - 2 * X["f4"] + 0.1 * rng.normal(size=200)
+    X["constant"] = 1.0
+    return X, y
+
+
+def test_get_feature_selector():
+    for selector_model, selector_class in [
+        ("XGB", XGBoostFeatureSelector),
+        ("HIST", HistogramBoostingFeatureSelector),
+        ("CORR", CorrelationFeatureSelector),
+        ("MI", MutualInformationFeatureSelector),
+        ("L1", L1FeatureSelector),
+    ]:
+        selector = get_feature_selector(selector_model, 2)
+        assert isinstance(selector, selector_class)
+        assert selector.num_features == 2
+
+    with pytest.raises(NotImplementedError):
+        get_feature_selector("unknown", 2)
+
+
+@pytest.mark.parametrize(
+    "selector_model", ["XGB", "HIST", "CORR", "MI", "L1", "HALVING"]
+)
+def test_rank_features(candidate_features, selector_model):
+    X, y = candidate_features
+    importance = get_feature_selector(selector_model, 2).rank_features(X, y)
+    assert importance.index.tolist() == X.columns.tolist()
+    assert set(importance.nlargest(2).index) == {"f2", "f4"}
+    assert importance["constant"] == importance.min()
+
+
+@pytest.mark.parametrize("selector_model", ["XGB", "CORR"])
+def test_rank_matrix(candidate_features, selector_model):
+    X, y = candidate_features
+    selector = get_feature_selector(selector_model, 2)
+    matrix = feature_matrix(X, X.columns, selector.matrix_dtype)
+    assert matrix.flags.c_contiguous
+    assert matrix.dtype == selector.matrix_dtype
+    importance = selector.rank_matrix(matrix, y.to_numpy(), X.columns.tolist())
+    # XGBoost trains in float32 either way, so both paths rank alike
+    pd.testing.assert_series_equal(importance, selector.rank_features(X, y))
+
+
+def test_complete_rows():
+    data = pd.DataFrame(
+        {"a": [1.0, np.nan, 3.0, 4.0], "b": [1.0, 2.0, 3.0, np.nan], "c": [np.nan] * 4}
+    )
+    # Complete rows are sliced, so they can be used without a copy
+    assert complete_rows(data[["a"]].iloc[2:], ["a"]) == slice(0, None)
+    assert complete_rows(data, ["a"], start=2) == slice(2, None)
+    # Columns that are not checked, like c, never leave rows out
+    mask = complete_rows(data, ["a", "b"])
+    assert mask.tolist() == [True, False, True, False]
+    assert complete_rows(data, ["a", "b"], start=1).tolist() == [
+        False,
+        False,
+        True,
+        False,
+    ]
+
+
+def test_rank_columns(candidate_features):
+    X, y = candidate_features
+    data = X.assign(target=y, unrelated=np.nan)
+    data.loc[:9, "f0"] = np.nan
+    data.loc[190:, "target"] = np.nan
+    selector = get_feature_selector("CORR", 2)
+    importance = selector.rank_columns(
+        data, X.columns.tolist(), "target", warmup_rows=5
+    )
+    expected = selector.rank_features(X.iloc[10:190], y.iloc[10:190])
+    pd.testing.assert_series_equal(importance, expected)
+
+    # XGBoost can rank the rows with missing features as they are
+    selector = get_feature_selector("XGB", 2, keep_missing=True)
+    importance = selector.rank_columns(data, X.columns.tolist(), "target")
+    assert set(importance.nlargest(2).index) == {"f2", "f4"}
+
+
+def test_benchmark_feature_selectors(candidate_features):
+    X, y = candidate_features
+    results = benchmark_feature_selectors(X, y, 2, ["CORR", "L1"])
+    assert results.index.tolist() == ["XGB", "CORR", "L1"]
+    assert (results["seconds"] >= 0).all()
+    assert results.loc["XGB", "overlap"] == 1
+
+
+def test_min_ranks():
+    values = np.array([[3.0, 1.0], [1.0, 1.0], [3.0, 0.0], [2.0, 1.0]])
+    np.testing.assert_array_equal(min_ranks(values), [[2, 1], [0, 1], [2, 0], [1, 1]])
+    np.testing.assert_array_equal(min_ranks(values[:, 0]), [2, 0, 2, 1])
+
+
+def test_temporal_sample():
+    rows = temporal_sample(1000, 10, np.random.default_rng(0))
+    assert len(rows) == 10
+    assert (np.diff(rows) > 0).all()
+    # One row is drawn from each tenth of the series, including the most recent one
+    assert (rows // 100 == np.arange(10)).all()
+    assert (temporal_sample(5, 10, np.random.default_rng(0)) == np.arange(5)).all()
+
+
+@pytest.mark.parametrize(
+    "selector_options",
+    [
+        {"max_rows": 50},
+        {"early_stopping_rounds": 5, "n_estimators": 500},
+        {"n_subsamples": 3, "max_rows": 100, "n_jobs": 1},
+    ],
+)
+def test_xgboost_selector_options(candidate_features, selector_options):
+    X, y = candidate_features
+    selector = get_feature_selector("XGB", 2, **selector_options)
+    importance = selector.rank_features(X, y)
+    assert set(importance.nlargest(2).index) == {"f2", "f4"}
+
+
+def test_successive_halving_selector():
+    rng = np.random.default_rng(1)
+    X = pd.DataFrame(rng.normal(size=(2000, 40)), columns=[f"f{i}" for i in range(40)])
+    y = 3 * X["f7"] - 2 * X["f31"] + 0.1 * rng.normal(size=2000)
+
+    selector = get_feature_selector("HALVING", 2, min_rows=200, n_estimators=20)
+    assert isinstance(selector, SuccessiveHalvingFeatureSelector)
+    importance = selector.rank_features(X, y)
+    assert importance.index.tolist() == X.columns.tolist()
+    assert set(importance.nlargest(2).index) == {"f7", "f31"}
+
+
+@pytest.mark.parametrize(
+    "selector_options", [{"keep_fraction": 1}, {"row_growth": 0.5}]
+)
+def test_successive_halving_selector_invalid_options(selector_options):
+    with pytest.raises(ValueError):
+        get_feature_selector("HALVING", 2, **selector_options)
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pychronoboost.timeseries.data import TimeSeriesData
+from pychronoboost.timeseries.panel import (
+    group_boundaries,
+    process_groups,
+    resolve_n_jobs,
+)
+
+
+@pytest.fixture
+def panel_data():
+    frames = []
+    for i, sensor in enumerate(["b", "a", "c"]):
+        timestamps = pd.date_range("2022-01-01", periods=8, freq="D").delete([2, 5])
+        frames.append(
+            pd.DataFrame(
+                {
+                    "timestamp": timestamps,
+                    "sensor": sensor,
+                    "value": np.arange(6, dtype=float) * (i + 1),
+                    "target": np.arange(6, dtype=float),
+                }
+            )
+        )
+    return pd.concat(frames, ignore_index=True)
+
+
+def test_group_boundaries(panel_data):
+    order, keys, bounds = group_boundaries(panel_data, "sensor")
+    assert keys == ["a", "b", "c"]
+    assert bounds.tolist() == [0, 6, 12, 18]
+    assert (panel_data["sensor"].to_numpy()[order][:6] == "a").all()
+
+
+def test_resolve_n_jobs():
+    assert resolve_n_jobs(2) == 2
+    assert resolve_n_jobs(-1) >= 1
+    with pytest.raises(ValueError):
+        resolve_n_jobs(0)
+
+
+@pytest.mark.parametrize("n_jobs", [1, 2])
+def test_process_groups_matches_single_series(panel_data, n_jobs):
+    processed, generated_features = process_groups(
+        panel_data, "timestamp", "sensor", ["value"], "last", 3, n_jobs=n_jobs
+    )
+    assert len(generated_features) == 12
+    assert len(processed) == 24
+
+    for sensor, group in processed.groupby("sensor"):
+        ts_data = TimeSeriesData(
+            panel_data[panel_data["sensor"] == sensor].reset_index(drop=True),
+            "timestamp",
+        )
+        ts_data.generate_candidate_features(["value"], "last", 3)
+        expected = ts_data.data.assign(sensor=sensor)
+        pd.testing.assert_frame_equal(
+            group.reset_index(drop=True), expected, check_like=True
+        )
+
+
+def test_process_groups_without_pool_skips_shared_memory(panel_data, monkeypatch):
+    def fail(*args):
+        raise AssertionError("shared memory is only needed by worker processes")
+
+    monkeypatch.setattr("pychronoboost.timeseries.panel.SharedFrame", fail)
+    process_groups(panel_data, "timestamp", "sensor", ["value"], "last", 3, n_jobs=1)
+    single = panel_data[panel_data["sensor"] == "a"]
+    process_groups(single, "timestamp", "sensor", ["value"], "last", 3, n_jobs=2)
+
+
+def test_process_timeseries_features_with_groups(panel_data):
+    ts_data = TimeSeriesData(panel_data, "timestamp", group_column="sensor")
+    processed_data = ts_data.process_timeseries_features(
+        ["value"], "target", max_features=2, n_jobs=2
+    )
+    assert len(processed_data) == 24
+    assert len(processed_data.columns) == 6
+    assert set(processed_data["sensor"]) == {"a", "b", "c"}
+
+
+def test_initialization_with_invalid_group_column(panel_data):
+    with pytest.raises(ValueError):
+        TimeSeriesData(panel_data, "timestamp", group_column="nonexistent_column")
+
+
+def test_process_groups_shares_column_pairs(panel_data):
+    panel_data["other"] = np.cos(np.arange(18))
+    panel_data["third"] = panel_data["value"] ** 2
+    processed, generated_features = process_groups(
+        panel_data,
+        "timestamp",
+        "sensor",
+        ["value", "other", "third"],
+        "last",
+        2,
+        window_features=["avg"],
+        pair_features=["ratio"],
+        max_pairs=1,
+    )
+    assert generated_features[-2:] == ["value_third_ratio_1", "value_third_ratio_2"]
+    assert not processed[generated_features].isna().any().any()
@@ -0,0 +1,137 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pychronoboost.timeseries.pipeline import FeaturePipeline
+
+
+@pytest.fixture
+def sample_data():
+    rng = np.random.default_rng(0)
+    timestamps = pd.date_range("2022-01-01", periods=40, freq="D").delete([3, 10])
+    value = rng.normal(size=38).cumsum()
+    value[[5, 20]] = np.nan
+    return pd.DataFrame(
+        {
+            "timestamp": timestamps,
+            "value": value,
+            "target": np.arange(38, dtype=float),
+        }
+    )
+
+
+@pytest.fixture
+def fitted_pipeline(sample_data):
+    pipeline = FeaturePipeline(
+        "timestamp", ["value"], "target", max_window_size=5, max_features=3
+    )
+    pipeline.fit(sample_data.copy())
+    return pipeline
+
+
+def test_transform_matches_fit_transform(sample_data):
+    pipeline = FeaturePipeline(
+        "timestamp", ["value"], "target", max_window_size=5, max_features=3
+    )
+    fitted = pipeline.fit_transform(sample_data.copy())
+    assert len(pipeline.selected_features) == 3
+
+    transformed = pipeline.transform(sample_data.copy())
+    pd.testing.assert_frame_equal(transformed, fitted)
+
+
+def test_transform_computes_only_selected_features(fitted_pipeline, sample_data):
+    transformed = fitted_pipeline.transform(sample_data.copy())
+    generated = [col for col in transformed.columns if col not in sample_data.columns]
+    assert generated == fitted_pipeline.selected_feature_names
+
+
+def test_fit_and_transform_leave_input_unmodified(sample_data):
+    # Gap-free timesteps, so imputation would otherwise work on the input itself
+    data = sample_data.assign(
+        timestamp=pd.date_range("2022-01-01", periods=38, freq="D")
+    )
+    original = data.copy()
+    pipeline = FeaturePipeline(
+        "timestamp", ["value"], "target", max_window_size=5, max_features=3
+    )
+    fitted = pipeline.fit_transform(data, copy_on_write=True)
+    pd.testing.assert_frame_equal(data, original)
+    pd.testing.assert_frame_equal(pipeline.transform(data), fitted)
+    pd.testing.assert_frame_equal(data, original)
+
+
+def test_transform_before_fit(sample_data):
+    pipeline = FeaturePipeline("timestamp", ["value"], "target")
+    with pytest.raises(ValueError):
+        pipeline.transform(sample_data)
+
+
+def test_save_and_load(fitted_pipeline, sample_data, tmp_path):
+    path = tmp_path / "pipeline.json"
+    fitted_pipeline.save(path)
+    loaded = FeaturePipeline.load(path)
+
+    assert loaded.to_dict() == fitted_pipeline.to_dict()
+    pd.testing.assert_frame_equal(
+        loaded.transform(sample_data.copy()),
+        fitted_pipeline.transform(sample_data.copy()),
+    )
+
+
+def test_transform_with_groups(sample_data):
+    panel = pd.concat(
+        [sample_data.assign(sensor="a"), sample_data.assign(sensor="b")],
+        ignore_index=True,
+    )
+    pipeline = FeaturePipeline(
+        "timestamp",
+        ["value"],
+        "target",
+        max_window_size=4,
+        max_features=2,
+        group_column="sensor",
+    )
+    fitted = pipeline.fit_transform(panel.copy())
+    transformed = pipeline.transform(panel.copy())
+    pd.testing.assert_frame_equal(transformed, fitted, check_like=True)
+
+
+def test_window_schedule(sample_data, tmp_path):
+    pipeline = FeaturePipeline(
+        "timestamp",
+        ["value"],
+        "target",
+        max_window_size=12,
+        max_features=3,
+        window_features=["avg", "std"],
+        window_schedule="geometric",
+    )
+    fitted = pipeline.fit_transform(sample_data.copy())
+    assert {spec["window_size"] for spec in pipeline.selected_features} <= {
+        1,
+        2,
+        4,
+        8,
+        12,
+    }
+
+    path = tmp_path / "pipeline.json"
+    pipeline.save(path)
+    pd.testing.assert_frame_equal(
+        FeaturePipeline.load(path).transform(sample_data.copy()), fitted
+    )
+
+
+def test_pair_features(sample_data):
+    sample_data["other"] = np.sin(np.arange(38))
+    pipeline = FeaturePipeline(
+        "timestamp",
+        ["value", "other"],
+        "target",
+        max_window_size=4,
+        max_features=4,
+        window_features=["avg"],
+        pair_features=["corr", "spread"],
+    )
+    fitted = pipeline.fit_transform(sample_data.copy())
+    pd.testing.assert_frame_equal(pipeline.transform(sample_data.copy()), fitted)
@@ -0,0 +1,291 @@
+import numpy as np
+import pandas as pd
+import pytest
+from pychronoboost.timeseries.rolling import (
+    AVAILABLE_WINDOW_FEATURES,
+    PAIR_FEATURES,
+    WINDOW_FEATURES,
+    RollingWindowState,
+    check_window_features,
+    compute_pair_features,
+    compute_window_feature,
+    compute_window_features,
+    pair_feature_names,
+    window_feature_names,
+)
+
+
+@pytest.fixture
+def sample_values():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=50)
+    values[[3, 17, 18]] = np.nan
+    return values
+
+
+def expected_features(values, window_size):
+    series = pd.Series(values)
+    rolling = series.rolling(window=window_size)
+    return [
+        rolling.min(),
+        rolling.max(),
+        rolling.mean(),
+        series.shift(window_size - 1),
+    ]
+
+
+@pytest.mark.parametrize("window_sizes", [[1, 2, 3], [1, 5, 7, 8, 13], [60]])
+def test_compute_window_features_matches_pandas(sample_values, window_sizes):
+    features = compute_window_features(sample_values, window_sizes)
+    assert features.shape == (len(WINDOW_FEATURES) * len(window_sizes), 50)
+
+    for i, window_size in enumerate(window_sizes):
+        for j, expected in enumerate(expected_features(sample_values, window_size)):
+            np.testing.assert_allclose(
+                features[i * len(WINDOW_FEATURES) + j], expected.to_numpy()
+            )
+
+
+def test_compute_window_features_into_preallocated_array(sample_values):
+    out = np.empty((len(WINDOW_FEATURES) * 2, 50))
+    result = compute_window_features(sample_values, [2, 4], out=out)
+    assert result is out
+
+
+def test_compute_window_features_invalid_out(sample_values):
+    with pytest.raises(ValueError):
+        compute_window_features(sample_values, [2, 4], out=np.empty((3, 50)))
+
+
+def test_window_feature_names():
+    assert window_feature_names("value", [1, 2]) == [
+        "value_min_1",
+        "value_max_1",
+        "value_avg_1",
+        "value_nth_1",
+        "value_min_2",
+        "value_max_2",
+        "value_avg_2",
+        "value_nth_2",
+    ]
+
+
+def expected_feature(values, feature, window_size):
+    series = pd.Series(values)
+    rolling = series.rolling(window=window_size)
+    if feature == "ewm":
+        ewm = series.ffill().ewm(span=window_size, adjust=False).mean()
+        return ewm.where(rolling.count() == window_size)
+    if feature == "slope":
+        positions = np.arange(window_size) - (window_size - 1) / 2
+        return rolling.apply(
+            lambda window: positions @ window / (positions @ positions), raw=True
+        )
+    if feature == "diff":
+        return series.diff(window_size - 1)
+    if feature == "pct_change":
+        return series.pct_change(window_size - 1, fill_method=None)
+    if feature in ("q25", "q75"):
+        return rolling.quantile(int(feature[1:]) / 100)
+    return getattr(rolling, feature)()
+
+
+@pytest.mark.parametrize(
+    "feature", [f for f in AVAILABLE_WINDOW_FEATURES if f not in WINDOW_FEATURES]
+)
+@pytest.mark.parametrize("window_size", [1, 2, 3, 7, 20])
+def test_window_feature_library_matches_pandas(sample_values, feature, window_size):
+    values = sample_values * 10 + 1000
+    expected = expected_feature(values, feature, window_size).to_numpy()
+    if window_size == 1 and feature in ("var", "std", "slope"):
+        expected = np.full(len(values), np.nan)
+    np.testing.assert_allclose(
+        compute_window_feature(values, feature, window_size),
+        expected,
+        rtol=1e-6,
+        atol=1e-9,
+    )
+
+
+def test_window_features_of_constant_windows():
+    values = np.array([1.0, 2.0, 2.0, 2.0, 2.0, 3.0])
+    features = compute_window_features(values, [3], features=["std", "skew"])
+    # Constant windows have exactly zero deviation and skew, as in pandas
+    np.testing.assert_allclose(features[0, 2:], [3**-0.5, 0.0, 0.0, 3**-0.5])
+    np.testing.assert_allclose(features[1, 3:], [0.0, 0.0, 3**0.5])
+    assert features[0, 3] == 0.0 and features[1, 4] == 0.0
+
+
+def test_window_features_of_a_long_offset_series():
+    # Prefix sums restart every block, so long series keep their precision
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=20_000) + 1e4
+    features = compute_window_features(values, [10], features=["var", "slope"])
+    windows = np.lib.stride_tricks.sliding_window_view(values, 10)
+    positions = np.arange(10) - 4.5
+    np.testing.assert_allclose(features[0, 9:], windows.var(axis=1, ddof=1), rtol=1e-6)
+    np.testing.assert_allclose(
+        features[1, 9:], windows @ positions / (positions @ positions), atol=1e-8
+    )
+
+
+@pytest.mark.parametrize("n_rows", [300_000, 2_000_000])
+def test_sums_of_a_long_large_offset_series_match_pandas(n_rows):
+    # The sums restart every block and are taken of the centered values, so their error
+    # grows neither with the length of the series nor with its level
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=n_rows) * 100 + 1e9
+    values[::1000] = np.nan
+    features = compute_window_features(values, [1, 30], features=["avg", "sum"])
+    series = pd.Series(values)
+    for row, (window_size, statistic) in enumerate(
+        [(1, "mean"), (1, "sum"), (30, "mean"), (30, "sum")]
+    ):
+        expected = getattr(series.rolling(window_size), statistic)().to_numpy()
+        np.testing.assert_allclose(features[row], expected, rtol=1e-14, atol=0)
+
+
+def test_moments_of_a_long_random_walk():
+    # Every block is centered on its own level, so the moments of a wandering series do
+    # not cancel against a far away center
+    rng = np.random.default_rng(0)
+    values = np.cumsum(rng.normal(size=1_000_000)) + 1e3
+    features = compute_window_features(values, [10], features=["var", "skew"])
+    windows = np.lib.stride_tricks.sliding_window_view(values, 10)[::7]
+    deviations = windows - windows.mean(axis=1, keepdims=True)
+    second = (deviations**2).mean(axis=1)
+    third = (deviations**3).mean(axis=1)
+    np.testing.assert_allclose(features[0, 9::7], second * 10 / 9, rtol=1e-6)
+    skew = np.sqrt(90) / 8 * third / second**1.5
+    assert np.max(np.abs(features[1, 9::7] - skew) / (1 + np.abs(skew))) < 1e-3
+
+
+def test_selected_window_features_layout(sample_values):
+    features = compute_window_features(
+        sample_values, [2, 4], features=["median", "avg", "q75"]
+    )
+    assert features.shape == (6, 50)
+    np.testing.assert_array_equal(
+        features[4], compute_window_feature(sample_values, "avg", 4)
+    )
+    assert window_feature_names("v", [2], ["median", "avg"]) == [
+        "v_median_2",
+        "v_avg_2",
+    ]
+
+
+def test_check_window_features():
+    assert check_window_features() == WINDOW_FEATURES
+    with pytest.raises(NotImplementedError):
+        check_window_features(["kurt"])
+    with pytest.raises(ValueError):
+        check_window_features(["avg", "avg"])
+
+
+@pytest.mark.parametrize("block_size", [4096, 8])
+def test_rolling_state_matches_batch_for_all_features(
+    sample_values, block_size, monkeypatch
+):
+    # Small blocks make the appended values reach back across blocks
+    monkeypatch.setattr("pychronoboost.timeseries.rolling._SUM_BLOCK_SIZE", block_size)
+    window_sizes = [1, 2, 3, 5, 8]
+    batch = compute_window_features(
+        sample_values, window_sizes, features=AVAILABLE_WINDOW_FEATURES
+    ).T
+    state = RollingWindowState(8, AVAILABLE_WINDOW_FEATURES)
+    streamed = np.vstack(
+        [
+            state.update(sample_values[start:stop], window_sizes)
+            for start, stop in [(0, 1), (1, 4), (4, 30), (30, 31), (31, 44), (44, 50)]
+        ]
+    )
+    np.testing.assert_array_equal(streamed, batch)
+    assert len(state.values) == min(state.buffer_size, len(sample_values))
+
+
+def test_rolling_state_of_a_long_large_stream_matches_batch():
+    rng = np.random.default_rng(2)
+    values = np.cumsum(rng.normal(size=200_000)) * 100 + 1e9
+    values[::997] = np.nan
+    features = ["avg", "sum", "std", "skew", "slope"]
+    state = RollingWindowState(30, features)
+    streamed = np.vstack(
+        [
+            state.update(values[start : start + 9_999], [1, 30])
+            for start in range(0, len(values), 9_999)
+        ]
+    )
+    np.testing.assert_array_equal(
+        streamed, compute_window_features(values, [1, 30], features=features).T
+    )
+    series = pd.Series(values)
+    for column, window_size, statistic in [
+        (0, 1, "mean"),
+        (1, 1, "sum"),
+        (5, 30, "mean"),
+        (6, 30, "sum"),
+    ]:
+        expected = getattr(series.rolling(window_size), statistic)().to_numpy()
+        np.testing.assert_allclose(streamed[:, column], expected, rtol=1e-14, atol=0)
+
+
+@pytest.fixture
+def pair_values():
+    rng = np.random.default_rng(1)
+    values = rng.normal(size=(3, 80)).cumsum(axis=1) + 100
+    values[0, [5, 40]] = np.nan
+    values[2, 50:60] = 7.0
+    return values
+
+
+def expected_pair_feature(first, second, feature, window_size):
+    first, second = pd.Series(first), pd.Series(second)
+    if feature == "ratio":
+        return first / second.shift(window_size - 1)
+    if feature == "spread":
+        return first - second.shift(window_size - 1)
+    rolling = first.rolling(window_size)
+    if feature == "cov":
+        return rolling.cov(second)
+    # pandas gives inf or NaN for constant windows, and rounds slightly beyond [-1, 1]
+    correlation = rolling.corr(second).clip(-1, 1)
+    constant = (second.rolling(window_size).std() == 0) | (
+        first.rolling(window_size).std() == 0
+    )
+    return correlation.mask(constant)
+
+
+@pytest.mark.parametrize("window_sizes", [[1, 2, 3], [5, 20], [100]])
+def test_compute_pair_features_matches_pandas(pair_values, window_sizes):
+    pairs = [(0, 1), (0, 2), (2, 1)]
+    features = compute_pair_features(pair_values, pairs, window_sizes)
+    assert features.shape == (len(pairs) * len(window_sizes) * len(PAIR_FEATURES), 80)
+
+    row = 0
+    for first, second in pairs:
+        for window_size in window_sizes:
+            for feature in PAIR_FEATURES:
+                expected = expected_pair_feature(
+                    pair_values[first], pair_values[second], feature, window_size
+                )
+                # Both round the correlation of nearly flat windows differently
+                np.testing.assert_allclose(
+                    features[row], expected.to_numpy(), rtol=1e-6, atol=1e-9
+                )
+                row += 1
+
+
+def test_pair_features_in_batches(pair_values, monkeypatch):
+    pairs = [(0, 1), (0, 2), (1, 2)]
+    expected = compute_pair_features(pair_values, pairs, [2, 6], features=["corr"])
+    monkeypatch.setattr("pychronoboost.timeseries.rolling._PAIR_BATCH_SIZE", 100)
+    np.testing.assert_array_equal(
+        compute_pair_features(pair_values, pairs, [2, 6], features=["corr"]), expected
+    )
+
+
+def test_pair_feature_names():
+    assert pair_feature_names([("a", "b")], [2], ["cov", "ratio"]) == [
+        "a_b_cov_2",
+        "a_b_ratio_2",
+    ]
@@ -0,0 +1,136 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from pychronoboost.timeseries import serving
+from pychronoboost.timeseries.data import TimeSeriesData
+from pychronoboost.timeseries.serving import (
+    AsyncTimeSeriesProcessor,
+    MemoryBudget,
+    estimate_memory_bytes,
+)
+
+
+@pytest.fixture
+def sample_data():
+    rng = np.random.default_rng(0)
+    values = rng.normal(size=60)
+    values[[4, 20]] = np.nan
+    return pd.DataFrame(
+        {"time": range(60), "value": values, "target": rng.normal(size=60)}
+    )
+
+
+def test_process_timeseries_features_async(sample_data, monkeypatch):
+    original = sample_data.copy()
+    processed = []
+    process = serving._process
+
+    def counting_process(data, config, cache):
+        processed.append(config["options"])
+        return process(data, config, cache)
+
+    monkeypatch.setattr(serving, "_process", counting_process)
+    expected = TimeSeriesData(sample_data.copy(), "time").process_timeseries_features(
+        ["value"], "target", max_window_size=4, max_features=3
+    )
+
+    async def run():
+        async with AsyncTimeSeriesProcessor(max_workers=2) as processor:
+            requests = [
+                processor.process_timeseries_features(
+                    sample_data, "time", ["value"], "target", max_window_size=4, **extra
+                )
+                for extra in [{"max_features": 3}, {"max_features": 3}, {}]
+            ]
+            return await asyncio.gather(*requests)
+
+    first, second, other = asyncio.run(run())
+    # The first two requests are identical and share one job
+    assert len(processed) == 2
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(second, expected)
+    assert first is not second
+    assert other.shape[1] == sample_data.shape[1] + 5
+    pd.testing.assert_frame_equal(sample_data, original)
+
+
+def test_coalesced_job_survives_cancelled_caller(sample_data):
+    async def run():
+        async with AsyncTimeSeriesProcessor(max_workers=1) as processor:
+            kwargs = {"max_window_size": 3, "max_features": 2}
+            cancelled = asyncio.ensure_future(
+                processor.process_timeseries_features(
+                    sample_data, "time", ["value"], "target", **kwargs
+                )
+            )
+            waiting = asyncio.ensure_future(
+                processor.process_timeseries_features(
+                    sample_data, "time", ["value"], "target", **kwargs
+                )
+            )
+            while not processor.n_jobs_in_flight:
+                await asyncio.sleep(0.001)
+            cancelled.cancel()
+            return await waiting
+
+    assert len(asyncio.run(run()).columns) == sample_data.shape[1] + 2
+
+
+def test_errors_reach_every_caller(sample_data):
+    async def run():
+        async with AsyncTimeSeriesProcessor(max_workers=1) as processor:
+            return await asyncio.gather(
+                *[
+                    processor.process_timeseries_features(
+                        sample_data, "time", ["missing"], "target"
+                    )
+                    for _ in range(2)
+                ],
+                return_exceptions=True,
+            )
+
+    assert all(isinstance(result, ValueError) for result in asyncio.run(run()))
+
+
+def test_memory_budget_admits_in_order():
+    async def run():
+        budget = MemoryBudget(100)
+        admitted = []
+
+        async def job(name, n_bytes, seconds):
+            await budget.acquire(n_bytes)
+            admitted.append(name)
+            await asyncio.sleep(seconds)
+            budget.release(n_bytes)
+
+        await asyncio.gather(
+            job("a", 60, 0.02),
+            job("large", 500, 0.01),
+            job("b", 30, 0.01),
+            job("c", 30, 0.01),
+        )
+        assert budget.in_use == 0
+        return admitted
+
+    # The job larger than the budget runs alone, and later jobs wait behind it
+    assert asyncio.run(run()) == ["a", "large", "b", "c"]
+    with pytest.raises(ValueError):
+        MemoryBudget(0)
+
+
+def test_estimate_memory_bytes(sample_data):
+    data_bytes = sample_data.memory_usage(index=True, deep=True).sum()
+    assert (
+        estimate_memory_bytes(sample_data, ["value"], 3) == data_bytes + 2 * 60 * 12 * 8
+    )
+    assert (
+        estimate_memory_bytes(
+            sample_data, ["value"], 4, ["avg"], "geometric", feature_dtype="float32"
+        )
+        == data_bytes + 2 * 60 * 3 * 4
+    )
+    assert (
+        estimate_memory_bytes(sample_data, ["value", "target"], 3, chunk_size=5)
+        == data_bytes + 2 * 60 * 5 * 8
+    )